@@ -0,0 +1,50 @@
+"""open review counters and team assignment mode
+
+Revision ID: 2d7f4a9e61c0
+Revises: 9c3e51d7a2b4
+Create Date: 2026-10-17 18:02:41.775310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7f4a9e61c0'
+down_revision: Union[str, Sequence[str], None] = '9c3e51d7a2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'teams',
+        sa.Column('assignment_mode', sa.String(length=20), server_default='RANDOM', nullable=False),
+    )
+    op.add_column(
+        'users',
+        sa.Column('open_reviews', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE users u
+        SET open_reviews = c.cnt
+        FROM (
+            SELECT r.user_id, count(*) AS cnt
+            FROM pull_request_reviewers r
+            JOIN pull_requests p ON p.pull_request_id = r.pull_request_id
+            WHERE p.status = 'OPEN'
+            GROUP BY r.user_id
+        ) c
+        WHERE u.user_id = c.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'open_reviews')
+    op.drop_column('teams', 'assignment_mode')
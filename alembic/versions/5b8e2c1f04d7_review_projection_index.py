@@ -0,0 +1,38 @@
+"""review projection index
+
+Revision ID: 5b8e2c1f04d7
+Revises: 2d7f4a9e61c0
+Create Date: 2026-10-17 19:14:03.518226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2c1f04d7'
+down_revision: Union[str, Sequence[str], None] = '2d7f4a9e61c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_pull_requests_review_projection',
+        'pull_requests',
+        ['pull_request_id'],
+        unique=False,
+        postgresql_include=['status', 'author_id', 'pull_request_name'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_pull_requests_review_projection',
+        table_name='pull_requests',
+        postgresql_include=['status', 'author_id', 'pull_request_name'],
+    )
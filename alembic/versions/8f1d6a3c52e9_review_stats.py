@@ -0,0 +1,67 @@
+"""review stats aggregates
+
+Revision ID: 8f1d6a3c52e9
+Revises: 5b8e2c1f04d7
+Create Date: 2026-10-17 20:06:27.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f1d6a3c52e9'
+down_revision: Union[str, Sequence[str], None] = '5b8e2c1f04d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('merged_reviews', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.create_table(
+        'pull_request_stats',
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('reviewer_count', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('pull_requests', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('status', 'reviewer_count', 'shard'),
+    )
+    op.execute(
+        """
+        UPDATE users u
+        SET merged_reviews = c.cnt
+        FROM (
+            SELECT r.user_id, count(*) AS cnt
+            FROM pull_request_reviewers r
+            JOIN pull_requests p ON p.pull_request_id = r.pull_request_id
+            WHERE p.status = 'MERGED'
+            GROUP BY r.user_id
+        ) c
+        WHERE u.user_id = c.user_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO pull_request_stats (status, reviewer_count, shard, pull_requests)
+        SELECT status, reviewer_count, 0, count(*)
+        FROM (
+            SELECT p.status, count(r.user_id) AS reviewer_count
+            FROM pull_requests p
+            LEFT JOIN pull_request_reviewers r ON r.pull_request_id = p.pull_request_id
+            GROUP BY p.pull_request_id
+        ) pr
+        GROUP BY status, reviewer_count
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('pull_request_stats')
+    op.drop_column('users', 'merged_reviews')
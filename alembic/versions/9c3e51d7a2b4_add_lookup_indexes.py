@@ -0,0 +1,45 @@
+"""add lookup indexes
+
+Revision ID: 9c3e51d7a2b4
+Revises: 4af00076901a
+Create Date: 2026-10-17 17:35:12.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e51d7a2b4'
+down_revision: Union[str, Sequence[str], None] = '4af00076901a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_team_name', 'users', ['team_name'], unique=False)
+    op.create_index(
+        'ix_users_team_name_active',
+        'users',
+        ['team_name', 'user_id'],
+        unique=False,
+        postgresql_where=sa.text('is_active = true'),
+    )
+    op.create_index('ix_pull_requests_author_id', 'pull_requests', ['author_id'], unique=False)
+    op.create_index(
+        'ix_pull_request_reviewers_user_id',
+        'pull_request_reviewers',
+        ['user_id', 'pull_request_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pull_request_reviewers_user_id', table_name='pull_request_reviewers')
+    op.drop_index('ix_pull_requests_author_id', table_name='pull_requests')
+    op.drop_index('ix_users_team_name_active', table_name='users', postgresql_where=sa.text('is_active = true'))
+    op.drop_index('ix_users_team_name', table_name='users')
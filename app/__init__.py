@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 
+from app.api.internal import router as internal_router
+from app.api.metrics import router as metrics_router
 from app.api.pull_request import router as pull_request_router
+from app.api.stats import router as stats_router
 from app.api.team import router as team_router
 from app.api.user import router as user_router
 
@@ -10,3 +13,6 @@ def include_routes(app: FastAPI) -> None:
     app.include_router(team_router)
     app.include_router(user_router)
     app.include_router(pull_request_router)
+    app.include_router(stats_router)
+    app.include_router(internal_router)
+    app.include_router(metrics_router)
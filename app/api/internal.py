@@ -0,0 +1,15 @@
+from fastapi import APIRouter, status
+
+from app.database.cache import roster_cache
+
+router = APIRouter(prefix='/internal', tags=['Internal'])
+
+
+@router.get(
+    '/cacheStats',
+    status_code=status.HTTP_200_OK,
+    summary='Статистика in-process кэша составов команд',
+)
+async def get_cache_stats() -> dict[str, dict[str, int | float]]:
+    """Счётчики попаданий, промахов и вытеснений кэша составов команд текущего процесса."""
+    return {'roster_cache': roster_cache.stats()}
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import registry
+
+router = APIRouter(tags=['Internal'])
+
+
+class PrometheusResponse(PlainTextResponse):
+    media_type = 'text/plain; version=0.0.4'
+
+
+@router.get(
+    '/metrics',
+    status_code=status.HTTP_200_OK,
+    response_class=PrometheusResponse,
+    summary='Метрики процесса в формате Prometheus',
+)
+async def get_metrics() -> PrometheusResponse:
+    """Задержки и статусы по маршрутам, запросы в обработке, ошибки по кодам, состояние пула соединений."""
+    return PrometheusResponse(registry.render())
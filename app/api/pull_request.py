@@ -2,10 +2,17 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.database.repositories.pull_request import PullRequestRepo, pull_request_repo
-from app.database.repositories.user import UserRepo, user_repo
+from app.database.backend import pull_request_repo, stats_repo, uow_factory, user_repo
+from app.database.repositories.pull_request import PullRequestRepo
+from app.database.repositories.stats import StatsRepo
+from app.database.repositories.user import UserRepo
 from app.exceptions import CannotReassignPrException, ModelExistException, NotFoundException
+from app.responses import FastJSONRoute
 from app.schemas.pull_request import (
+    BatchItemError,
+    PullRequestBatchCreateRequest,
+    PullRequestBatchCreateResponse,
+    PullRequestBatchItemResult,
     PullRequestCreateRequest,
     PullRequestMergeRequest,
     PullRequestReassignRequest,
@@ -14,15 +21,21 @@ from app.schemas.pull_request import (
 )
 from app.services.pull_request import PullRequestService
 
-router = APIRouter(prefix='/pullRequest', tags=['PullRequests'])
+router = APIRouter(prefix='/pullRequest', tags=['PullRequests'], route_class=FastJSONRoute)
 
 
 def get_pr_service(
     pr_repository: Annotated[PullRequestRepo, Depends(lambda: pull_request_repo)],
     user_repository: Annotated[UserRepo, Depends(lambda: user_repo)],
+    stats_repository: Annotated[StatsRepo, Depends(lambda: stats_repo)],
 ) -> PullRequestService:
     """Фабрика для создания сервиса Pull Requests с внедрёнными зависимостями."""
-    return PullRequestService(pr_repo=pr_repository, user_repo=user_repository)
+    return PullRequestService(
+        pr_repo=pr_repository,
+        user_repo=user_repository,
+        stats_repo=stats_repository,
+        uow_factory=uow_factory,
+    )
 
 
 @router.post(
@@ -67,6 +80,36 @@ async def create_pull_request(
         ) from e
 
 
+@router.post(
+    '/createBatch',
+    status_code=status.HTTP_200_OK,
+    summary='Создать пачку PR с автоматическим назначением ревьюверов',
+)
+async def create_pull_requests_batch(
+    request: PullRequestBatchCreateRequest,
+    pr_service: Annotated[PullRequestService, Depends(get_pr_service)],
+) -> PullRequestBatchCreateResponse:
+    """
+    Создать несколько PR за один вызов.
+
+    Для каждого PR возвращается либо созданный PR, либо ошибка с тем же кодом,
+    что вернул бы ``/pullRequest/create`` (``PR_EXISTS``, ``NOT_FOUND``).
+    """
+    outcomes = await pr_service.create_pull_requests_batch(request.pull_requests)
+
+    results = []
+    for item, outcome in zip(request.pull_requests, outcomes, strict=True):
+        if isinstance(outcome, PullRequestResponse):
+            results.append(PullRequestBatchItemResult(pull_request_id=item.pull_request_id, pr=outcome))
+        elif isinstance(outcome, ModelExistException):
+            error = BatchItemError(code='PR_EXISTS', message='PR id already exists')
+            results.append(PullRequestBatchItemResult(pull_request_id=item.pull_request_id, error=error))
+        else:
+            error = BatchItemError(code='NOT_FOUND', message='resource not found')
+            results.append(PullRequestBatchItemResult(pull_request_id=item.pull_request_id, error=error))
+    return PullRequestBatchCreateResponse(results=results)
+
+
 @router.post(
     '/merge',
     status_code=status.HTTP_200_OK,
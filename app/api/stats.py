@@ -0,0 +1,78 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.database.backend import stats_repo, team_repo, uow_factory
+from app.database.repositories.stats import StatsRepo
+from app.database.repositories.team import TeamRepo
+from app.exceptions import NotFoundException
+from app.responses import FastJSONRoute
+from app.schemas.stats import PullRequestStatsResponse, TeamStatsResponse, UserStatsResponse
+from app.services.stats import StatsService
+
+router = APIRouter(prefix='/stats', tags=['Stats'], route_class=FastJSONRoute)
+
+
+def get_stats_service(
+    stats_repository: Annotated[StatsRepo, Depends(lambda: stats_repo)],
+    team_repository: Annotated[TeamRepo, Depends(lambda: team_repo)],
+) -> StatsService:
+    """Фабрика для создания сервиса статистики с внедрёнными зависимостями."""
+    return StatsService(stats_repo=stats_repository, team_repo=team_repository, uow_factory=uow_factory)
+
+
+@router.get(
+    '',
+    status_code=status.HTTP_200_OK,
+    summary='Количество PR по статусам и распределение по числу ревьюверов',
+)
+async def get_pull_request_stats(
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+) -> PullRequestStatsResponse:
+    return await stats_service.get_pull_request_stats()
+
+
+@router.get(
+    '/team',
+    status_code=status.HTTP_200_OK,
+    summary='Нагрузка ревьюверов команды',
+)
+async def get_team_stats(
+    team_name: Annotated[str, Query()],
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+) -> TeamStatsResponse:
+    try:
+        return await stats_service.get_team_stats(team_name)
+    except NotFoundException as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                'error': {
+                    'code': 'NOT_FOUND',
+                    'message': 'resource not found',
+                }
+            },
+        ) from e
+
+
+@router.get(
+    '/user',
+    status_code=status.HTTP_200_OK,
+    summary='Нагрузка ревьювера',
+)
+async def get_user_stats(
+    user_id: Annotated[str, Query()],
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+) -> UserStatsResponse:
+    try:
+        return await stats_service.get_user_stats(user_id)
+    except NotFoundException as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                'error': {
+                    'code': 'NOT_FOUND',
+                    'message': 'resource not found',
+                }
+            },
+        ) from e
@@ -1,14 +1,18 @@
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import ValidationError
 
-from app.database.repositories.team import TeamRepo, team_repo
-from app.database.repositories.user import UserRepo, user_repo
-from app.exceptions import ModelExistException, NotFoundException
-from app.schemas.team import TeamCreate, TeamResponse
+from app.database.backend import team_repo, uow_factory, user_repo
+from app.database.repositories.team import TeamRepo
+from app.database.repositories.user import UserRepo
+from app.exceptions import InvalidImportRecordException, ModelExistException, NotFoundException
+from app.responses import FastJSONRoute
+from app.schemas.team import TeamCreate, TeamImportRecord, TeamImportResponse, TeamResponse
 from app.services.team import TeamService
 
-router = APIRouter(prefix='/team', tags=['Teams'])
+router = APIRouter(prefix='/team', tags=['Teams'], route_class=FastJSONRoute)
 
 
 def get_team_service(
@@ -16,7 +20,29 @@ def get_team_service(
     user_repository: Annotated[UserRepo, Depends(lambda: user_repo)],
 ) -> TeamService:
     """Фабрика для создания сервиса команд с внедрёнными зависимостями."""
-    return TeamService(team_repo=team_repository, user_repo=user_repository)
+    return TeamService(team_repo=team_repository, user_repo=user_repository, uow_factory=uow_factory)
+
+
+async def _iter_ndjson_records(request: Request) -> AsyncIterator[TeamImportRecord]:
+    """Построчно разбирает тело запроса в формате NDJSON, не загружая его целиком в память."""
+    buffer = b''
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_import_record(line, line_number)
+    if buffer.strip():
+        yield _parse_import_record(buffer, line_number + 1)
+
+
+def _parse_import_record(line: bytes, line_number: int) -> TeamImportRecord:
+    try:
+        return TeamImportRecord.model_validate_json(line)
+    except ValidationError as e:
+        raise InvalidImportRecordException(line_number) from e
 
 
 @router.post(
@@ -65,3 +91,32 @@ async def get_team(
                 }
             },
         ) from e
+
+
+@router.post(
+    '/import',
+    status_code=status.HTTP_200_OK,
+    summary='Потоковый импорт участников команд в формате NDJSON',
+)
+async def import_teams(
+    request: Request,
+    team_service: Annotated[TeamService, Depends(get_team_service)],
+) -> TeamImportResponse:
+    """
+    Импортировать участников команд из NDJSON.
+
+    Каждая строка: ``{"team_name": ..., "user_id": ..., "username": ..., "is_active": ...}``.
+    Строки применяются пачками, недостающие команды создаются автоматически.
+    """
+    try:
+        return await team_service.import_members(_iter_ndjson_records(request))
+    except InvalidImportRecordException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                'error': {
+                    'code': 'INVALID_RECORD',
+                    'message': f'invalid record at line {e.line_number}',
+                }
+            },
+        ) from e
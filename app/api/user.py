@@ -2,19 +2,30 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.database.repositories.user import UserRepo, user_repo
-from app.exceptions import NotFoundException
-from app.schemas.user import SetIsActiveRequest, UserResponse, UserReviewsResponse
+from app.database.backend import pull_request_repo, uow_factory, user_repo
+from app.database.models import PRStatus
+from app.database.repositories.pull_request import PullRequestRepo
+from app.database.repositories.user import UserRepo
+from app.exceptions import InvalidCursorException, NotFoundException
+from app.responses import FastJSONRoute
+from app.schemas.user import (
+    DeactivateUsersRequest,
+    DeactivateUsersResponse,
+    SetIsActiveRequest,
+    UserResponse,
+    UserReviewsResponse,
+)
 from app.services.user import UserService
 
-router = APIRouter(prefix='/users', tags=['Users'])
+router = APIRouter(prefix='/users', tags=['Users'], route_class=FastJSONRoute)
 
 
 def get_user_service(
     user_repository: Annotated[UserRepo, Depends(lambda: user_repo)],
+    pr_repository: Annotated[PullRequestRepo, Depends(lambda: pull_request_repo)],
 ) -> UserService:
     """Фабрика для создания сервиса пользователей с внедрёнными зависимостями."""
-    return UserService(user_repo=user_repository)
+    return UserService(user_repo=user_repository, pr_repo=pr_repository, uow_factory=uow_factory)
 
 
 @router.post(
@@ -46,6 +57,38 @@ async def set_is_active(
     return {'user': user}
 
 
+@router.post(
+    '/deactivate',
+    status_code=status.HTTP_200_OK,
+    summary='Массово деактивировать пользователей и переназначить их открытые ревью',
+)
+async def deactivate_users(
+    request: DeactivateUsersRequest,
+    user_service: Annotated[UserService, Depends(get_user_service)],
+) -> DeactivateUsersResponse:
+    """
+    Деактивировать пользователей по списку ID или всю команду.
+
+    Открытые ревью деактивированных пользователей переназначаются на активных
+    участников их команды в той же транзакции.
+    """
+    try:
+        return await user_service.deactivate_users(
+            user_ids=request.user_ids,
+            team_name=request.team_name,
+        )
+    except NotFoundException as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                'error': {
+                    'code': 'NOT_FOUND',
+                    'message': 'resource not found',
+                }
+            },
+        ) from e
+
+
 @router.get(
     '/getReview',
     status_code=status.HTTP_200_OK,
@@ -54,9 +97,19 @@ async def set_is_active(
 async def get_assigned_pull_requests(
     user_id: Annotated[str, Query()],
     user_service: Annotated[UserService, Depends(get_user_service)],
+    pr_status: Annotated[PRStatus | None, Query(alias='status', description='Фильтр по статусу PR')] = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000, description='Размер страницы')] = None,
+    cursor: Annotated[str | None, Query(description='Курсор из next_cursor предыдущей страницы')] = None,
+    count_only: Annotated[bool, Query(description='Вернуть только количество PR')] = False,
 ) -> UserReviewsResponse:
     try:
-        return await user_service.get_reviews(user_id)
+        return await user_service.get_reviews(
+            user_id,
+            status=pr_status,
+            limit=limit,
+            cursor=cursor,
+            count_only=count_only,
+        )
 
     except NotFoundException as e:
         raise HTTPException(
@@ -68,3 +121,13 @@ async def get_assigned_pull_requests(
                 }
             },
         ) from e
+    except InvalidCursorException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                'error': {
+                    'code': 'INVALID_CURSOR',
+                    'message': 'invalid pagination cursor',
+                }
+            },
+        ) from e
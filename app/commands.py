@@ -0,0 +1,47 @@
+"""Служебные команды обслуживания БД: ``python -m app.commands <command>``."""
+
+import argparse
+import asyncio
+
+from loguru import logger
+
+from app.database.base import async_engine
+from app.database.repositories.stats import stats_repo
+from app.database.repositories.user import user_repo
+
+
+async def rebuild_counters() -> None:
+    """Проверить и пересчитать счётчики открытых и слитых ревью пользователей."""
+    fixed = await user_repo.rebuild_review_counters()
+    logger.info(f'review counters rebuilt, drifted rows fixed: {fixed}')
+
+
+async def rebuild_stats() -> None:
+    """Пересчитать все агрегаты статистики: счётчики пользователей и распределение PR."""
+    await rebuild_counters()
+    rows = await stats_repo.rebuild_pull_request_stats()
+    logger.info(f'pull_request_stats rebuilt, rows: {rows}')
+
+
+COMMANDS = {
+    'rebuild-counters': rebuild_counters,
+    'rebuild-stats': rebuild_stats,
+}
+
+
+async def _run(command: str) -> None:
+    try:
+        await COMMANDS[command]()
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Служебные команды сервиса назначения ревьюверов')
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(_run(args.command))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,11 +13,20 @@ class Settings(BaseSettings):
         extra='ignore',
     )
 
+    # Хранилище репозиториев: postgres или memory - данные в памяти процесса для тестов и замеров
+    # накладных расходов приложения без БД (не переживают перезапуск и не общие между воркерами)
+    REPOSITORY_BACKEND: Literal['postgres', 'memory'] = 'postgres'
+
     POSTGRES_HOST: str = 'localhost'
     POSTGRES_PORT: int = 5432
     POSTGRES_USER: str = 'postgres'
     POSTGRES_PASSWORD: str = 'postgres'
     POSTGRES_DB: str = 'avito_pr'
+    # Реплика (streaming replication) для чтений; учётные данные и база те же, что у основного сервера
+    POSTGRES_REPLICA_HOST: str | None = None
+    POSTGRES_REPLICA_PORT: int = 5432
+    # Сколько ждать, пока реплика догонит X-Consistency-Token клиента, прежде чем читать с основного сервера
+    DB_REPLICA_MAX_WAIT: float = 0.0
 
     DB_POOL_SIZE: int = 5
     DB_MAX_OVERFLOW: int = 10
@@ -23,6 +34,53 @@ class Settings(BaseSettings):
     DB_POOL_RECYCLE: int = 3600
     DB_POOL_PRE_PING: bool = True
     DB_ECHO: bool = False
+    # Общий лимит соединений к Postgres на все воркеры инстанса; если задан,
+    # пул каждого воркера вычисляется из него (см. app.database.base.pool_limits)
+    DB_CONNECTION_BUDGET: int | None = None
+    # Admission control: запросы сверх ёмкости пула ждут слот не дольше DB_ADMISSION_TIMEOUT секунд,
+    # иначе сразу получают 503 с Retry-After (см. app.database.admission)
+    DB_ADMISSION_ENABLED: bool = True
+    DB_ADMISSION_TIMEOUT: float = 1.0
+    # Адаптивный лимит параллельности по задержке выдачи соединений из пула
+    DB_ADMISSION_ADAPTIVE: bool = False
+    DB_ADMISSION_TARGET_CHECKOUT_WAIT: float = 0.05
+    # Размер кэша prepared statements на одно соединение (asyncpg)
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    # Подключение через PgBouncer в режиме transaction pooling: без prepared statements и
+    # statement_timeout; инвалидацию кэша (LISTEN) при этом нужно выключить
+    DB_PGBOUNCER: bool = False
+
+    WEB_HOST: str = '0.0.0.0'  # noqa: S104
+    WEB_PORT: int = 8080
+    # Количество процессов uvicorn; 0 - по числу ядер
+    WEB_WORKERS: int = 1
+    # auto - uvloop/httptools, если установлены
+    WEB_LOOP: str = 'auto'
+    WEB_HTTP: str = 'auto'
+    WEB_GRACEFUL_TIMEOUT: int = 30
+
+    # Отладочный режим: заголовки X-SQL-* с учётом запросов к БД в каждом ответе
+    DEBUG: bool = False
+    # Метрики HTTP-запросов в /metrics (метрики пула и ошибок собираются всегда)
+    METRICS_ENABLED: bool = True
+    # Учёт запросов к БД на HTTP-запрос и строка лога по каждому запросу
+    QUERY_STATS_ENABLED: bool = True
+    # Бюджет запросов к БД на HTTP-запрос (для тестов): превышение - ошибка запроса.
+    # QUERY_BUDGETS задаёт бюджеты отдельных ручек по шаблону пути, например {"/pullRequest/reassign": 3}
+    QUERY_BUDGET: int | None = None
+    QUERY_BUDGETS: dict[str, int] = {}
+
+    # Дедлайн обработки запроса в секундах (None - без ограничения); по истечении запрос к БД
+    # отменяется и клиент получает 504 REQUEST_TIMEOUT. REQUEST_TIMEOUTS - дедлайны отдельных ручек по пути
+    REQUEST_TIMEOUT: float | None = 10.0
+    REQUEST_TIMEOUTS: dict[str, float] = {'/team/import': 300.0}
+
+    TEAM_IMPORT_BATCH_SIZE: int = 1000
+
+    ROSTER_CACHE_ENABLED: bool = True
+    ROSTER_CACHE_SIZE: int = 1024
+    ROSTER_CACHE_TTL: float = 60.0
+    CACHE_INVALIDATION_ENABLED: bool = True
 
     @property
     def PG_URL(self) -> str:
@@ -32,5 +90,15 @@ class Settings(BaseSettings):
             f'@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}'
         )
 
+    @property
+    def PG_REPLICA_URL(self) -> str | None:
+        """URL реплики для чтения или None, если она не настроена."""
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        return (
+            f'postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}'
+            f'@{self.POSTGRES_REPLICA_HOST}:{self.POSTGRES_REPLICA_PORT}/{self.POSTGRES_DB}'
+        )
+
 
 settings = Settings()
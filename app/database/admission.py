@@ -0,0 +1,166 @@
+"""
+Admission control перед пулом соединений.
+
+Запрос, которому не хватает соединения, раньше ждал его в пуле до ``DB_POOL_TIMEOUT`` и падал
+с 500. Контроллер ограничивает число одновременно открытых сессий ёмкостью пула и держит свою
+очередь: если ожидаемое время ожидания больше ``DB_ADMISSION_TIMEOUT``, открытие сессии сразу
+завершается отказом с оценкой, через сколько секунд стоит повторить (503 с Retry-After).
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.exceptions import ServiceOverloadedException
+from app.metrics import Counter, Gauge, Histogram, registry
+
+# Сглаживание EWMA времени обработки запроса и задержки выдачи соединения
+_EWMA_ALPHA = 0.2
+# Шаг уменьшения лимита при медленной выдаче соединений (адаптивный режим)
+_DECREASE_FACTOR = 0.9
+# Уменьшать лимит не чаще, чем раз в столько секунд: одна волна задержек - одно уменьшение
+_DECREASE_INTERVAL = 1.0
+
+admission_rejected_total = registry.register(
+    Counter('db_admission_rejected_total', 'Sessions rejected by admission control', ('reason',)),
+)
+admission_wait_seconds = registry.register(
+    Histogram('db_admission_wait_seconds', 'Time sessions spent in the admission queue'),
+)
+
+
+class AdmissionController:
+    """
+    Ограничение параллельных сессий БД с очередью и ранним отказом.
+
+    ``limit`` - эффективный лимит параллельности, по умолчанию равный ёмкости пула. В адаптивном
+    режиме он уменьшается, когда выдача соединения дольше ``target_checkout_wait``, и медленно
+    растёт обратно (AIMD), пока выдача быстрая и лимит упирается в нагрузку.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        timeout: float,
+        *,
+        enabled: bool = True,
+        adaptive: bool = False,
+        target_checkout_wait: float = 0.05,
+        min_limit: int = 1,
+    ) -> None:
+        self.capacity = capacity
+        self.timeout = timeout
+        self.enabled = enabled
+        self.adaptive = adaptive
+        self.target_checkout_wait = target_checkout_wait
+        self.min_limit = min(min_limit, capacity)
+        self.limit = float(capacity)
+        self.active = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        # Начальная оценка времени жизни сессии; уточняется по первым же сессиям
+        self._service_time = 0.01
+        self._checkout_wait = 0.0
+        self._last_decrease = 0.0
+
+        registry.register(Gauge('db_admission_limit', 'Effective admission concurrency limit', collect=self._limit))
+        registry.register(Gauge('db_admission_active', 'Sessions holding an admission slot', collect=self._active))
+        registry.register(Gauge('db_admission_queued', 'Sessions waiting for an admission slot', collect=self._queued))
+
+    def _limit(self) -> float:
+        return self.limit
+
+    def _active(self) -> float:
+        return self.active
+
+    def _queued(self) -> float:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """Оценка ожидания для новой сессии: очередь перед ней, делённая на пропускную способность."""
+        return (len(self._waiters) + 1) * self._service_time / max(self.limit, 1)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait()))
+
+    def _has_slot(self) -> bool:
+        return self.active < int(self.limit)
+
+    async def acquire(self) -> float:
+        """
+        Занять слот; возвращает момент выдачи для ``release``.
+
+        :raises ServiceOverloadedException: Слот не освободится за ``timeout``.
+        """
+        if not self.enabled:
+            return 0.0
+        if self._has_slot() and not self._waiters:
+            self.active += 1
+        else:
+            await self._wait()
+        return time.perf_counter()
+
+    def release(self, acquired_at: float) -> None:
+        if not self.enabled:
+            return
+        self._service_time += _EWMA_ALPHA * (time.perf_counter() - acquired_at - self._service_time)
+        self.active -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Слот на время блока ``async with``."""
+        acquired_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    async def _wait(self) -> None:
+        if self.expected_wait() > self.timeout:
+            admission_rejected_total.inc('expected_wait')
+            raise ServiceOverloadedException(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Слот выдан одновременно с таймаутом/отменой: возвращаем его следующему
+                self.active -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                admission_rejected_total.inc('timeout')
+                raise ServiceOverloadedException(self.retry_after()) from e
+            raise
+        finally:
+            admission_wait_seconds.observe(time.perf_counter() - started)
+
+    def _wake(self) -> None:
+        # Освободившийся слот сразу уходит первому в очереди: новые запросы не обгоняют ожидающих
+        while self._waiters and self._has_slot():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def observe_checkout(self, wait: float) -> None:
+        """Учесть задержку выдачи соединения из пула (вызывается пулом на каждую выдачу)."""
+        if not self.adaptive:
+            return
+        self._checkout_wait += _EWMA_ALPHA * (wait - self._checkout_wait)
+        now = time.monotonic()
+        if self._checkout_wait > self.target_checkout_wait:
+            if now - self._last_decrease >= _DECREASE_INTERVAL:
+                self.limit = max(float(self.min_limit), self.limit * _DECREASE_FACTOR)
+                self._last_decrease = now
+        elif self.active >= int(self.limit) and self.limit < self.capacity:
+            self.limit = min(self.capacity, self.limit + 1 / self.limit)
+            self._wake()
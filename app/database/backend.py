@@ -0,0 +1,30 @@
+"""
+Реализации репозиториев и единицы работы, выбранные настройкой ``REPOSITORY_BACKEND``.
+
+Роутеры и сервисы берут зависимости отсюда, поэтому с ``REPOSITORY_BACKEND=memory`` всё приложение
+работает поверх ``app.database.memory`` без Postgres.
+"""
+
+from collections.abc import Callable
+
+from app.config import settings
+from app.database.base import UnitOfWork
+from app.database.memory import MemoryUnitOfWork
+from app.database.repositories.memory import (
+    memory_pull_request_repo,
+    memory_stats_repo,
+    memory_team_repo,
+    memory_user_repo,
+)
+from app.database.repositories.pull_request import PullRequestRepo, pull_request_repo as pg_pull_request_repo
+from app.database.repositories.stats import StatsRepo, stats_repo as pg_stats_repo
+from app.database.repositories.team import TeamRepo, team_repo as pg_team_repo
+from app.database.repositories.user import UserRepo, user_repo as pg_user_repo
+
+IN_MEMORY = settings.REPOSITORY_BACKEND == 'memory'
+
+pull_request_repo: PullRequestRepo = memory_pull_request_repo if IN_MEMORY else pg_pull_request_repo
+user_repo: UserRepo = memory_user_repo if IN_MEMORY else pg_user_repo
+team_repo: TeamRepo = memory_team_repo if IN_MEMORY else pg_team_repo
+stats_repo: StatsRepo = memory_stats_repo if IN_MEMORY else pg_stats_repo
+uow_factory: Callable[..., UnitOfWork] = MemoryUnitOfWork if IN_MEMORY else UnitOfWork
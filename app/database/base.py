@@ -1,45 +1,64 @@
 import functools
+import re
+import time
+import uuid
 from abc import ABC
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
 
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from app.config import settings
+from app.database.admission import AdmissionController
 from app.database.models import Base
+from app.database.replica import ReplicaRouter, consistency, parse_lsn
+from app.metrics import Gauge, db_pool_checkout_timeouts_total, db_pool_checkout_wait_seconds, registry
+
+# Сессия открытой UnitOfWork: репозитории берут её, если session не передана явно
+current_session: ContextVar[AsyncSession | None] = ContextVar('current_session', default=None)
 
 
 # Декоратор для обработки сессии
 def with_session(func):  # noqa
     @functools.wraps(func)
     async def wrapper(self, *args, **kwargs):  # noqa
-        session = kwargs.get('session')
+        session = kwargs.get('session') or current_session.get()
         if session is not None:
+            kwargs['session'] = session
             return await func(self, *args, **kwargs)
-        async with self.async_ses() as session:
+        # Чтение вне UnitOfWork - на реплику, если она настроена и догнала токен клиента
+        if await replica_router.use_replica():
+            async with replica_router.session() as session:
+                kwargs['session'] = session
+                return await func(self, *args, **kwargs)
+        async with admission.slot(), self.async_ses() as session:
             kwargs['session'] = session
             return await func(self, *args, **kwargs)
 
     return wrapper
 
 
-# Декоратор для обработки сессии и коммита
+# Декоратор для обработки сессии и коммита.
+# Если сессия передана снаружи или открыта UnitOfWork выше по стеку, транзакцией владеет
+# вызывающий код: декоратор не коммитит и не откатывает её, чтобы все вызовы ушли одним COMMIT.
 def with_session_commit(func):  # noqa
     @functools.wraps(func)
     async def wrapper(self, *args, **kwargs):  # noqa
-        session = kwargs.get('session')
+        session = kwargs.get('session') or current_session.get()
         if session is not None:
-            try:
-                result = await func(self, *args, **kwargs)
-                await session.commit()
-                return result
-            except Exception:
-                await session.rollback()
-                raise
-        async with self.async_ses() as session:
+            kwargs['session'] = session
+            return await func(self, *args, **kwargs)
+        async with admission.slot(), self.async_ses() as session:
             kwargs['session'] = session
             try:
                 result = await func(self, *args, **kwargs)
@@ -52,15 +71,318 @@ def with_session_commit(func):  # noqa
     return wrapper
 
 
+def pool_limits(workers: int = settings.WEB_WORKERS) -> tuple[int, int]:
+    """
+    Размер пула и overflow одного воркера.
+
+    Без ``DB_CONNECTION_BUDGET`` используются ``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW``. С бюджетом
+    он делится поровну между воркерами за вычетом LISTEN-соединения инвалидации кэша:
+    ``DB_POOL_SIZE`` остаётся постоянной частью пула, остаток уходит в overflow.
+
+    :raises ValueError: Бюджета не хватает хотя бы на одно соединение пула на воркер.
+    """
+    if settings.DB_CONNECTION_BUDGET is None:
+        return settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+
+    reserved = 1 if settings.CACHE_INVALIDATION_ENABLED else 0
+    per_worker = settings.DB_CONNECTION_BUDGET // max(workers, 1) - reserved
+    if per_worker < 1:
+        raise ValueError(
+            f'DB_CONNECTION_BUDGET={settings.DB_CONNECTION_BUDGET} is too small for {workers} workers '
+            f'({reserved} reserved connection(s) per worker)'
+        )
+    pool_size = min(settings.DB_POOL_SIZE, per_worker)
+    return pool_size, per_worker - pool_size
+
+
+def connect_args() -> dict:
+    """
+    Параметры asyncpg-соединения для кэша prepared statements.
+
+    Диалект asyncpg готовит каждый запрос и держит на соединении LRU из ``DB_STATEMENT_CACHE_SIZE``
+    prepared statements. За PgBouncer в transaction pooling соседние транзакции попадают на разные
+    серверные соединения, где этих statements нет, поэтому в режиме ``DB_PGBOUNCER`` кэш выключен,
+    а каждому statement даётся уникальное имя.
+    """
+    if not settings.DB_PGBOUNCER:
+        return {'prepared_statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE}
+    return {
+        'prepared_statement_cache_size': 0,
+        'statement_cache_size': 0,
+        'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+    }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание выдачи соединения и таймауты исчерпания пула."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_checkout_timeouts_total.inc()
+            raise
+        finally:
+            wait = time.perf_counter() - started
+            db_pool_checkout_wait_seconds.observe(wait)
+            admission.observe_checkout(wait)
+
+
+_pool_size, _max_overflow = pool_limits()
+
+admission = AdmissionController(
+    _pool_size + _max_overflow,
+    settings.DB_ADMISSION_TIMEOUT,
+    enabled=settings.DB_ADMISSION_ENABLED,
+    adaptive=settings.DB_ADMISSION_ADAPTIVE,
+    target_checkout_wait=settings.DB_ADMISSION_TARGET_CHECKOUT_WAIT,
+)
+
 async_engine = create_async_engine(
     settings.PG_URL,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_size=_pool_size,
+    max_overflow=_max_overflow,
     pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=settings.DB_POOL_PRE_PING,
     echo=settings.DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    connect_args=connect_args(),
+)
+
+# Реплика для чтения: свой пул того же размера; admission control ограничивает только основной сервер
+replica_engine = (
+    create_async_engine(
+        settings.PG_REPLICA_URL,
+        pool_size=_pool_size,
+        max_overflow=_max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        echo=settings.DB_ECHO,
+        connect_args=connect_args(),
+    )
+    if settings.PG_REPLICA_URL
+    else None
 )
+replica_router = ReplicaRouter(replica_engine, max_wait=settings.DB_REPLICA_MAX_WAIT)
+
+_pool: InstrumentedQueuePool = async_engine.pool  # type: ignore[assignment]
+registry.register(Gauge('db_pool_size', 'Persistent pool size', collect=_pool.size))
+registry.register(Gauge('db_pool_max_overflow', 'Maximum overflow connections', collect=lambda: _max_overflow))
+registry.register(Gauge('db_pool_checked_out', 'Connections currently checked out', collect=_pool.checkedout))
+registry.register(Gauge('db_pool_checked_in', 'Idle connections in the pool', collect=_pool.checkedin))
+# Отрицательное значение - сколько постоянных соединений ещё не открыто
+registry.register(Gauge('db_pool_overflow', 'Overflow connections currently open', collect=_pool.overflow))
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Счётчики обращений к БД в рамках одного HTTP-запроса (или другой единицы работы)."""
+
+    statements: int = 0
+    # BEGIN/COMMIT/ROLLBACK и SET statement_timeout - отдельные round-trip'ы к серверу помимо самих запросов
+    transaction_commands: int = 0
+    sql_time: float = 0.0
+    checkouts: int = 0
+
+    @property
+    def round_trips(self) -> int:
+        """Обращения к серверу без учёта pre-ping при выдаче соединения из пула."""
+        return self.statements + self.transaction_commands
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar('query_stats', default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Считать запросы, их время и выдачи соединений из пула в текущем контексте.
+
+    Если учёт уже ведётся выше по стеку, используются его счётчики: вложенные вызовы
+    не прячут запросы от внешнего учёта.
+    """
+    stats = query_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        query_stats.reset(token)
+
+
+# Абсолютный дедлайн текущего запроса по time.monotonic()
+request_deadline: ContextVar[float | None] = ContextVar('request_deadline', default=None)
+
+
+@contextmanager
+def deadline(timeout: float) -> Iterator[float]:
+    """Дедлайн через ``timeout`` секунд в текущем контексте; вложенный дедлайн не позже внешнего."""
+    value = time.monotonic() + timeout
+    outer = request_deadline.get()
+    if outer is not None:
+        value = min(value, outer)
+    token = request_deadline.set(value)
+    try:
+        yield value
+    finally:
+        request_deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Секунд до дедлайна текущего запроса; ``None``, если дедлайна нет."""
+    value = request_deadline.get()
+    return None if value is None else value - time.monotonic()
+
+
+def _listens_for(identifier: str) -> Callable:
+    """Подписать обработчик на событие основного сервера и реплики."""
+
+    def decorator(fn: Callable) -> Callable:
+        for engine in (async_engine, replica_engine):
+            if engine is not None:
+                event.listen(engine.sync_engine, identifier, fn)
+        return fn
+
+    return decorator
+
+
+# События приходят из greenlet'ов SQLAlchemy, которые наследуют контекст задачи запроса
+@_listens_for('before_cursor_execute')
+def _before_cursor_execute(conn, *_args) -> None:  # noqa: ANN002
+    if query_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@_listens_for('after_cursor_execute')
+def _after_cursor_execute(conn, *_args) -> None:  # noqa: ANN002
+    stats = query_stats.get()
+    started = conn.info.get('query_started')
+    if stats is not None and started:
+        stats.statements += 1
+        stats.sql_time += time.perf_counter() - started.pop()
+
+
+@_listens_for('handle_error')
+def _statement_failed(context) -> None:  # noqa: ANN001
+    # after_cursor_execute не вызывается для упавшего запроса: снимаем его засечку здесь
+    if context.connection is not None:
+        _after_cursor_execute(context.connection)
+
+
+@_listens_for('begin')
+@_listens_for('commit')
+@_listens_for('rollback')
+def _transaction_command(_conn) -> None:
+    stats = query_stats.get()
+    if stats is not None:
+        stats.transaction_commands += 1
+
+
+@_listens_for('checkout')
+def _checkout(*_args) -> None:  # noqa: ANN002
+    stats = query_stats.get()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+# Шаг округления statement_timeout вниз: соседние запросы с тем же дедлайном не переустанавливают его
+_STATEMENT_TIMEOUT_STEP_MS = 100
+
+
+@_listens_for('connect')
+def _connect(_dbapi_connection, connection_record) -> None:  # noqa: ANN001
+    # Новое соединение - значение по умолчанию сервера, даже если запись пула переиспользуется
+    connection_record.info.pop('statement_timeout_ms', None)
+
+
+@_listens_for('begin')
+def _transaction_started(conn) -> None:  # noqa: ANN001
+    conn.info['statement_timeout_pending'] = True
+
+
+@_listens_for('before_cursor_execute')
+def _apply_statement_timeout(conn, *_args) -> None:  # noqa: ANN001, ANN002
+    """
+    Ограничить запросы транзакции остатком дедлайна HTTP-запроса через ``statement_timeout``.
+
+    Проверка - на первом запросе транзакции: asyncpg открывает транзакцию лениво, поэтому SET
+    выполняется до BEGIN и действует на уровне сессии, переживая ROLLBACK и возврат в пул.
+    Значение на соединении меняется, только если оно больше остатка дедлайна или меньше
+    его половины, так что в установившемся режиме лишних round-trip'ов нет.
+
+    За PgBouncer (``DB_PGBOUNCER``) не применяется: SET вне транзакции достался бы другому клиенту.
+    """
+    if not conn.info.pop('statement_timeout_pending', False) or settings.DB_PGBOUNCER:
+        return
+    remaining = remaining_time()
+    applied = conn.info.get('statement_timeout_ms')
+    if remaining is None:
+        if not applied:
+            return
+        timeout_ms = 0
+    else:
+        limit_ms = max(1, int(remaining * 1000))
+        if applied and limit_ms // 2 <= applied <= limit_ms:
+            return
+        timeout_ms = limit_ms // _STATEMENT_TIMEOUT_STEP_MS * _STATEMENT_TIMEOUT_STEP_MS or limit_ms
+
+    conn.connection.dbapi_connection.run_async(
+        lambda driver_connection: driver_connection.execute(f'SET statement_timeout = {timeout_ms}'),
+    )
+    conn.info['statement_timeout_ms'] = timeout_ms
+    stats = query_stats.get()
+    if stats is not None:
+        stats.transaction_commands += 1
+
+
+# Запрос, изменяющий данные (в том числе через CTE); FOR UPDATE и ON CONFLICT DO UPDATE не совпадают
+_WRITE_STATEMENT = re.compile(r'\b(?:INSERT\s+INTO|DELETE\s+FROM|UPDATE\s+\w+\s+SET)\b')
+
+
+@event.listens_for(async_engine.sync_engine, 'before_cursor_execute')
+def _track_writes(conn, _cursor, statement, *_args) -> None:  # noqa: ANN001, ANN002
+    if replica_router.enabled and consistency.get() is not None and _WRITE_STATEMENT.search(statement):
+        conn.info['wal_writes'] = True
+
+
+@event.listens_for(async_engine.sync_engine, 'commit')
+def _writes_committed(conn) -> None:  # noqa: ANN001
+    if conn.info.pop('wal_writes', False):
+        conn.info['wal_committed'] = True
+
+
+@event.listens_for(async_engine.sync_engine, 'rollback')
+def _writes_rolled_back(conn) -> None:  # noqa: ANN001
+    conn.info.pop('wal_writes', None)
+
+
+@event.listens_for(async_engine.sync_engine, 'reset')
+def _commit_position(dbapi_connection, connection_record, reset_state) -> None:  # noqa: ANN001
+    """
+    Запомнить позицию WAL после коммита с изменениями для токена read-your-writes.
+
+    Событие 'commit' приходит до COMMIT, поэтому позиция читается при возврате соединения в пул:
+    транзакция уже зафиксирована, а соединение ещё принадлежит запросу.
+    """
+    if not connection_record.info.pop('wal_committed', False):
+        return
+    state = consistency.get()
+    if state is None or not reset_state.asyncio_safe or reset_state.terminate_only:
+        return
+    lsn = dbapi_connection.run_async(
+        lambda driver_connection: driver_connection.fetchval('SELECT pg_current_wal_lsn()::text'),
+    )
+    state.observe_commit(parse_lsn(lsn))
+    stats = query_stats.get()
+    if stats is not None:
+        stats.transaction_commands += 1
+
 
 session_factory = async_sessionmaker(
     bind=async_engine,
@@ -69,6 +391,79 @@ session_factory = async_sessionmaker(
 )
 
 
+class UnitOfWork:
+    """
+    Единица работы: одна сессия, одно соединение из пула и одна транзакция на бизнес-операцию.
+
+    Сервисы открывают её один раз на запрос. Пока она открыта, сессия доступна через
+    ``current_session``: вызовы репозиториев без ``session`` и вложенные UnitOfWork работают в той же
+    транзакции, не занимая второе соединение. При выходе из внешней UnitOfWork без исключения
+    выполняется один COMMIT, иначе ROLLBACK. Сессию нельзя использовать из параллельных задач.
+
+    ``read_only=True`` - единица работы только для чтения: открывается на реплике, если она настроена и
+    догнала токен клиента (``app.database.replica``). Вложенная UnitOfWork работает на сервере внешней.
+    """
+
+    def __init__(
+        self,
+        factory: async_sessionmaker[AsyncSession] = session_factory,
+        *,
+        read_only: bool = False,
+    ) -> None:
+        self._factory = factory
+        self.read_only = read_only
+        self.session: AsyncSession | None = None
+        self._acquired_at = 0.0
+        self._outer = False
+        self._on_replica = False
+        self._token: Token[AsyncSession | None] | None = None
+
+    async def __aenter__(self) -> AsyncSession:
+        session = current_session.get()
+        if session is not None:
+            # Вложенная единица работы присоединяется к транзакции внешней
+            self.session = session
+            return session
+
+        if self.read_only and await replica_router.use_replica():
+            self._on_replica = True
+            self.session = replica_router.session()
+        else:
+            # Admission control: при перегрузке ServiceOverloadedException до открытия сессии
+            self._acquired_at = await admission.acquire()
+            self.session = self._factory()
+        self._outer = True
+        self._token = current_session.set(self.session)
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+        assert self.session is not None
+        if not self._outer:
+            self.session = None
+            return
+        try:
+            if exc_type is None:
+                await self.session.commit()
+            else:
+                await self.session.rollback()
+        finally:
+            assert self._token is not None
+            current_session.reset(self._token)
+            await self.session.close()
+            self.session = None
+            self._outer = False
+            self._token = None
+            if self._on_replica:
+                self._on_replica = False
+            else:
+                admission.release(self._acquired_at)
+
+
+def is_replica(session: AsyncSession) -> bool:
+    """Открыта ли сессия на реплике: её данные могут отставать от основного сервера."""
+    return replica_engine is not None and session.bind is replica_engine
+
+
 class BasePgInterface(ABC):  # noqa: B024
     def __init__(self) -> None:
         self.base = Base
@@ -0,0 +1,147 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import settings
+from app.database.invalidation import TEAM, invalidation_bus
+
+
+@dataclass(frozen=True, slots=True)
+class MemberSnapshot:
+    """Неизменяемый снимок участника команды, безопасный для хранения между запросами."""
+
+    user_id: str
+    username: str
+    team_name: str
+    is_active: bool
+
+
+@dataclass(frozen=True, slots=True)
+class TeamSnapshot:
+    """Неизменяемый снимок команды с участниками."""
+
+    team_name: str
+    assignment_mode: str
+    members: tuple[MemberSnapshot, ...]
+
+
+class LRUCache:
+    """
+    Ограниченный по размеру LRU-кэш с TTL и счётчиками попаданий.
+
+    Рассчитан на один event loop: операции синхронные и не требуют блокировок.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, enabled: bool = True) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._data: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any | None:  # noqa: ANN401
+        if not self.enabled:
+            return None
+
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: object) -> None:
+        if not self.enabled:
+            return
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.invalidations += len(self._data)
+        self._data.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+class RosterCache(LRUCache):
+    """
+    Кэш составов команд для ``TeamRepo.get_by_name``.
+
+    Читатель запоминает ``generation`` до запроса в БД и передаёт его в ``set_team``. Любая инвалидация
+    увеличивает поколение, и снимок, прочитанный до неё, в кэш не попадает: иначе он мог бы лечь
+    поверх только что сброшенной записи и отдавать старый состав до истечения TTL.
+
+    Пока шина не получает события других воркеров (``invalidation_bus.listening``), кэш не читается
+    и не наполняется: чтения идут в БД (счётчик ``bypasses``).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, enabled: bool = True) -> None:
+        super().__init__(maxsize, ttl, enabled)
+        self.generation = 0
+        self.bypasses = 0
+
+    def get_team(self, team_name: str) -> TeamSnapshot | None:
+        if not invalidation_bus.listening:
+            self.bypasses += 1
+            return None
+        return self.get(('team', team_name))
+
+    def set_team(self, team: TeamSnapshot, generation: int) -> None:
+        if generation == self.generation and invalidation_bus.listening:
+            self.set(('team', team.team_name), team)
+
+    def invalidate_teams(self, team_names: Iterable[str]) -> None:
+        self.generation += 1
+        for team_name in team_names:
+            self.delete(('team', team_name))
+
+    def clear(self) -> None:
+        self.generation += 1
+        super().clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return {**super().stats(), 'bypasses': self.bypasses}
+
+
+roster_cache = RosterCache(
+    maxsize=settings.ROSTER_CACHE_SIZE,
+    ttl=settings.ROSTER_CACHE_TTL,
+    enabled=settings.ROSTER_CACHE_ENABLED,
+)
+
+invalidation_bus.subscribe(TEAM, roster_cache.invalidate_teams)
+invalidation_bus.subscribe_flush(roster_cache.clear)
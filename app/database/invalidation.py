@@ -0,0 +1,234 @@
+"""
+Шина инвалидации in-process кэшей между воркерами через Postgres LISTEN/NOTIFY.
+
+Репозитории сообщают об изменениях (команды, пользователи, PR) через ``invalidation_bus.publish``.
+Локальные кэши сбрасываются сразу и ещё раз после COMMIT, а остальные процессы получают
+одно NOTIFY на транзакцию: Postgres доставляет его только после успешного коммита.
+Пока LISTEN-соединение не подписано, события других воркеров не приходят, и кэши не используются
+(см. ``InvalidationBus.listening``).
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from collections.abc import Callable, Iterable
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+CHANNEL = 'cache_invalidation'
+# Лимит payload у NOTIFY - 8000 байт; при превышении отправляем полный сброс
+MAX_PAYLOAD_BYTES = 7900
+
+TEAM = 'team'
+USER = 'user'
+PULL_REQUEST = 'pull_request'
+KINDS = (TEAM, USER, PULL_REQUEST)
+
+_PENDING_KEY = 'invalidation_events'
+
+Handler = Callable[[Iterable[str]], None]
+FlushHandler = Callable[[], None]
+
+
+class InvalidationBus:
+    """Рассылает события изменений локальным кэшам и остальным воркерам."""
+
+    def __init__(self) -> None:
+        self.origin = uuid.uuid4().hex
+        # Кэшам можно отвечать и наполняться. False, пока запущенный listener не подписан на канал:
+        # события других воркеров в это время теряются. Без listener (один процесс) всегда True
+        self.listening = True
+        self._handlers: dict[str, list[Handler]] = {kind: [] for kind in KINDS}
+        self._flush_handlers: list[FlushHandler] = []
+
+    def subscribe(self, kind: str, handler: Handler) -> None:
+        """Подписать обработчик на ключи указанного вида (``team``, ``user``, ``pull_request``)."""
+        self._handlers[kind].append(handler)
+
+    def subscribe_flush(self, handler: FlushHandler) -> None:
+        """Подписать обработчик полного сброса кэша."""
+        self._flush_handlers.append(handler)
+
+    def publish(
+        self,
+        session: AsyncSession,
+        teams: Iterable[str] = (),
+        user_ids: Iterable[str] = (),
+        pull_request_ids: Iterable[str] = (),
+        flush: bool = False,
+    ) -> None:
+        """
+        Сообщить об изменениях в транзакции ``session``.
+
+        События без подписчиков отбрасываются: все воркеры запускают один и тот же код,
+        поэтому отсутствие локального кэша означает, что его нет и у остальных.
+        """
+        events = {
+            TEAM: set(teams) if self._handlers[TEAM] else set(),
+            USER: set(user_ids) if self._handlers[USER] else set(),
+            PULL_REQUEST: set(pull_request_ids) if self._handlers[PULL_REQUEST] else set(),
+        }
+        flush = flush and bool(self._flush_handlers)
+        if not flush and not any(events.values()):
+            return
+
+        self._apply(events, flush)
+
+        sync_session = session.sync_session
+        pending = sync_session.info.get(_PENDING_KEY)
+        if pending is None:
+            pending = {'flush': False, **{kind: set() for kind in KINDS}}
+            sync_session.info[_PENDING_KEY] = pending
+            event.listen(sync_session, 'before_commit', self._notify, once=True)
+            event.listen(sync_session, 'after_commit', self._apply_pending, once=True)
+            event.listen(sync_session, 'after_rollback', self._discard_pending, once=True)
+
+        pending['flush'] = pending['flush'] or flush
+        for kind, keys in events.items():
+            pending[kind] |= keys
+
+    def flush_local(self) -> None:
+        """Полностью сбросить локальные кэши (например, после потери LISTEN-соединения)."""
+        for handler in self._flush_handlers:
+            handler()
+
+    def handle_payload(self, payload: str) -> None:
+        """Применить событие, полученное от другого воркера."""
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f'malformed cache invalidation payload, flushing: {payload[:200]!r}')
+            self.flush_local()
+            return
+
+        if message.get('origin') == self.origin:
+            return
+        self._apply({kind: message.get(kind, ()) for kind in KINDS}, bool(message.get('flush')))
+
+    def _apply(self, events: dict[str, Iterable[str]], flush: bool) -> None:
+        if flush:
+            self.flush_local()
+            return
+        for kind, keys in events.items():
+            if keys:
+                for handler in self._handlers[kind]:
+                    handler(keys)
+
+    def _notify(self, sync_session: Session) -> None:
+        pending = sync_session.info.get(_PENDING_KEY)
+        if pending is None or pending.get('notified'):
+            return
+        pending['notified'] = True
+
+        message: dict[str, object] = {'origin': self.origin, 'flush': pending['flush']}
+        if not pending['flush']:
+            message.update({kind: sorted(pending[kind]) for kind in KINDS if pending[kind]})
+        payload = json.dumps(message, separators=(',', ':'))
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            payload = json.dumps({'origin': self.origin, 'flush': True}, separators=(',', ':'))
+
+        sync_session.execute(select(func.pg_notify(CHANNEL, payload)))
+
+    def _apply_pending(self, sync_session: Session) -> None:
+        pending = sync_session.info.pop(_PENDING_KEY, None)
+        if pending is not None:
+            self._apply({kind: pending[kind] for kind in KINDS}, pending['flush'])
+
+    def _discard_pending(self, sync_session: Session) -> None:
+        sync_session.info.pop(_PENDING_KEY, None)
+
+
+class InvalidationListener:
+    """
+    Держит отдельное LISTEN-соединение и применяет события других воркеров.
+
+    При потере соединения кэши сбрасываются полностью (события могли быть пропущены) и не используются,
+    пока соединение не восстановится (с экспоненциальной задержкой) и не подпишется на канал заново.
+    """
+
+    def __init__(
+        self,
+        bus: InvalidationBus,
+        dsn: str,
+        health_check_interval: float = 30.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.bus = bus
+        self.dsn = dsn
+        self.health_check_interval = health_check_interval
+        self.max_backoff = max_backoff
+        self.connected = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self.bus.listening = False
+        self._task = asyncio.create_task(self._run(), name='cache-invalidation-listener')
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f'cache invalidation listener disconnected: {e!r}')
+            finally:
+                if self.connected.is_set():
+                    backoff = 0.5
+                self.connected.clear()
+                self.bus.listening = False
+                self.bus.flush_local()
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _listen(self) -> None:
+        # По имени приложения соединение видно в pg_stat_activity
+        connection = await asyncpg.connect(
+            self.dsn,
+            server_settings={'application_name': f'cache-invalidation-listener:{os.getpid()}'},
+        )
+        try:
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(CHANNEL, self._on_notification)
+            # События, пришедшие до подписки, потеряны: начинаем с чистого кэша
+            self.bus.flush_local()
+            self.bus.listening = True
+            self.connected.set()
+            logger.info('cache invalidation listener connected')
+
+            while True:
+                try:
+                    await asyncio.wait_for(lost.wait(), timeout=self.health_check_interval)
+                    raise ConnectionError('listen connection terminated')
+                except TimeoutError:
+                    await connection.fetchval('SELECT 1', timeout=self.health_check_interval)
+        finally:
+            if not connection.is_closed():
+                connection.terminate()
+
+    def _on_notification(self, _connection: object, _pid: int, _channel: str, payload: str) -> None:
+        self.bus.handle_payload(payload)
+
+
+invalidation_bus = InvalidationBus()
+
+invalidation_listener = InvalidationListener(
+    bus=invalidation_bus,
+    dsn=settings.PG_URL.replace('postgresql+asyncpg://', 'postgresql://', 1),
+)
@@ -0,0 +1,325 @@
+"""
+Хранилище данных в памяти процесса для ``REPOSITORY_BACKEND=memory``.
+
+Таблицы - словари по первичному ключу, индексы (участники команды, PR автора, назначения ревьювера)
+поддерживаются вместе с ними. Ограничения повторяют схему БД: повтор первичного ключа и ссылка
+на несуществующую строку - ``IntegrityError``, удаление команды, пользователя или PR каскадно удаляет
+зависимые строки. Изменения записываются в журнал отката сессии: при ошибке внутри ``MemoryUnitOfWork``
+они отменяются, как ROLLBACK. Транзакции сериализуются одной блокировкой хранилища.
+"""
+
+import asyncio
+import functools
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from typing import TypeVar
+
+from sqlalchemy.exc import IntegrityError
+
+from app.database.base import UnitOfWork
+from app.database.models import PRStatus, ReviewerAssignmentMode
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+@dataclass(frozen=True, slots=True)
+class TeamRow:
+    team_name: str
+    assignment_mode: str
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class UserRow:
+    user_id: str
+    username: str
+    team_name: str
+    is_active: bool
+    open_reviews: int
+    merged_reviews: int
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class PullRequestRow:
+    pull_request_id: str
+    pull_request_name: str
+    author_id: str
+    status: str
+    created_at: datetime
+    merged_at: datetime | None = None
+
+
+def _violation(statement: str, message: str) -> IntegrityError:
+    """Ошибка нарушения ограничения в том же виде, что отдаёт SQLAlchemy для Postgres."""
+    return IntegrityError(statement, None, ValueError(message))
+
+
+class MemoryStore:
+    """Таблицы и индексы. Строки неизменяемые: изменение - замена строки целиком."""
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Удалить все данные (например, между тестами)."""
+        self.teams: dict[str, TeamRow] = {}
+        self.users: dict[str, UserRow] = {}
+        self.pull_requests: dict[str, PullRequestRow] = {}
+        # Ревьюверы PR в порядке назначения
+        self.reviewers: defaultdict[str, dict[str, None]] = defaultdict(dict)
+        self.pull_request_stats: Counter[tuple[str, int]] = Counter()
+        # Индексы: участники команды, PR автора, PR, где пользователь назначен ревьювером
+        self.team_members: defaultdict[str, set[str]] = defaultdict(set)
+        self.authored: defaultdict[str, set[str]] = defaultdict(set)
+        self.assigned: defaultdict[str, set[str]] = defaultdict(set)
+
+    def set_team(self, team_name: str, team: TeamRow | None) -> None:
+        if team is None:
+            self.teams.pop(team_name, None)
+        else:
+            self.teams[team_name] = team
+
+    def set_user(self, user_id: str, user: UserRow | None) -> None:
+        old = self.users.pop(user_id, None)
+        if old is not None:
+            self.team_members[old.team_name].discard(user_id)
+        if user is not None:
+            self.users[user_id] = user
+            self.team_members[user.team_name].add(user_id)
+
+    def set_pull_request(self, pull_request_id: str, pr: PullRequestRow | None) -> None:
+        old = self.pull_requests.pop(pull_request_id, None)
+        if old is not None:
+            self.authored[old.author_id].discard(pull_request_id)
+        if pr is not None:
+            self.pull_requests[pull_request_id] = pr
+            self.authored[pr.author_id].add(pull_request_id)
+
+    def set_reviewer(self, key: tuple[str, str], assigned: bool | None) -> None:
+        pull_request_id, user_id = key
+        if assigned:
+            self.reviewers[pull_request_id][user_id] = None
+            self.assigned[user_id].add(pull_request_id)
+        else:
+            self.reviewers.get(pull_request_id, {}).pop(user_id, None)
+            self.assigned[user_id].discard(pull_request_id)
+
+    def set_stats(self, key: tuple[str, int], pull_requests: int | None) -> None:
+        if pull_requests is None:
+            self.pull_request_stats.pop(key, None)
+        else:
+            self.pull_request_stats[key] = pull_requests
+
+
+memory_store = MemoryStore()
+
+
+class MemorySession:
+    """
+    Аналог сессии БД для памяти: чтение через ``store``, изменения через методы сессии.
+
+    Каждое изменение добавляет в журнал отката обратную операцию; ``now`` - время начала
+    транзакции, как ``now()`` в Postgres.
+    """
+
+    def __init__(self, store: MemoryStore = memory_store) -> None:
+        self.store = store
+        self.now = datetime.now(UTC).replace(tzinfo=None)
+        self._undo: list[Callable[[], None]] = []
+
+    def commit(self) -> None:
+        self._undo.clear()
+
+    def rollback(self) -> None:
+        while self._undo:
+            self._undo.pop()()
+
+    def _change(self, setter: Callable[[K, V | None], None], key: K, old: V | None, new: V | None) -> None:
+        setter(key, new)
+        self._undo.append(lambda: setter(key, old))
+
+    def insert_team(self, team_name: str, assignment_mode: str = ReviewerAssignmentMode.RANDOM.value) -> TeamRow:
+        if team_name in self.store.teams:
+            raise _violation('INSERT INTO teams', f'duplicate key value violates "teams_pkey": {team_name}')
+        team = TeamRow(team_name=team_name, assignment_mode=assignment_mode, created_at=self.now)
+        self._change(self.store.set_team, team_name, None, team)
+        return team
+
+    def put_user(self, user_id: str, username: str, team_name: str, is_active: bool) -> UserRow:
+        """Создать пользователя или обновить его поля (счётчики и ``created_at`` сохраняются)."""
+        if team_name not in self.store.teams:
+            raise _violation('INSERT INTO users', f'team_name "{team_name}" is not present in table "teams"')
+        old = self.store.users.get(user_id)
+        if old is None:
+            user = UserRow(
+                user_id, username, team_name, is_active, open_reviews=0, merged_reviews=0, created_at=self.now
+            )
+        else:
+            user = replace(old, username=username, team_name=team_name, is_active=is_active)
+        self._change(self.store.set_user, user_id, old, user)
+        return user
+
+    def update_user(self, user_id: str, **values: object) -> UserRow:
+        old = self.store.users[user_id]
+        user = replace(old, **values)
+        self._change(self.store.set_user, user_id, old, user)
+        return user
+
+    def add_reviews(self, user_id: str, open_delta: int, merged_delta: int = 0) -> None:
+        """Изменить счётчики открытых и слитых ревью пользователя."""
+        user = self.store.users.get(user_id)
+        if user is not None:
+            self.update_user(
+                user_id,
+                open_reviews=user.open_reviews + open_delta,
+                merged_reviews=user.merged_reviews + merged_delta,
+            )
+
+    def insert_pull_request(self, pull_request_id: str, pull_request_name: str, author_id: str) -> PullRequestRow:
+        if pull_request_id in self.store.pull_requests:
+            raise _violation(
+                'INSERT INTO pull_requests',
+                f'duplicate key value violates "pull_requests_pkey": {pull_request_id}',
+            )
+        if author_id not in self.store.users:
+            raise _violation('INSERT INTO pull_requests', f'author_id "{author_id}" is not present in table "users"')
+        pr = PullRequestRow(pull_request_id, pull_request_name, author_id, PRStatus.OPEN.value, created_at=self.now)
+        self._change(self.store.set_pull_request, pull_request_id, None, pr)
+        return pr
+
+    def update_pull_request(self, pull_request_id: str, **values: object) -> PullRequestRow:
+        old = self.store.pull_requests[pull_request_id]
+        pr = replace(old, **values)
+        self._change(self.store.set_pull_request, pull_request_id, old, pr)
+        return pr
+
+    def insert_reviewer(self, pull_request_id: str, user_id: str) -> None:
+        if user_id in self.store.reviewers.get(pull_request_id, ()):
+            raise _violation(
+                'INSERT INTO pull_request_reviewers',
+                f'duplicate key value violates "pull_request_reviewers_pkey": ({pull_request_id}, {user_id})',
+            )
+        if pull_request_id not in self.store.pull_requests or user_id not in self.store.users:
+            raise _violation(
+                'INSERT INTO pull_request_reviewers',
+                f'({pull_request_id}, {user_id}) references a missing pull request or user',
+            )
+        self._change(self.store.set_reviewer, (pull_request_id, user_id), False, True)
+
+    def delete_reviewer(self, pull_request_id: str, user_id: str) -> bool:
+        """:returns: Было ли такое назначение."""
+        if user_id not in self.store.reviewers.get(pull_request_id, ()):
+            return False
+        self._change(self.store.set_reviewer, (pull_request_id, user_id), True, False)
+        return True
+
+    def add_pull_request_stats(self, key: tuple[str, int], delta: int) -> None:
+        old = self.store.pull_request_stats.get(key)
+        self._change(self.store.set_stats, key, old, (old or 0) + delta)
+
+    def replace_pull_request_stats(self, stats: Counter[tuple[str, int]]) -> None:
+        for key in list(self.store.pull_request_stats):
+            self._change(self.store.set_stats, key, self.store.pull_request_stats[key], None)
+        for key, pull_requests in stats.items():
+            self._change(self.store.set_stats, key, None, pull_requests)
+
+    def delete_pull_request(self, pull_request_id: str) -> None:
+        """Удалить PR вместе с назначениями ревьюверов (ON DELETE CASCADE)."""
+        for user_id in list(self.store.reviewers.get(pull_request_id, ())):
+            self.delete_reviewer(pull_request_id, user_id)
+        self._change(self.store.set_pull_request, pull_request_id, self.store.pull_requests[pull_request_id], None)
+
+    def delete_user(self, user_id: str) -> None:
+        """Удалить пользователя вместе с его PR и назначениями (ON DELETE CASCADE)."""
+        for pull_request_id in list(self.store.authored.get(user_id, ())):
+            self.delete_pull_request(pull_request_id)
+        for pull_request_id in list(self.store.assigned.get(user_id, ())):
+            self.delete_reviewer(pull_request_id, user_id)
+        self._change(self.store.set_user, user_id, self.store.users[user_id], None)
+
+    def delete_team(self, team_name: str) -> None:
+        """Удалить команду вместе с участниками и всем, что от них зависит (ON DELETE CASCADE)."""
+        for user_id in list(self.store.team_members.get(team_name, ())):
+            self.delete_user(user_id)
+        self._change(self.store.set_team, team_name, self.store.teams[team_name], None)
+
+
+# Сессия открытой MemoryUnitOfWork (аналог current_session для БД)
+current_memory_session: ContextVar[MemorySession | None] = ContextVar('current_memory_session', default=None)
+
+
+class MemoryUnitOfWork(UnitOfWork):
+    """
+    Единица работы над ``MemoryStore`` с тем же контрактом, что ``UnitOfWork``.
+
+    Внешняя единица работы держит блокировку хранилища до конца и при исключении откатывает
+    свои изменения; вложенные присоединяются к ней. ``read_only`` принимается для совместимости.
+    """
+
+    def __init__(self, store: MemoryStore = memory_store, *, read_only: bool = False) -> None:
+        self.store = store
+        self.read_only = read_only
+        self.session: MemorySession | None = None  # type: ignore
+        self._outer = False
+        self._token: Token[MemorySession | None] | None = None  # type: ignore
+
+    async def __aenter__(self) -> MemorySession:  # type: ignore
+        session = current_memory_session.get()
+        if session is not None:
+            self.session = session
+            return session
+
+        await self.store.lock.acquire()
+        self.session = MemorySession(self.store)
+        self._outer = True
+        self._token = current_memory_session.set(self.session)
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+        assert self.session is not None
+        if not self._outer:
+            self.session = None
+            return
+        try:
+            if exc_type is None:
+                self.session.commit()
+            else:
+                self.session.rollback()
+        finally:
+            assert self._token is not None
+            current_memory_session.reset(self._token)
+            self.store.lock.release()
+            self.session = None
+            self._outer = False
+            self._token = None
+
+
+# Декораторы методов репозиториев в памяти, аналоги with_session / with_session_commit
+def with_memory_session(func):  # noqa
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):  # noqa
+        # Чтение не меняет данные: вне единицы работы хватает сессии без блокировки
+        kwargs['session'] = kwargs.get('session') or current_memory_session.get() or MemorySession()
+        return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def with_memory_session_commit(func):  # noqa
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):  # noqa
+        session = kwargs.get('session') or current_memory_session.get()
+        if session is not None:
+            kwargs['session'] = session
+            return await func(self, *args, **kwargs)
+        async with MemoryUnitOfWork() as session:
+            kwargs['session'] = session
+            return await func(self, *args, **kwargs)
+
+    return wrapper
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import StrEnum
 
-from sqlalchemy import TIMESTAMP, Boolean, ForeignKey, String, func
+from sqlalchemy import TIMESTAMP, Boolean, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -16,12 +16,25 @@ class PRStatus(StrEnum):
     MERGED = 'MERGED'
 
 
+class ReviewerAssignmentMode(StrEnum):
+    """Стратегия выбора ревьюверов в команде."""
+
+    RANDOM = 'RANDOM'
+    LEAST_LOADED = 'LEAST_LOADED'
+
+
 class Team(Base):
     """Модель команды."""
 
     __tablename__ = 'teams'
 
     team_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    assignment_mode: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default=ReviewerAssignmentMode.RANDOM.value,
+        server_default=ReviewerAssignmentMode.RANDOM.value,
+    )
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=func.now())
 
     members: Mapped[list['User']] = relationship('User', back_populates='team')
@@ -31,10 +44,20 @@ class User(Base):
     """Модель пользователя (участника команды)."""
 
     __tablename__ = 'users'
+    __table_args__ = (
+        Index('ix_users_team_name', 'team_name'),
+        # Частичный индекс под выборку активных кандидатов в ревьюверы. open_reviews в индексы не входит:
+        # иначе ни одно обновление счётчиков не было бы HOT
+        Index('ix_users_team_name_active', 'team_name', 'user_id', postgresql_where=text('is_active = true')),
+    )
 
     user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
     username: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, server_default='true')
+    # Число назначенных OPEN PR; поддерживается в тех же транзакциях, что create/reassign/merge
+    open_reviews: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    # Число назначений на уже слитые PR; поддерживается вместе с open_reviews
+    merged_reviews: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=func.now())
     team_name: Mapped[str] = mapped_column(
         String(255),
@@ -53,6 +76,15 @@ class PullRequest(Base):
     """Модель Pull Request."""
 
     __tablename__ = 'pull_requests'
+    __table_args__ = (
+        Index('ix_pull_requests_author_id', 'author_id'),
+        # Покрывающий индекс для index-only выборки списка ревью пользователя
+        Index(
+            'ix_pull_requests_review_projection',
+            'pull_request_id',
+            postgresql_include=['status', 'author_id', 'pull_request_name'],
+        ),
+    )
 
     pull_request_id: Mapped[str] = mapped_column(String(255), primary_key=True)
     pull_request_name: Mapped[str] = mapped_column(String(500), nullable=False)
@@ -71,6 +103,7 @@ class PullRequestReviewer(Base):
     """Связующая таблица для назначенных ревьюверов PR (многие-ко-многим)."""
 
     __tablename__ = 'pull_request_reviewers'
+    __table_args__ = (Index('ix_pull_request_reviewers_user_id', 'user_id', 'pull_request_id'),)
 
     assigned_at: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False, server_default=func.now())
     pull_request_id: Mapped[str] = mapped_column(
@@ -86,3 +119,20 @@ class PullRequestReviewer(Base):
 
     pull_request: Mapped['PullRequest'] = relationship('PullRequest', back_populates='reviewer_assignments')
     reviewer: Mapped['User'] = relationship('User', back_populates='assigned_reviews')
+
+
+class PullRequestStats(Base):
+    """
+    Агрегат количества PR по статусу и числу ревьюверов.
+
+    Поддерживается в тех же транзакциях, что create/merge. Каждая комбинация
+    разбита на ``shard`` строк, чтобы параллельные транзакции не упирались в одну строку;
+    при чтении шарды суммируются.
+    """
+
+    __tablename__ = 'pull_request_stats'
+
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    reviewer_count: Mapped[int] = mapped_column(Integer, primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    pull_requests: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
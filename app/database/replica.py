@@ -0,0 +1,143 @@
+"""
+Чтение с реплики с гарантией read-your-writes.
+
+Если настроена реплика (``POSTGRES_REPLICA_HOST``), сессии только для чтения (``with_session`` без
+открытой UnitOfWork и ``UnitOfWork(read_only=True)``) открываются на ней. После транзакции с изменениями
+клиент получает в заголовке ``X-Consistency-Token`` позицию WAL основного сервера. Передав её в следующем
+запросе, он читает с реплики, только если та уже воспроизвела WAL до этой позиции; иначе запрос ждёт
+реплику не дольше ``DB_REPLICA_MAX_WAIT`` и читает с основного сервера.
+"""
+
+import asyncio
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.metrics import Counter, registry
+
+CONSISTENCY_HEADER = 'X-Consistency-Token'
+
+# Пауза между проверками позиции реплики при ожидании
+_POLL_INTERVAL = 0.01
+
+db_reads_total = registry.register(
+    Counter('db_reads_total', 'Read-only sessions by the server they were routed to', ('target',)),
+)
+
+
+def parse_lsn(value: str) -> int:
+    """
+    Позиция WAL из текстового вида Postgres (``16/B374D848``) в число.
+
+    :raises ValueError: Строка не является позицией WAL.
+    """
+    high, low = value.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def format_lsn(lsn: int) -> str:
+    return f'{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}'
+
+
+@dataclass(slots=True)
+class ConsistencyState:
+    """Позиция WAL, которую должны видеть чтения текущего HTTP-запроса."""
+
+    min_lsn: int | None = None
+
+    def observe_commit(self, lsn: int) -> None:
+        """Учесть коммит запроса: следующие чтения должны видеть и его."""
+        self.min_lsn = lsn if self.min_lsn is None else max(self.min_lsn, lsn)
+
+
+consistency: ContextVar[ConsistencyState | None] = ContextVar('consistency', default=None)
+
+
+@contextmanager
+def consistency_scope(token: str | None) -> Iterator[ConsistencyState]:
+    """Состояние read-your-writes на время запроса; некорректный токен игнорируется."""
+    state = ConsistencyState()
+    if token:
+        try:
+            state.min_lsn = parse_lsn(token)
+        except ValueError:
+            logger.warning(f'Ignoring malformed {CONSISTENCY_HEADER}: {token!r}')
+    reset_token = consistency.set(state)
+    try:
+        yield state
+    finally:
+        consistency.reset(reset_token)
+
+
+class ReplicaRouter:
+    """
+    Выбор сервера для сессии только для чтения.
+
+    Позиция воспроизведения реплики кэшируется и перечитывается, только когда токен клиента её
+    обгоняет; параллельные запросы ждут одну проверку. Недоступная реплика - чтение с основного сервера.
+    """
+
+    def __init__(self, engine: AsyncEngine | None, max_wait: float = 0.0) -> None:
+        self.engine = engine
+        self.max_wait = max_wait
+        self.replay_lsn = -1
+        self._sessions = async_sessionmaker(bind=engine, expire_on_commit=False) if engine is not None else None
+        self._refreshing: asyncio.Task[None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def session(self) -> AsyncSession:
+        assert self._sessions is not None
+        return self._sessions()
+
+    async def use_replica(self) -> bool:
+        """Можно ли читать с реплики с учётом токена текущего запроса."""
+        if not self.enabled:
+            return False
+        state = consistency.get()
+        required = state.min_lsn if state is not None else None
+        if required is None or self.replay_lsn >= required:
+            db_reads_total.inc('replica')
+            return True
+
+        give_up = time.monotonic() + self.max_wait
+        while True:
+            await self._refresh()
+            if self.replay_lsn >= required:
+                db_reads_total.inc('replica')
+                return True
+            if time.monotonic() >= give_up:
+                db_reads_total.inc('primary')
+                return False
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    async def _refresh(self) -> None:
+        if self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._fetch_replay_lsn())
+            self._refreshing.add_done_callback(self._refreshed)
+        # shield: отмена одного ожидающего запроса не отменяет общую проверку
+        await asyncio.shield(self._refreshing)
+
+    def _refreshed(self, _task: asyncio.Task[None]) -> None:
+        self._refreshing = None
+
+    async def _fetch_replay_lsn(self) -> None:
+        assert self.engine is not None
+        try:
+            # AUTOCOMMIT: один запрос без BEGIN/ROLLBACK
+            async with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
+                value = (await conn.execute(text('SELECT pg_last_wal_replay_lsn()::text'))).scalar_one()
+        except (OSError, SQLAlchemyError) as e:
+            logger.warning(f'Replica position check failed, reading from primary: {e}')
+            return
+        # NULL - сервер не в режиме восстановления (реплику повысили): токены на нём не проверить
+        self.replay_lsn = parse_lsn(value) if value is not None else -1
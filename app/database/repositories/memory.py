@@ -0,0 +1,492 @@
+"""
+Репозитории поверх ``MemoryStore`` для ``REPOSITORY_BACKEND=memory``.
+
+Наследуют репозитории БД и повторяют их контракт: те же аргументы, поля возвращаемых строк,
+порядок выдачи, выбор ревьюверов по стратегии команды и поддержка счётчиков и агрегатов в той же
+транзакции. Кэш составов команд и инвалидация не используются: чтение из памяти дешевле кэша.
+"""
+
+import secrets
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime
+from typing import NamedTuple
+
+from app.database.cache import MemberSnapshot, TeamSnapshot
+from app.database.memory import (
+    MemorySession,
+    PullRequestRow,
+    TeamRow,
+    UserRow,
+    with_memory_session,
+    with_memory_session_commit,
+)
+from app.database.models import PRStatus, ReviewerAssignmentMode
+from app.database.repositories.pull_request import PullRequestRepo
+from app.database.repositories.stats import StatsRepo
+from app.database.repositories.team import TeamRepo
+from app.database.repositories.user import UserRepo
+
+_random = secrets.SystemRandom()
+
+
+class PullRequestWithReviewers(NamedTuple):
+    pull_request_id: str
+    pull_request_name: str
+    author_id: str
+    status: str
+    created_at: datetime
+    merged_at: datetime | None
+    assigned_reviewers: list[str]
+    merged_now: bool = False
+
+
+class CreatedPullRequest(NamedTuple):
+    author_found: bool
+    pr_existed: bool
+    pull_request_id: str | None
+    pull_request_name: str | None
+    author_id: str | None
+    status: str | None
+    created_at: datetime | None
+    merged_at: datetime | None
+    assigned_reviewers: list[str]
+
+
+class OpenAssignment(NamedTuple):
+    pull_request_id: str
+    user_id: str
+    author_id: str
+    team_name: str
+
+
+class RosterMember(NamedTuple):
+    user_id: str
+    team_name: str
+    open_reviews: int
+    assignment_mode: str
+
+
+class PullRequestStatsRow(NamedTuple):
+    status: str
+    reviewer_count: int
+    pull_requests: int
+
+
+def _active_members(session: MemorySession, team_name: str) -> list[UserRow]:
+    """Активные участники команды в порядке ``user_id``."""
+    users = session.store.users
+    members = (users[user_id] for user_id in session.store.team_members.get(team_name, ()))
+    return sorted((user for user in members if user.is_active), key=lambda user: user.user_id)
+
+
+def _pick_candidates(session: MemorySession, team_name: str, exclude: Iterable[str], limit: int) -> list[str]:
+    """Выбрать до ``limit`` активных участников команды не из ``exclude`` по стратегии команды."""
+    excluded = set(exclude)
+    candidates = [user for user in _active_members(session, team_name) if user.user_id not in excluded]
+    if session.store.teams[team_name].assignment_mode == ReviewerAssignmentMode.LEAST_LOADED.value:
+        shuffled = _random.sample(candidates, len(candidates))
+        selected = sorted(shuffled, key=lambda user: user.open_reviews)[:limit]
+    else:
+        selected = _random.sample(candidates, min(len(candidates), limit))
+    return [user.user_id for user in selected]
+
+
+def _with_reviewers(session: MemorySession, pr: PullRequestRow, merged_now: bool = False) -> PullRequestWithReviewers:
+    reviewers = list(session.store.reviewers.get(pr.pull_request_id, ()))
+    return PullRequestWithReviewers(
+        pr.pull_request_id,
+        pr.pull_request_name,
+        pr.author_id,
+        pr.status,
+        pr.created_at,
+        pr.merged_at,
+        reviewers,
+        merged_now,
+    )
+
+
+class MemoryPullRequestRepo(PullRequestRepo):
+    """Репозиторий Pull Requests в памяти."""
+
+    @with_memory_session
+    async def get_with_reviewers(
+        self,
+        pull_request_id: str,
+        session: MemorySession | None = None,
+    ) -> PullRequestWithReviewers | None:
+        pr = session.store.pull_requests.get(pull_request_id)  # type: ignore
+        return _with_reviewers(session, pr) if pr is not None else None  # type: ignore
+
+    @with_memory_session_commit
+    async def create_with_reviewers(
+        self,
+        pull_request_id: str,
+        pull_request_name: str,
+        author_id: str,
+        max_reviewers: int = 2,
+        session: MemorySession | None = None,
+    ) -> CreatedPullRequest:
+        author = session.store.users.get(author_id)  # type: ignore
+        pr_existed = pull_request_id in session.store.pull_requests  # type: ignore
+        if author is None or pr_existed:
+            return CreatedPullRequest(author is not None, pr_existed, None, None, None, None, None, None, [])
+
+        pr = session.insert_pull_request(pull_request_id, pull_request_name, author_id)  # type: ignore
+        reviewers = _pick_candidates(session, author.team_name, [author_id], max_reviewers)  # type: ignore
+        for user_id in reviewers:
+            session.insert_reviewer(pull_request_id, user_id)  # type: ignore
+            session.add_reviews(user_id, 1)  # type: ignore
+        session.add_pull_request_stats((PRStatus.OPEN.value, len(reviewers)), 1)  # type: ignore
+        return CreatedPullRequest(True, False, *_with_reviewers(session, pr)[:-1])  # type: ignore
+
+    @with_memory_session
+    async def get_existing_ids(
+        self,
+        pull_request_ids: list[str],
+        session: MemorySession | None = None,
+    ) -> set[str]:
+        return {pr_id for pr_id in pull_request_ids if pr_id in session.store.pull_requests}  # type: ignore
+
+    @with_memory_session_commit
+    async def create_many(
+        self,
+        pull_requests: list[tuple[str, str, str]],
+        session: MemorySession | None = None,
+    ) -> list[PullRequestRow]:
+        return [
+            session.insert_pull_request(pr_id, name, author_id)  # type: ignore
+            for pr_id, name, author_id in pull_requests
+            if pr_id not in session.store.pull_requests  # type: ignore
+        ]
+
+    @with_memory_session_commit
+    async def add_reviewers(
+        self,
+        assignments: list[tuple[str, str]],
+        session: MemorySession | None = None,
+    ) -> None:
+        for pr_id, user_id in assignments:
+            session.insert_reviewer(pr_id, user_id)  # type: ignore
+            session.add_reviews(user_id, 1)  # type: ignore
+
+    @with_memory_session_commit
+    async def remove_reviewers(
+        self,
+        assignments: list[tuple[str, str]],
+        session: MemorySession | None = None,
+    ) -> None:
+        # Как и в БД, счётчик уменьшается только по реально удалённым назначениям
+        for pr_id, user_id in assignments:
+            if session.delete_reviewer(pr_id, user_id):  # type: ignore
+                session.add_reviews(user_id, -1)  # type: ignore
+
+    @with_memory_session
+    async def get_open_assignments(
+        self,
+        user_ids: list[str] | None = None,
+        team_name: str | None = None,
+        session: MemorySession | None = None,
+    ) -> list[OpenAssignment]:
+        store = session.store  # type: ignore
+        reviewers = set(user_ids or ())
+        if team_name is not None:
+            reviewers |= store.team_members.get(team_name, set())
+        assignments = []
+        for user_id in reviewers:
+            reviewer = store.users.get(user_id)
+            for pr_id in store.assigned.get(user_id, ()):
+                pr = store.pull_requests[pr_id]
+                if reviewer is not None and pr.status == PRStatus.OPEN.value:
+                    assignments.append(OpenAssignment(pr_id, user_id, pr.author_id, reviewer.team_name))
+        return sorted(assignments)
+
+    @with_memory_session
+    async def get_reviewers_many(
+        self,
+        pull_request_ids: list[str],
+        session: MemorySession | None = None,
+    ) -> dict[str, list[str]]:
+        return {pr_id: list(session.store.reviewers.get(pr_id, ())) for pr_id in pull_request_ids}  # type: ignore
+
+    @with_memory_session
+    async def get_team_rosters(
+        self,
+        team_names: list[str],
+        session: MemorySession | None = None,
+    ) -> list[RosterMember]:
+        return [
+            RosterMember(
+                user.user_id, user.team_name, user.open_reviews, session.store.teams[team_name].assignment_mode
+            )  # type: ignore
+            for team_name in dict.fromkeys(team_names)
+            if team_name in session.store.teams  # type: ignore
+            for user in _active_members(session, team_name)  # type: ignore
+        ]
+
+    @with_memory_session
+    async def get_for_update(
+        self,
+        pull_request_id: str,
+        session: MemorySession | None = None,
+    ) -> PullRequestRow | None:
+        # Изменения сериализует блокировка хранилища, которую держит MemoryUnitOfWork
+        return session.store.pull_requests.get(pull_request_id)  # type: ignore
+
+    @with_memory_session_commit
+    async def swap_reviewer(
+        self,
+        pull_request_id: str,
+        old_user_id: str,
+        exclude_user_ids: list[str],
+        session: MemorySession | None = None,
+    ) -> str | None:
+        old_user = session.store.users.get(old_user_id)  # type: ignore
+        if old_user is None:
+            return None
+        picked = _pick_candidates(session, old_user.team_name, exclude_user_ids, 1)  # type: ignore
+        if not picked or not session.delete_reviewer(pull_request_id, old_user_id):  # type: ignore
+            return None
+
+        session.insert_reviewer(pull_request_id, picked[0])  # type: ignore
+        session.add_reviews(old_user_id, -1)  # type: ignore
+        session.add_reviews(picked[0], 1)  # type: ignore
+        return picked[0]
+
+    @with_memory_session
+    async def get_reviewers(
+        self,
+        pull_request_id: str,
+        session: MemorySession | None = None,
+    ) -> list[str]:
+        return list(session.store.reviewers.get(pull_request_id, ()))  # type: ignore
+
+    @with_memory_session_commit
+    async def merge(
+        self,
+        pull_request_id: str,
+        session: MemorySession | None = None,
+    ) -> PullRequestWithReviewers | None:
+        pr = session.store.pull_requests.get(pull_request_id)  # type: ignore
+        if pr is None:
+            return None
+        if pr.status != PRStatus.OPEN.value:
+            return _with_reviewers(session, pr)  # type: ignore
+
+        pr = session.update_pull_request(pull_request_id, status=PRStatus.MERGED.value, merged_at=session.now)  # type: ignore
+        merged = _with_reviewers(session, pr, merged_now=True)  # type: ignore
+        for user_id in merged.assigned_reviewers:
+            session.add_reviews(user_id, -1, merged_delta=1)  # type: ignore
+        reviewer_count = len(merged.assigned_reviewers)
+        session.add_pull_request_stats((PRStatus.OPEN.value, reviewer_count), -1)  # type: ignore
+        session.add_pull_request_stats((PRStatus.MERGED.value, reviewer_count), 1)  # type: ignore
+        return merged
+
+
+class MemoryUserRepo(UserRepo):
+    """Репозиторий пользователей в памяти."""
+
+    @with_memory_session
+    async def get_by_id(
+        self,
+        user_id: str,
+        session: MemorySession | None = None,
+    ) -> UserRow | None:
+        return session.store.users.get(user_id)  # type: ignore
+
+    @with_memory_session
+    async def get_team_names(
+        self,
+        user_ids: list[str],
+        session: MemorySession | None = None,
+    ) -> dict[str, str]:
+        users = session.store.users  # type: ignore
+        return {user_id: users[user_id].team_name for user_id in user_ids if user_id in users}
+
+    @with_memory_session_commit
+    async def bulk_upsert(
+        self,
+        members: list[tuple[str, str, str, bool]],
+        session: MemorySession | None = None,
+    ) -> int:
+        for member in members:
+            session.put_user(*member)  # type: ignore
+        return len(members)
+
+    @with_memory_session_commit
+    async def update_is_active(
+        self,
+        user_id: str,
+        is_active: bool,
+        session: MemorySession | None = None,
+    ) -> UserRow | None:
+        if user_id not in session.store.users:  # type: ignore
+            return None
+        return session.update_user(user_id, is_active=is_active)  # type: ignore
+
+    @with_memory_session_commit
+    async def deactivate_many(
+        self,
+        user_ids: list[str] | None = None,
+        team_name: str | None = None,
+        session: MemorySession | None = None,
+    ) -> list[str]:
+        store = session.store  # type: ignore
+        matched = {user_id for user_id in user_ids or () if user_id in store.users}
+        if team_name is not None:
+            matched |= store.team_members.get(team_name, set())
+        for user_id in matched:
+            session.update_user(user_id, is_active=False)  # type: ignore
+        return sorted(matched)
+
+    @with_memory_session
+    async def get_assigned_pull_requests(
+        self,
+        user_id: str,
+        status: PRStatus | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        session: MemorySession | None = None,
+    ) -> list[PullRequestRow]:
+        store = session.store  # type: ignore
+        pull_requests = [
+            pr
+            for pr in map(store.pull_requests.__getitem__, sorted(store.assigned.get(user_id, ())))
+            if (status is None or pr.status == status.value) and (after is None or pr.pull_request_id > after)
+        ]
+        return pull_requests[:limit] if limit is not None else pull_requests
+
+    @with_memory_session
+    async def count_assigned_pull_requests(
+        self,
+        user_id: str,
+        status: PRStatus | None = None,
+        session: MemorySession | None = None,
+    ) -> int:
+        store = session.store  # type: ignore
+        pr_ids = store.assigned.get(user_id, ())
+        if status is None:
+            return len(pr_ids)
+        return sum(store.pull_requests[pr_id].status == status.value for pr_id in pr_ids)
+
+    @with_memory_session_commit
+    async def rebuild_review_counters(
+        self,
+        session: MemorySession | None = None,
+    ) -> int:
+        store = session.store  # type: ignore
+        fixed = 0
+        for user in list(store.users.values()):
+            statuses = Counter(store.pull_requests[pr_id].status for pr_id in store.assigned.get(user.user_id, ()))
+            actual = (statuses[PRStatus.OPEN.value], statuses[PRStatus.MERGED.value])
+            if (user.open_reviews, user.merged_reviews) != actual:
+                session.update_user(user.user_id, open_reviews=actual[0], merged_reviews=actual[1])  # type: ignore
+                fixed += 1
+        return fixed
+
+
+class MemoryTeamRepo(TeamRepo):
+    """Репозиторий команд в памяти."""
+
+    @with_memory_session
+    async def get_by_name(
+        self,
+        team_name: str,
+        session: MemorySession | None = None,
+    ) -> TeamSnapshot | None:
+        store = session.store  # type: ignore
+        team = store.teams.get(team_name)
+        if team is None:
+            return None
+        members = sorted(map(store.users.__getitem__, store.team_members.get(team_name, ())), key=lambda u: u.user_id)
+        return TeamSnapshot(
+            team_name=team.team_name,
+            assignment_mode=team.assignment_mode,
+            members=tuple(MemberSnapshot(u.user_id, u.username, u.team_name, u.is_active) for u in members),
+        )
+
+    @with_memory_session
+    async def exists(
+        self,
+        team_name: str,
+        session: MemorySession | None = None,
+    ) -> bool:
+        return team_name in session.store.teams  # type: ignore
+
+    @with_memory_session_commit
+    async def create(
+        self,
+        team_name: str,
+        assignment_mode: ReviewerAssignmentMode = ReviewerAssignmentMode.RANDOM,
+        session: MemorySession | None = None,
+    ) -> TeamRow:
+        return session.insert_team(team_name, assignment_mode.value)  # type: ignore
+
+    @with_memory_session_commit
+    async def create_missing(
+        self,
+        team_names: list[str],
+        session: MemorySession | None = None,
+    ) -> int:
+        missing = [name for name in dict.fromkeys(team_names) if name not in session.store.teams]  # type: ignore
+        for team_name in missing:
+            session.insert_team(team_name)  # type: ignore
+        return len(missing)
+
+
+class MemoryStatsRepo(StatsRepo):
+    """Агрегаты статистики ревью в памяти (без шардов: конкурентных строк нет)."""
+
+    @with_memory_session_commit
+    async def add_pull_requests(
+        self,
+        deltas: dict[tuple[str, int], int],
+        session: MemorySession | None = None,
+    ) -> None:
+        for key, delta in deltas.items():
+            if delta:
+                session.add_pull_request_stats(key, delta)  # type: ignore
+
+    @with_memory_session
+    async def get_pull_request_stats(
+        self,
+        session: MemorySession | None = None,
+    ) -> list[PullRequestStatsRow]:
+        stats = session.store.pull_request_stats  # type: ignore
+        return [
+            PullRequestStatsRow(status, reviewer_count, stats[status, reviewer_count])
+            for status, reviewer_count in sorted(stats, key=lambda key: (key[1], key[0]))
+        ]
+
+    @with_memory_session
+    async def get_user_stats(
+        self,
+        user_id: str,
+        session: MemorySession | None = None,
+    ) -> UserRow | None:
+        return session.store.users.get(user_id)  # type: ignore
+
+    @with_memory_session
+    async def get_team_member_stats(
+        self,
+        team_name: str,
+        session: MemorySession | None = None,
+    ) -> list[UserRow]:
+        store = session.store  # type: ignore
+        return sorted(map(store.users.__getitem__, store.team_members.get(team_name, ())), key=lambda u: u.user_id)
+
+    @with_memory_session_commit
+    async def rebuild_pull_request_stats(
+        self,
+        session: MemorySession | None = None,
+    ) -> int:
+        store = session.store  # type: ignore
+        stats = Counter((pr.status, len(store.reviewers.get(pr_id, ()))) for pr_id, pr in store.pull_requests.items())
+        session.replace_pull_request_stats(stats)  # type: ignore
+        return len(stats)
+
+
+memory_pull_request_repo = MemoryPullRequestRepo()
+memory_user_repo = MemoryUserRepo()
+memory_team_repo = MemoryTeamRepo()
+memory_stats_repo = MemoryStatsRepo()
@@ -1,145 +1,659 @@
-from datetime import datetime
+from collections import Counter
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    CompoundSelect,
+    Integer,
+    Label,
+    Row,
+    Select,
+    String,
+    Update,
+    all_,
+    any_,
+    bindparam,
+    case,
+    cast,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
 
 from app.database.base import BasePgInterface, with_session, with_session_commit
-from app.database.models import PRStatus, PullRequest, PullRequestReviewer, User
+from app.database.invalidation import invalidation_bus
+from app.database.models import (
+    PRStatus,
+    PullRequest,
+    PullRequestReviewer,
+    ReviewerAssignmentMode,
+    Team,
+    User,
+)
+from app.database.repositories.stats import upsert_pull_request_stats
+
+
+def _candidate_order() -> tuple:
+    """Порядок выбора кандидатов: для LEAST_LOADED сначала наименее загруженные, иначе случайно."""
+    return (
+        case((Team.assignment_mode == ReviewerAssignmentMode.LEAST_LOADED.value, User.open_reviews), else_=0),
+        func.random(),
+    )
+
+
+def _user_id_array(user_ids: Select | CompoundSelect) -> ColumnElement:
+    """
+    ID пользователей из подзапроса одним массивом для условия ``User.user_id == any_(...)``.
+
+    Счётчики меняются простым UPDATE по такому условию. Массив считается один раз за запрос
+    (InitPlan), btree обходит ``= ANY(массив)`` в порядке user_id, поэтому строки блокируются
+    в одном порядке во всех транзакциях. Если строку успела изменить параллельная транзакция,
+    перепроверка условия на её новой версии (EvalPlanQual) сравнивает ID с готовым массивом.
+    Отдельный ``SELECT ... FOR NO KEY UPDATE`` по тем же строкам внутри UPDATE здесь не годится:
+    при такой перепроверке строка могла выпасть из UPDATE (приращение терялось), а параллельные
+    запросы ловили дедлок на блокировках версий строк.
+    """
+    # CAST оставляет ANY формой "= ANY(массив)", а не "= ANY(подзапрос)"
+    return cast(select(func.array_agg(user_ids.subquery().c.user_id)).scalar_subquery(), ARRAY(String))
+
+
+def _adjust_open_reviews(user_ids: Select, delta: int, merged_delta: int = 0) -> Update:
+    """
+    Изменить счётчик открытых (и при необходимости слитых) ревью.
+
+    Строки блокируются в порядке user_id, чтобы не ловить дедлоки (см. ``_user_id_array``).
+    """
+    values = {'open_reviews': User.open_reviews + delta}
+    if merged_delta:
+        values['merged_reviews'] = User.merged_reviews + merged_delta
+    return update(User).where(User.user_id == any_(_user_id_array(user_ids))).values(values)
+
+
+def _assigned_reviewers() -> Label:
+    """Коррелированный подзапрос: массив ID ревьюверов PR (пустой, если их нет)."""
+    return (
+        select(func.coalesce(func.array_agg(PullRequestReviewer.user_id), literal([], ARRAY(String))))
+        .where(PullRequestReviewer.pull_request_id == PullRequest.pull_request_id)
+        .scalar_subquery()
+        .label('assigned_reviewers')
+    )
+
+
+def _add_open_reviews() -> Update:
+    """Увеличить счётчики открытых ревью на разные величины одним UPDATE (блокировки в порядке user_id)."""
+    user_ids = bindparam('delta_user_ids', type_=ARRAY(String))
+    rows = (
+        func.unnest(user_ids, bindparam('deltas', type_=ARRAY(Integer)))
+        .table_valued('user_id', 'delta')
+        .render_derived(name='deltas')
+    )
+    return (
+        update(User)
+        .where(User.user_id == rows.c.user_id, User.user_id == any_(user_ids))
+        .values(open_reviews=User.open_reviews + rows.c.delta)
+    )
+
+
+def _open_review_deltas(deltas: dict[str, int]) -> dict[str, list]:
+    """Параметры ``_ADD_OPEN_REVIEWS``: ID в порядке блокировок и соответствующие приращения."""
+    user_ids = sorted(deltas)
+    return {'delta_user_ids': user_ids, 'deltas': [deltas[user_id] for user_id in user_ids]}
+
+
+# Готовые выражения запросов: собираются один раз при импорте, значения передаются через bindparam.
+# Вызов не пересобирает выражение и не пересчитывает ключ кэша компиляции, а одинаковый текст SQL
+# (списки - массивом в ANY, а не IN-списком) переиспользует prepared statement на соединении.
+# Имена параметров не совпадают с колонками: в UPDATE/INSERT SQLAlchemy записал бы такой параметр в SET.
+_PULL_REQUEST_ID = bindparam('pr_id', type_=String)
+_PULL_REQUEST_IDS = bindparam('pr_ids', type_=ARRAY(String))
+_PULL_REQUEST_COLUMNS = (
+    PullRequest.pull_request_id,
+    PullRequest.pull_request_name,
+    PullRequest.author_id,
+    PullRequest.status,
+    PullRequest.created_at,
+    PullRequest.merged_at,
+)
+
+
+def _create_with_reviewers() -> Select:
+    """Выражение ``PullRequestRepo.create_with_reviewers``."""
+    author = select(User.user_id, User.team_name).where(User.user_id == bindparam('author', type_=String)).cte('author')
+
+    new_pr = (
+        pg_insert(PullRequest)
+        .from_select(
+            ['pull_request_id', 'pull_request_name', 'author_id', 'status'],
+            select(
+                _PULL_REQUEST_ID,
+                bindparam('pr_name', type_=String),
+                author.c.user_id,
+                literal(PRStatus.OPEN.value, String),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[PullRequest.pull_request_id])
+        .returning(*_PULL_REQUEST_COLUMNS)
+        .cte('new_pr')
+    )
+
+    candidates = (
+        select(User.user_id)
+        .join(author, User.team_name == author.c.team_name)
+        .join(Team, Team.team_name == author.c.team_name)
+        .where(User.is_active == True, User.user_id != author.c.user_id)  # noqa: E712
+        .order_by(*_candidate_order())
+        .limit(bindparam('max_reviewers', type_=Integer))
+        .cte('candidates')
+    )
+
+    new_reviewers = (
+        insert(PullRequestReviewer)
+        .from_select(
+            ['pull_request_id', 'user_id'],
+            select(new_pr.c.pull_request_id, candidates.c.user_id).select_from(new_pr.join(candidates, true())),
+        )
+        .returning(PullRequestReviewer.user_id)
+        .cte('new_reviewers')
+    )
+
+    reviewer_load = (
+        _adjust_open_reviews(select(new_reviewers.c.user_id), 1).returning(User.user_id).cte('reviewer_load')
+    )
+
+    # Число ревьюверов считается по reviewer_load: агрегат пишется только после блокировок users,
+    # иначе порядок CTE не определён и параллельные create/merge ловят дедлок на строке шарда
+    stats = upsert_pull_request_stats(
+        select(
+            literal(PRStatus.OPEN.value, String).label('status'),
+            select(func.count()).select_from(reviewer_load).scalar_subquery().label('reviewer_count'),
+            literal(1, Integer).label('delta'),
+        )
+        .where(exists(select(new_pr.c.pull_request_id)))
+        .subquery('new_pr_stats')
+    ).cte('pull_request_stats')
+
+    # Одна строка в ответе даже при конфликте: LEFT JOIN к new_pr от фиктивной строки.
+    anchor = values(column('one', Integer), name='anchor').data([(1,)])
+    query = select(
+        exists(select(author.c.user_id)).label('author_found'),
+        exists(select(PullRequest.pull_request_id).where(PullRequest.pull_request_id == _PULL_REQUEST_ID)).label(
+            'pr_existed'
+        ),
+        new_pr.c.pull_request_id,
+        new_pr.c.pull_request_name,
+        new_pr.c.author_id,
+        new_pr.c.status,
+        new_pr.c.created_at,
+        new_pr.c.merged_at,
+        select(func.coalesce(func.array_agg(new_reviewers.c.user_id), literal([], ARRAY(String))))
+        .scalar_subquery()
+        .label('assigned_reviewers'),
+    ).select_from(anchor.outerjoin(new_pr, true()))
+    return query.add_cte(reviewer_load, stats)
+
+
+def _swap_reviewer() -> Select:
+    """Выражение ``PullRequestRepo.swap_reviewer``."""
+    old_user_id = bindparam('old_user_id', type_=String)
+    candidate = (
+        select(User.user_id)
+        .join(Team, Team.team_name == User.team_name)
+        .where(
+            User.team_name == select(User.team_name).where(User.user_id == old_user_id).scalar_subquery(),
+            User.is_active == True,  # noqa: E712
+            User.user_id != all_(bindparam('exclude_user_ids', type_=ARRAY(String))),
+        )
+        .order_by(*_candidate_order())
+        .limit(1)
+        .cte('candidate')
+    )
+
+    removed = (
+        delete(PullRequestReviewer)
+        .where(
+            PullRequestReviewer.pull_request_id == _PULL_REQUEST_ID,
+            PullRequestReviewer.user_id == old_user_id,
+            exists(select(candidate.c.user_id)),
+        )
+        .returning(PullRequestReviewer.user_id)
+        .cte('removed')
+    )
+
+    added = (
+        insert(PullRequestReviewer)
+        .from_select(
+            ['pull_request_id', 'user_id'],
+            select(_PULL_REQUEST_ID, candidate.c.user_id).where(exists(select(removed.c.user_id))),
+        )
+        .returning(PullRequestReviewer.user_id)
+        .cte('added')
+    )
+
+    changed = _user_id_array(union_all(select(removed.c.user_id), select(added.c.user_id)))
+    reviewer_load = (
+        update(User)
+        .where(User.user_id == any_(changed))
+        .values(open_reviews=User.open_reviews + case((User.user_id == old_user_id, -1), else_=1))
+        .returning(User.user_id)
+        .cte('reviewer_load')
+    )
+
+    return select(added.c.user_id).add_cte(reviewer_load)
+
+
+def _merge() -> Select:
+    """Выражение ``PullRequestRepo.merge``."""
+    merged = (
+        update(PullRequest)
+        .where(
+            PullRequest.pull_request_id == _PULL_REQUEST_ID,
+            PullRequest.status == PRStatus.OPEN.value,
+        )
+        .values(status=PRStatus.MERGED.value, merged_at=func.now())
+        .returning(PullRequest.pull_request_id, PullRequest.status, PullRequest.merged_at)
+        .cte('merged')
+    )
+
+    merged_now = exists(select(merged.c.pull_request_id))
+    reviewers = select(PullRequestReviewer.user_id).where(
+        PullRequestReviewer.pull_request_id == _PULL_REQUEST_ID,
+        merged_now,
+    )
+    reviewer_load = _adjust_open_reviews(reviewers, -1, merged_delta=1).returning(User.user_id).cte('reviewer_load')
+
+    # PR переходит из OPEN в MERGED с тем же числом ревьюверов. Оно считается по reviewer_load,
+    # чтобы агрегат писался после блокировок users (тот же порядок, что и в create)
+    reviewer_count = select(func.count()).select_from(reviewer_load).scalar_subquery()
+    stats = upsert_pull_request_stats(
+        union_all(
+            select(
+                literal(PRStatus.OPEN.value, String).label('status'),
+                reviewer_count.label('reviewer_count'),
+                literal(-1, Integer).label('delta'),
+            ).where(merged_now),
+            select(literal(PRStatus.MERGED.value, String), reviewer_count, literal(1, Integer)).where(merged_now),
+        ).subquery('merge_stats')
+    ).cte('pull_request_stats')
+
+    # Соседние CTE видят снимок до UPDATE, поэтому новые статус и merged_at берутся из merged
+    return (
+        select(
+            PullRequest.pull_request_id,
+            PullRequest.pull_request_name,
+            PullRequest.author_id,
+            func.coalesce(merged.c.status, PullRequest.status).label('status'),
+            PullRequest.created_at,
+            func.coalesce(merged.c.merged_at, PullRequest.merged_at).label('merged_at'),
+            _assigned_reviewers(),
+            merged.c.pull_request_id.is_not(None).label('merged_now'),
+        )
+        .outerjoin(merged, true())
+        .where(PullRequest.pull_request_id == _PULL_REQUEST_ID)
+        .add_cte(reviewer_load, stats)
+    )
+
+
+_WITH_REVIEWERS = select(*_PULL_REQUEST_COLUMNS, _assigned_reviewers()).where(
+    PullRequest.pull_request_id == _PULL_REQUEST_ID
+)
+_EXISTING_IDS = select(PullRequest.pull_request_id).where(PullRequest.pull_request_id == any_(_PULL_REQUEST_IDS))
+_FOR_UPDATE = (
+    select(*_PULL_REQUEST_COLUMNS)
+    .where(PullRequest.pull_request_id == _PULL_REQUEST_ID)
+    .with_for_update(of=PullRequest, key_share=True)
+)
+_REVIEWERS = select(PullRequestReviewer.user_id).where(PullRequestReviewer.pull_request_id == _PULL_REQUEST_ID)
+_REVIEWERS_MANY = select(PullRequestReviewer.pull_request_id, PullRequestReviewer.user_id).where(
+    PullRequestReviewer.pull_request_id == any_(_PULL_REQUEST_IDS)
+)
+# Пользователи по списку ID и/или вся команда; отсутствующее условие передаётся как NULL
+_DEACTIVATED_REVIEWER = or_(
+    User.user_id == any_(bindparam('user_ids', type_=ARRAY(String))),
+    User.team_name == bindparam('team_name', type_=String),
+)
+_LOCK_OPEN_ASSIGNED = (
+    select(PullRequest.pull_request_id)
+    .where(
+        PullRequest.status == PRStatus.OPEN.value,
+        PullRequest.pull_request_id.in_(
+            select(PullRequestReviewer.pull_request_id)
+            .join(User, User.user_id == PullRequestReviewer.user_id)
+            .where(_DEACTIVATED_REVIEWER)
+        ),
+    )
+    .order_by(PullRequest.pull_request_id)
+    .with_for_update(key_share=True)
+)
+_OPEN_ASSIGNMENTS = (
+    select(
+        PullRequestReviewer.pull_request_id,
+        PullRequestReviewer.user_id,
+        PullRequest.author_id,
+        User.team_name,
+    )
+    .join(PullRequest, PullRequest.pull_request_id == PullRequestReviewer.pull_request_id)
+    .join(User, User.user_id == PullRequestReviewer.user_id)
+    .where(
+        PullRequestReviewer.pull_request_id == any_(_PULL_REQUEST_IDS),
+        PullRequest.status == PRStatus.OPEN.value,
+        _DEACTIVATED_REVIEWER,
+    )
+    .order_by(PullRequestReviewer.pull_request_id, PullRequestReviewer.user_id)
+)
+_TEAM_ROSTERS = (
+    select(User.user_id, User.team_name, User.open_reviews, Team.assignment_mode)
+    .join(Team, Team.team_name == User.team_name)
+    .where(User.team_name == any_(bindparam('team_names', type_=ARRAY(String))), User.is_active == True)  # noqa: E712
+)
+_ADD_OPEN_REVIEWS = _add_open_reviews()
+_CREATE_WITH_REVIEWERS = _create_with_reviewers()
+_SWAP_REVIEWER = _swap_reviewer()
+_MERGE = _merge()
 
 
 class PullRequestRepo(BasePgInterface):
     """Репозиторий для работы с Pull Requests."""
 
     @with_session
-    async def get_by_id(
+    async def get_with_reviewers(
         self,
         pull_request_id: str,
         session: AsyncSession | None = None,
-    ) -> PullRequest | None:
-        """Получить PR по ID с загруженными связями."""
-        query = (
-            select(PullRequest)
-            .where(PullRequest.pull_request_id == pull_request_id)
-            .options(
-                joinedload(PullRequest.author),
-                joinedload(PullRequest.reviewer_assignments),
-            )
-        )
-        result = await session.execute(query)  # type: ignore
-        return result.unique().scalar_one_or_none()
+    ) -> Row | None:
+        """Получить PR по ID вместе с ``assigned_reviewers`` одним запросом без блокировок."""
+        result = await session.execute(_WITH_REVIEWERS, {'pr_id': pull_request_id})  # type: ignore
+        return result.one_or_none()
 
-    @with_session
-    async def exists(
+    @with_session_commit
+    async def create_with_reviewers(
         self,
         pull_request_id: str,
+        pull_request_name: str,
+        author_id: str,
+        max_reviewers: int = 2,
         session: AsyncSession | None = None,
-    ) -> bool:
-        """Проверить существование PR."""
-        query = select(PullRequest.pull_request_id).where(PullRequest.pull_request_id == pull_request_id)
-        result = await session.execute(query)  # type: ignore
-        return result.scalar_one_or_none() is not None
+    ) -> Row:
+        """
+        Создать PR и назначить до ``max_reviewers`` активных коллег автора одним SQL-запросом.
+
+        Кандидаты выбираются по стратегии команды (см. ``ReviewerAssignmentMode``), счётчики
+        ``open_reviews`` назначенных ревьюверов увеличиваются в том же запросе.
+
+        Вставка PR идёт через ON CONFLICT DO NOTHING, поэтому конкурентные создания с одним ID
+        не гонятся между собой. Возвращает строку с полями PR (``pull_request_id`` равен NULL,
+        если PR не создан), ``assigned_reviewers`` и флагами ``author_found`` / ``pr_existed``.
+        """
+        params = {
+            'pr_id': pull_request_id,
+            'pr_name': pull_request_name,
+            'author': author_id,
+            'max_reviewers': max_reviewers,
+        }
+        result = await session.execute(_CREATE_WITH_REVIEWERS, params)  # type: ignore
+        return result.one()
+
+    @with_session
+    async def get_existing_ids(
+        self,
+        pull_request_ids: list[str],
+        session: AsyncSession | None = None,
+    ) -> set[str]:
+        """Получить ID уже существующих PR из списка."""
+        result = await session.execute(_EXISTING_IDS, {'pr_ids': pull_request_ids})  # type: ignore
+        return set(result.scalars().all())
 
     @with_session_commit
-    async def create(
+    async def create_many(
         self,
-        pull_request_id: str,
-        pull_request_name: str,
-        author_id: str,
+        pull_requests: list[tuple[str, str, str]],
         session: AsyncSession | None = None,
-    ) -> PullRequest:
-        """Создать новый PR."""
-        pr = PullRequest(
-            pull_request_id=pull_request_id,
-            pull_request_name=pull_request_name,
-            author_id=author_id,
-            status=PRStatus.OPEN.value,
+    ) -> list[Row]:
+        """
+        Создать пачку PR одним INSERT ... ON CONFLICT DO NOTHING.
+
+        :param pull_requests: Кортежи ``(pull_request_id, pull_request_name, author_id)`` без повторов ID.
+        :returns: Строки только реально созданных PR.
+        """
+        if not pull_requests:
+            return []
+
+        ids, names, author_ids = map(list, zip(*pull_requests, strict=True))
+        rows = (
+            func.unnest(
+                bindparam('pr_ids', ids, type_=ARRAY(String)),
+                bindparam('pr_names', names, type_=ARRAY(String)),
+                bindparam('pr_author_ids', author_ids, type_=ARRAY(String)),
+            )
+            .table_valued('pull_request_id', 'pull_request_name', 'author_id')
+            .render_derived(name='new_prs')
         )
-        session.add(pr)  # type: ignore
-        await session.flush()  # type: ignore
-        await session.refresh(pr)  # type: ignore
-        return pr
+        query = (
+            pg_insert(PullRequest)
+            .from_select(
+                ['pull_request_id', 'pull_request_name', 'author_id', 'status'],
+                select(
+                    rows.c.pull_request_id,
+                    rows.c.pull_request_name,
+                    rows.c.author_id,
+                    literal(PRStatus.OPEN.value, String),
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=[PullRequest.pull_request_id])
+            .returning(
+                PullRequest.pull_request_id,
+                PullRequest.pull_request_name,
+                PullRequest.author_id,
+                PullRequest.status,
+                PullRequest.created_at,
+                PullRequest.merged_at,
+            )
+        )
+        result = await session.execute(query)  # type: ignore
+        return list(result.all())
 
     @with_session_commit
-    async def add_reviewer(
+    async def add_reviewers(
         self,
-        pull_request_id: str,
-        user_id: str,
+        assignments: list[tuple[str, str]],
         session: AsyncSession | None = None,
     ) -> None:
-        """Добавить ревьювера к PR."""
-        reviewer = PullRequestReviewer(
-            pull_request_id=pull_request_id,
-            user_id=user_id,
+        """Назначить ревьюверов на открытые PR пачкой и обновить их счётчики открытых ревью."""
+        if not assignments:
+            return
+
+        pr_ids, user_ids = map(list, zip(*assignments, strict=True))
+        rows = (
+            func.unnest(
+                bindparam('assigned_pr_ids', pr_ids, type_=ARRAY(String)),
+                bindparam('assigned_user_ids', user_ids, type_=ARRAY(String)),
+            )
+            .table_valued('pull_request_id', 'user_id')
+            .render_derived(name='assignments')
+        )
+        await session.execute(  # type: ignore
+            insert(PullRequestReviewer).from_select(
+                ['pull_request_id', 'user_id'],
+                select(rows.c.pull_request_id, rows.c.user_id),
+            )
         )
-        session.add(reviewer)  # type: ignore
-        await session.flush()  # type: ignore
+        await session.execute(_ADD_OPEN_REVIEWS, _open_review_deltas(Counter(user_ids)))  # type: ignore
+        invalidation_bus.publish(session, pull_request_ids=pr_ids)  # type: ignore
 
     @with_session_commit
-    async def remove_reviewer(
+    async def remove_reviewers(
         self,
-        pull_request_id: str,
-        user_id: str,
+        assignments: list[tuple[str, str]],
         session: AsyncSession | None = None,
     ) -> None:
-        """Удалить ревьювера из PR."""
-        query = select(PullRequestReviewer).where(
-            PullRequestReviewer.pull_request_id == pull_request_id,
-            PullRequestReviewer.user_id == user_id,
+        """Снять ревьюверов с открытых PR пачкой и уменьшить их счётчики открытых ревью."""
+        if not assignments:
+            return
+
+        pr_ids, user_ids = map(list, zip(*assignments, strict=True))
+        rows = (
+            func.unnest(
+                bindparam('removed_pr_ids', pr_ids, type_=ARRAY(String)),
+                bindparam('removed_user_ids', user_ids, type_=ARRAY(String)),
+            )
+            .table_valued('pull_request_id', 'user_id')
+            .render_derived(name='removed')
         )
-        result = await session.execute(query)  # type: ignore
-        reviewer = result.scalar_one_or_none()
-        if reviewer:
-            await session.delete(reviewer)  # type: ignore
-            await session.flush()  # type: ignore
+        query = (
+            delete(PullRequestReviewer)
+            .where(
+                PullRequestReviewer.pull_request_id == rows.c.pull_request_id,
+                PullRequestReviewer.user_id == rows.c.user_id,
+            )
+            .returning(PullRequestReviewer.pull_request_id, PullRequestReviewer.user_id)
+        )
+        removed = (await session.execute(query)).all()  # type: ignore
+        if not removed:
+            return
+
+        # Счётчики уменьшаются только по реально удалённым назначениям
+        await session.execute(  # type: ignore
+            _ADD_OPEN_REVIEWS,
+            _open_review_deltas({k: -v for k, v in Counter(row.user_id for row in removed).items()}),
+        )
+        invalidation_bus.publish(session, pull_request_ids={row.pull_request_id for row in removed})  # type: ignore
 
     @with_session
-    async def get_reviewers(
+    async def get_open_assignments(
+        self,
+        user_ids: list[str] | None = None,
+        team_name: str | None = None,
+        session: AsyncSession | None = None,
+    ) -> list[Row]:
+        """
+        Заблокировать OPEN PR, где ревьюверы - пользователи из списка и/или команды,
+        и получить их назначения вместе с автором PR и командой ревьювера.
+
+        Сначала одним запросом блокируются строки PR в порядке ``pull_request_id``, затем
+        вторым запросом читаются назначения: его снимок сделан уже под блокировками, поэтому
+        параллельный reassign или merge не подменит ревьюверов до конца транзакции.
+        """
+        params = {'user_ids': user_ids or [], 'team_name': team_name}
+        locked = (await session.execute(_LOCK_OPEN_ASSIGNED, params)).scalars().all()  # type: ignore
+        if not locked:
+            return []
+        result = await session.execute(_OPEN_ASSIGNMENTS, {**params, 'pr_ids': locked})  # type: ignore
+        return list(result.all())
+
+    @with_session
+    async def get_reviewers_many(
+        self,
+        pull_request_ids: list[str],
+        session: AsyncSession | None = None,
+    ) -> dict[str, list[str]]:
+        """Получить ревьюверов нескольких PR: ``{pull_request_id: [user_id, ...]}``."""
+        result = await session.execute(_REVIEWERS_MANY, {'pr_ids': pull_request_ids})  # type: ignore
+        reviewers: dict[str, list[str]] = {pr_id: [] for pr_id in pull_request_ids}
+        for row in result:
+            reviewers[row.pull_request_id].append(row.user_id)
+        return reviewers
+
+    @with_session
+    async def get_team_rosters(
+        self,
+        team_names: list[str],
+        session: AsyncSession | None = None,
+    ) -> list[Row]:
+        """Получить активных участников нескольких команд вместе со стратегией назначения и нагрузкой."""
+        result = await session.execute(_TEAM_ROSTERS, {'team_names': team_names})  # type: ignore
+        return list(result.all())
+
+    @with_session
+    async def get_for_update(
         self,
         pull_request_id: str,
         session: AsyncSession | None = None,
-    ) -> list[str]:
-        """Получить список ID ревьюверов PR."""
-        query = select(PullRequestReviewer.user_id).where(PullRequestReviewer.pull_request_id == pull_request_id)
-        result = await session.execute(query)  # type: ignore
-        return list(result.scalars().all())
+    ) -> Row | None:
+        """
+        Получить PR и заблокировать его строку до конца транзакции.
+
+        FOR NO KEY UPDATE сериализует изменения состава ревьюверов одного PR
+        и не конфликтует с FK-блокировками при вставке в ``pull_request_reviewers``.
+        Ревьюверов читать отдельным запросом после блокировки: подзапросы этого запроса
+        видят снимок, взятый до ожидания блокировки.
+        """
+        result = await session.execute(_FOR_UPDATE, {'pr_id': pull_request_id})  # type: ignore
+        return result.one_or_none()
 
     @with_session_commit
-    async def merge(
+    async def swap_reviewer(
         self,
         pull_request_id: str,
+        old_user_id: str,
+        exclude_user_ids: list[str],
         session: AsyncSession | None = None,
-    ) -> PullRequest | None:
-        """Пометить PR как MERGED (идемпотентная операция)."""
-        pr = await self.get_by_id(pull_request_id, session=session)
-        if pr is None:
-            return None
+    ) -> str | None:
+        """
+        Заменить ревьювера на кандидата из его команды одним SQL-запросом.
 
-        # Идемпотентность: если уже MERGED, просто возвращаем
-        if pr.status == PRStatus.MERGED.value:
-            return pr
+        Кандидат выбирается по стратегии команды среди активных участников не из ``exclude_user_ids``.
+        Удаление старого ревьювера, вставка нового и обновление счётчиков ``open_reviews``
+        выполняются только если кандидат найден. Строка PR должна быть заблокирована
+        вызывающим (см. ``get_for_update``).
 
-        pr.status = PRStatus.MERGED.value
-        pr.merged_at = datetime.now()  # timezone-naive для совместимости с TIMESTAMP WITHOUT TIME ZONE
-        await session.flush()  # type: ignore
-        await session.refresh(pr)  # type: ignore
-        return pr
+        :returns: ID нового ревьювера или None, если кандидата нет.
+        """
+        params = {
+            'pr_id': pull_request_id,
+            'old_user_id': old_user_id,
+            'exclude_user_ids': exclude_user_ids,
+        }
+        result = await session.execute(_SWAP_REVIEWER, params)  # type: ignore
+        new_user_id = result.scalar_one_or_none()
+        if new_user_id is not None:
+            invalidation_bus.publish(session, pull_request_ids=[pull_request_id])  # type: ignore
+        return new_user_id
 
     @with_session
-    async def get_active_team_members(
+    async def get_reviewers(
         self,
-        team_name: str,
-        exclude_user_id: str | None = None,
+        pull_request_id: str,
         session: AsyncSession | None = None,
-    ) -> list[User]:
-        """Получить активных участников команды (опционально исключая пользователя)."""
-        query = select(User).where(User.team_name == team_name, User.is_active == True)  # noqa: E712
+    ) -> list[str]:
+        """Получить список ID ревьюверов PR."""
+        result = await session.execute(_REVIEWERS, {'pr_id': pull_request_id})  # type: ignore
+        return list(result.scalars().all())
 
-        if exclude_user_id:
-            query = query.where(User.user_id != exclude_user_id)
+    @with_session_commit
+    async def merge(
+        self,
+        pull_request_id: str,
+        session: AsyncSession | None = None,
+    ) -> Row | None:
+        """
+        Пометить PR как MERGED (идемпотентная операция).
 
-        result = await session.execute(query)  # type: ignore
-        return list(result.scalars().all())
+        Сначала берётся блокировка строки PR (как в reassign), затем один UPDATE переводит OPEN PR
+        в MERGED: ``merged_at`` ставится на стороне БД, счётчики ревьюверов и агрегат ``pull_request_stats``
+        обновляются в том же запросе. Запрос выполняется уже под блокировкой, поэтому его подзапросы видят
+        ревьюверов после параллельного reassign, а не снимок до ожидания. Если PR успели слить параллельно,
+        возвращается его текущее состояние.
+        Возвращает поля PR вместе с ``assigned_reviewers`` или None, если PR не найден.
+        """
+        locked = await self.get_for_update(pull_request_id, session=session)
+        if locked is None:
+            return None
+        if locked.status != PRStatus.OPEN.value:
+            return await self.get_with_reviewers(pull_request_id, session=session)
+
+        result = await session.execute(_MERGE, {'pr_id': pull_request_id})  # type: ignore
+        pr = result.one()
+        invalidation_bus.publish(session, pull_request_ids=[pull_request_id])  # type: ignore
+        return pr
 
 
 pull_request_repo = PullRequestRepo()
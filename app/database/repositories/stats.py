@@ -0,0 +1,163 @@
+import secrets
+
+from sqlalchemy import FromClause, Integer, Row, String, bindparam, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, Insert, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.base import BasePgInterface, with_session, with_session_commit
+from app.database.models import PullRequest, PullRequestReviewer, PullRequestStats, User
+
+# Количество шардов на каждую комбинацию (status, reviewer_count) в pull_request_stats
+STATS_SHARDS = 16
+
+
+def _random_shard() -> int:
+    return secrets.randbelow(STATS_SHARDS)
+
+
+def upsert_pull_request_stats(rows: FromClause) -> Insert:
+    """
+    Прибавить ``rows.c.delta`` к агрегату PR по ``(status, reviewer_count)``.
+
+    Все строки одного запроса пишутся в один случайный шард; комбинации в ``rows`` не должны повторяться.
+    """
+    excluded = pg_insert(PullRequestStats).excluded
+    return (
+        pg_insert(PullRequestStats)
+        .from_select(
+            ['status', 'reviewer_count', 'shard', 'pull_requests'],
+            select(
+                rows.c.status,
+                rows.c.reviewer_count,
+                # Шард выбирается при каждом выполнении, так что готовое выражение не закрепляет его
+                bindparam('stats_shard', callable_=_random_shard, type_=Integer),
+                rows.c.delta,
+            ),
+        )
+        .on_conflict_do_update(
+            index_elements=[PullRequestStats.status, PullRequestStats.reviewer_count, PullRequestStats.shard],
+            set_={'pull_requests': PullRequestStats.pull_requests + excluded.pull_requests},
+        )
+    )
+
+
+class StatsRepo(BasePgInterface):
+    """Репозиторий агрегатов статистики ревью."""
+
+    @with_session_commit
+    async def add_pull_requests(
+        self,
+        deltas: dict[tuple[str, int], int],
+        session: AsyncSession | None = None,
+    ) -> None:
+        """Изменить агрегат PR: ``{(status, reviewer_count): delta}``."""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        keys = sorted(deltas)
+        rows = (
+            func.unnest(
+                bindparam('stats_statuses', [status for status, _ in keys], type_=ARRAY(String)),
+                bindparam('stats_reviewer_counts', [count for _, count in keys], type_=ARRAY(Integer)),
+                bindparam('stats_deltas', [deltas[key] for key in keys], type_=ARRAY(Integer)),
+            )
+            .table_valued('status', 'reviewer_count', 'delta')
+            .render_derived(name='stats_deltas')
+        )
+        await session.execute(upsert_pull_request_stats(rows))  # type: ignore
+
+    @with_session
+    async def get_pull_request_stats(
+        self,
+        session: AsyncSession | None = None,
+    ) -> list[Row]:
+        """Получить количество PR по ``(status, reviewer_count)`` с суммированием шардов."""
+        query = (
+            select(
+                PullRequestStats.status,
+                PullRequestStats.reviewer_count,
+                func.sum(PullRequestStats.pull_requests).label('pull_requests'),
+            )
+            .group_by(PullRequestStats.status, PullRequestStats.reviewer_count)
+            .order_by(PullRequestStats.reviewer_count, PullRequestStats.status)
+        )
+        result = await session.execute(query)  # type: ignore
+        return list(result.all())
+
+    @with_session
+    async def get_user_stats(
+        self,
+        user_id: str,
+        session: AsyncSession | None = None,
+    ) -> Row | None:
+        """Получить счётчики ревью пользователя."""
+        query = select(
+            User.user_id,
+            User.username,
+            User.team_name,
+            User.is_active,
+            User.open_reviews,
+            User.merged_reviews,
+        ).where(User.user_id == user_id)
+        result = await session.execute(query)  # type: ignore
+        return result.one_or_none()
+
+    @with_session
+    async def get_team_member_stats(
+        self,
+        team_name: str,
+        session: AsyncSession | None = None,
+    ) -> list[Row]:
+        """Получить счётчики ревью участников команды (по индексу ``ix_users_team_name``)."""
+        query = (
+            select(
+                User.user_id,
+                User.username,
+                User.team_name,
+                User.is_active,
+                User.open_reviews,
+                User.merged_reviews,
+            )
+            .where(User.team_name == team_name)
+            .order_by(User.user_id)
+        )
+        result = await session.execute(query)  # type: ignore
+        return list(result.all())
+
+    @with_session_commit
+    async def rebuild_pull_request_stats(
+        self,
+        session: AsyncSession | None = None,
+    ) -> int:
+        """
+        Полностью пересчитать агрегат PR по фактическим данным.
+
+        Таблица блокируется до конца транзакции, чтобы параллельные create/merge
+        не потеряли свои изменения между удалением и вставкой.
+
+        :returns: Количество строк агрегата после пересчёта.
+        """
+        await session.execute(text('LOCK TABLE pull_request_stats IN SHARE ROW EXCLUSIVE MODE'))  # type: ignore
+        await session.execute(delete(PullRequestStats))  # type: ignore
+
+        per_pull_request = (
+            select(PullRequest.status, func.count(PullRequestReviewer.user_id).label('reviewer_count'))
+            .outerjoin(PullRequestReviewer, PullRequestReviewer.pull_request_id == PullRequest.pull_request_id)
+            .group_by(PullRequest.pull_request_id)
+            .subquery()
+        )
+        query = pg_insert(PullRequestStats).from_select(
+            ['status', 'reviewer_count', 'shard', 'pull_requests'],
+            select(
+                per_pull_request.c.status,
+                per_pull_request.c.reviewer_count,
+                literal(0, Integer),
+                func.count(),
+            ).group_by(per_pull_request.c.status, per_pull_request.c.reviewer_count),
+        )
+        result = await session.execute(query)  # type: ignore
+        return result.rowcount
+
+
+stats_repo = StatsRepo()
@@ -1,9 +1,28 @@
-from sqlalchemy import select
+from sqlalchemy import String, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.database.base import BasePgInterface, with_session, with_session_commit
-from app.database.models import Team
+from app.database.base import BasePgInterface, is_replica, with_session, with_session_commit
+from app.database.cache import MemberSnapshot, TeamSnapshot, roster_cache
+from app.database.invalidation import invalidation_bus
+from app.database.models import ReviewerAssignmentMode, Team, User
+
+# Готовые выражения горячих запросов (см. app.database.repositories.pull_request)
+_TEAM_NAME = bindparam('team_name', type_=String)
+_ROSTER = (
+    select(
+        Team.team_name,
+        Team.assignment_mode,
+        User.user_id,
+        User.username,
+        User.is_active,
+    )
+    .outerjoin(User, User.team_name == Team.team_name)
+    .where(Team.team_name == _TEAM_NAME)
+    # Порядок участников не зависит от физического расположения строк (как у хранилища в памяти)
+    .order_by(User.user_id)
+)
+_EXISTS = select(Team.team_name).where(Team.team_name == _TEAM_NAME)
 
 
 class TeamRepo(BasePgInterface):
@@ -14,11 +33,37 @@ class TeamRepo(BasePgInterface):
         self,
         team_name: str,
         session: AsyncSession | None = None,
-    ) -> Team | None:
-        """Получить команду по имени с загрузкой участников."""
-        query = select(Team).where(Team.team_name == team_name).options(selectinload(Team.members))
-        result = await session.execute(query)  # type: ignore
-        return result.scalar_one_or_none()
+    ) -> TeamSnapshot | None:
+        """Получить команду по имени с участниками (через кэш составов команд, без ORM-объектов)."""
+        cached = roster_cache.get_team(team_name)
+        if cached is not None:
+            return cached
+
+        # Инвалидация, пришедшая во время запроса, не даст положить в кэш прочитанный до неё снимок
+        generation = roster_cache.generation
+
+        rows = (await session.execute(_ROSTER, {'team_name': team_name})).all()  # type: ignore
+        if not rows:
+            return None
+
+        snapshot = TeamSnapshot(
+            team_name=rows[0].team_name,
+            assignment_mode=rows[0].assignment_mode,
+            members=tuple(
+                MemberSnapshot(
+                    user_id=row.user_id,
+                    username=row.username,
+                    team_name=row.team_name,
+                    is_active=row.is_active,
+                )
+                for row in rows
+                if row.user_id is not None
+            ),
+        )
+        # Снимок с реплики мог отстать от уже пришедшей инвалидации: в кэш кладутся только данные основного сервера
+        if not is_replica(session):  # type: ignore
+            roster_cache.set_team(snapshot, generation)
+        return snapshot
 
     @with_session
     async def exists(
@@ -27,22 +72,51 @@ class TeamRepo(BasePgInterface):
         session: AsyncSession | None = None,
     ) -> bool:
         """Проверить существование команды."""
-        query = select(Team.team_name).where(Team.team_name == team_name)
-        result = await session.execute(query)  # type: ignore
+        result = await session.execute(_EXISTS, {'team_name': team_name})  # type: ignore
         return result.scalar_one_or_none() is not None
 
     @with_session_commit
     async def create(
         self,
         team_name: str,
+        assignment_mode: ReviewerAssignmentMode = ReviewerAssignmentMode.RANDOM,
         session: AsyncSession | None = None,
     ) -> Team:
         """Создать новую команду."""
-        team = Team(team_name=team_name)
+        team = Team(team_name=team_name, assignment_mode=assignment_mode.value)
+        invalidation_bus.publish(session, teams=[team_name])  # type: ignore
         session.add(team)  # type: ignore
         await session.flush()  # type: ignore
         await session.refresh(team)  # type: ignore
         return team
 
+    @with_session_commit
+    async def create_missing(
+        self,
+        team_names: list[str],
+        session: AsyncSession | None = None,
+    ) -> int:
+        """
+        Создать команды из списка, которых ещё нет (существующие не трогаются).
+
+        :returns: Количество созданных команд.
+        """
+        if not team_names:
+            return 0
+
+        names = (
+            func.unnest(bindparam('team_names', team_names, type_=ARRAY(String)))
+            .table_valued('team_name')
+            .render_derived(name='names')
+        )
+        query = (
+            pg_insert(Team)
+            .from_select(['team_name'], select(names.c.team_name))
+            .on_conflict_do_nothing(index_elements=[Team.team_name])
+        )
+        result = await session.execute(query)  # type: ignore
+        invalidation_bus.publish(session, teams=team_names)  # type: ignore
+        return result.rowcount
+
 
 team_repo = TeamRepo()
@@ -1,9 +1,61 @@
-from sqlalchemy import select
+from functools import cache
+
+from sqlalchemy import Boolean, Integer, Row, Select, String, any_, bindparam, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased
 
 from app.database.base import BasePgInterface, with_session, with_session_commit
-from app.database.models import PullRequest, PullRequestReviewer, User
+from app.database.invalidation import invalidation_bus
+from app.database.models import PRStatus, PullRequest, PullRequestReviewer, User
+
+# Готовые выражения горячих запросов (см. app.database.repositories.pull_request)
+_USER_ID = bindparam('id', type_=String)
+_USER_COLUMNS = (User.user_id, User.username, User.team_name, User.is_active)
+_BY_ID = select(*_USER_COLUMNS).where(User.user_id == _USER_ID)
+_TEAM_NAMES = select(User.user_id, User.team_name).where(
+    User.user_id == any_(bindparam('user_ids', type_=ARRAY(String)))
+)
+_UPDATE_IS_ACTIVE = (
+    update(User)
+    .where(User.user_id == _USER_ID)
+    .values(is_active=bindparam('active', type_=Boolean))
+    .returning(*_USER_COLUMNS)
+)
+
+
+@cache
+def _assigned_pull_requests(with_status: bool, with_after: bool, with_limit: bool) -> Select:
+    """Выражение ``UserRepo.get_assigned_pull_requests``: по одному на набор необязательных фильтров."""
+    query = (
+        select(
+            PullRequest.pull_request_id,
+            PullRequest.pull_request_name,
+            PullRequest.author_id,
+            PullRequest.status,
+        )
+        .join(PullRequestReviewer, PullRequest.pull_request_id == PullRequestReviewer.pull_request_id)
+        .where(PullRequestReviewer.user_id == _USER_ID)
+        .order_by(PullRequestReviewer.pull_request_id)
+    )
+    if with_status:
+        query = query.where(PullRequest.status == bindparam('status', type_=String))
+    if with_after:
+        query = query.where(PullRequestReviewer.pull_request_id > bindparam('after', type_=String))
+    if with_limit:
+        query = query.limit(bindparam('limit', type_=Integer))
+    return query
+
+
+@cache
+def _count_assigned_pull_requests(with_status: bool) -> Select:
+    """Выражение ``UserRepo.count_assigned_pull_requests``."""
+    query = select(func.count()).select_from(PullRequestReviewer).where(PullRequestReviewer.user_id == _USER_ID)
+    if with_status:
+        query = query.join(PullRequest, PullRequest.pull_request_id == PullRequestReviewer.pull_request_id).where(
+            PullRequest.status == bindparam('status', type_=String)
+        )
+    return query
 
 
 class UserRepo(BasePgInterface):
@@ -14,42 +66,64 @@ class UserRepo(BasePgInterface):
         self,
         user_id: str,
         session: AsyncSession | None = None,
-    ) -> User | None:
-        """Получить пользователя по ID."""
-        query = select(User).where(User.user_id == user_id)
-        result = await session.execute(query)  # type: ignore
-        return result.scalar_one_or_none()
+    ) -> Row | None:
+        """Получить пользователя по ID (строка Core без ORM-объекта)."""
+        result = await session.execute(_BY_ID, {'id': user_id})  # type: ignore
+        return result.one_or_none()
+
+    @with_session
+    async def get_team_names(
+        self,
+        user_ids: list[str],
+        session: AsyncSession | None = None,
+    ) -> dict[str, str]:
+        """Получить команды пользователей: ``{user_id: team_name}`` для найденных ID."""
+        result = await session.execute(_TEAM_NAMES, {'user_ids': user_ids})  # type: ignore
+        return {row.user_id: row.team_name for row in result}
 
     @with_session_commit
-    async def create_or_update(
+    async def bulk_upsert(
         self,
-        user_id: str,
-        username: str,
-        team_name: str,
-        is_active: bool,
+        members: list[tuple[str, str, str, bool]],
         session: AsyncSession | None = None,
-    ) -> User:
-        """Создать нового пользователя или обновить существующего."""
-        existing_user = await self.get_by_id(user_id, session=session)
-
-        if existing_user:
-            existing_user.username = username
-            existing_user.team_name = team_name
-            existing_user.is_active = is_active
-            await session.flush()  # type: ignore
-            await session.refresh(existing_user)  # type: ignore
-            return existing_user
-        else:
-            user = User(
-                user_id=user_id,
-                username=username,
-                team_name=team_name,
-                is_active=is_active,
+    ) -> int:
+        """
+        Создать или обновить пачку пользователей одним INSERT ... ON CONFLICT.
+
+        :param members: Кортежи ``(user_id, username, team_name, is_active)`` без повторов ``user_id``.
+        :returns: Количество затронутых строк.
+        """
+        if not members:
+            return 0
+
+        user_ids, usernames, team_names, actives = map(list, zip(*members, strict=True))
+        rows = (
+            func.unnest(
+                bindparam('user_ids', user_ids, type_=ARRAY(String)),
+                bindparam('usernames', usernames, type_=ARRAY(String)),
+                bindparam('team_names', team_names, type_=ARRAY(String)),
+                bindparam('actives', actives, type_=ARRAY(Boolean)),
             )
-            session.add(user)  # type: ignore
-            await session.flush()  # type: ignore
-            await session.refresh(user)  # type: ignore
-            return user
+            .table_valued('user_id', 'username', 'team_name', 'is_active')
+            .render_derived(name='members')
+        )
+
+        insert_query = pg_insert(User).from_select(
+            ['user_id', 'username', 'team_name', 'is_active'],
+            select(rows.c.user_id, rows.c.username, rows.c.team_name, rows.c.is_active),
+        )
+        query = insert_query.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_={
+                'username': insert_query.excluded.username,
+                'team_name': insert_query.excluded.team_name,
+                'is_active': insert_query.excluded.is_active,
+            },
+        )
+        result = await session.execute(query)  # type: ignore
+        # Пользователи могли перейти из других команд: старые команды неизвестны, сбрасываем кэш целиком
+        invalidation_bus.publish(session, flush=True)  # type: ignore
+        return result.rowcount
 
     @with_session_commit
     async def update_is_active(
@@ -57,30 +131,136 @@ class UserRepo(BasePgInterface):
         user_id: str,
         is_active: bool,
         session: AsyncSession | None = None,
-    ) -> User | None:
+    ) -> Row | None:
         """Обновить флаг активности пользователя."""
-        user = await self.get_by_id(user_id, session=session)
+        params = {'id': user_id, 'active': is_active}
+        user = (await session.execute(_UPDATE_IS_ACTIVE, params)).one_or_none()  # type: ignore
         if user:
-            user.is_active = is_active
-            await session.flush()  # type: ignore
-            await session.refresh(user)  # type: ignore
+            invalidation_bus.publish(session, teams=[user.team_name], user_ids=[user_id])  # type: ignore
         return user
 
+    @with_session_commit
+    async def deactivate_many(
+        self,
+        user_ids: list[str] | None = None,
+        team_name: str | None = None,
+        session: AsyncSession | None = None,
+    ) -> list[str]:
+        """
+        Деактивировать пользователей по списку ID и/или всю команду одним UPDATE.
+
+        Перед UPDATE в порядке ``user_id`` блокируются все участники затронутых команд:
+        замены для снятых ревьюверов берутся из тех же команд, и их счётчики потом
+        меняются без ожидания блокировок, захваченных параллельными транзакциями.
+        Открытые PR этих пользователей должны быть уже заблокированы
+        (``PullRequestRepo.get_open_assignments``): везде PR блокируются раньше пользователей.
+
+        :returns: ID всех подходящих пользователей, включая уже неактивных.
+        """
+        member = aliased(User)
+        conditions = []
+        if user_ids:
+            conditions.append(member.user_id == any_(bindparam('user_ids', user_ids, type_=ARRAY(String))))
+        if team_name is not None:
+            conditions.append(member.team_name == team_name)
+        if not conditions:
+            return []
+
+        targets = select(member.user_id).where(or_(*conditions))
+        teams = select(member.team_name).where(or_(*conditions))
+        locked = (
+            select(User.user_id).where(User.team_name.in_(teams)).order_by(User.user_id).with_for_update(key_share=True)
+        )
+        await session.execute(locked)  # type: ignore
+
+        query = (
+            update(User)
+            .where(User.user_id.in_(targets))
+            .values(is_active=False)
+            .returning(User.user_id, User.team_name)
+        )
+        rows = (await session.execute(query)).all()  # type: ignore
+        invalidation_bus.publish(
+            session,  # type: ignore
+            teams={row.team_name for row in rows},
+            user_ids=[row.user_id for row in rows],
+        )
+        return sorted(row.user_id for row in rows)
+
     @with_session
     async def get_assigned_pull_requests(
         self,
         user_id: str,
+        status: PRStatus | None = None,
+        after: str | None = None,
+        limit: int | None = None,
         session: AsyncSession | None = None,
-    ) -> list[PullRequest]:
-        """Получить все PR, где пользователь назначен ревьювером."""
+    ) -> list[Row]:
+        """
+        Получить PR, где пользователь назначен ревьювером, в порядке ``pull_request_id``.
+
+        Выбираются только нужные колонки: запрос обслуживается index-only сканами
+        ``ix_pull_request_reviewers_user_id`` и ``ix_pull_requests_review_projection``.
+
+        :param after: Keyset-курсор: вернуть PR с ``pull_request_id`` строго больше.
+        """
+        query = _assigned_pull_requests(status is not None, after is not None, limit is not None)
+        params = {'id': user_id, 'status': status and status.value, 'after': after, 'limit': limit}
+        result = await session.execute(query, params)  # type: ignore
+        return list(result.all())
+
+    @with_session
+    async def count_assigned_pull_requests(
+        self,
+        user_id: str,
+        status: PRStatus | None = None,
+        session: AsyncSession | None = None,
+    ) -> int:
+        """Посчитать PR, где пользователь назначен ревьювером."""
+        query = _count_assigned_pull_requests(status is not None)
+        result = await session.execute(query, {'id': user_id, 'status': status and status.value})  # type: ignore
+        return result.scalar_one()
+
+    @with_session_commit
+    async def rebuild_review_counters(
+        self,
+        session: AsyncSession | None = None,
+    ) -> int:
+        """
+        Пересчитать ``open_reviews`` и ``merged_reviews`` по фактическим назначениям.
+
+        Таблица блокируется до конца транзакции, чтобы параллельные назначения и merge
+        не изменили счётчики между подсчётом и записью и их приращения не затёрлись.
+
+        :returns: Количество пользователей, у которых счётчики разошлись с данными.
+        """
+        await session.execute(text('LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE'))  # type: ignore
+        assignments = (
+            select(PullRequestReviewer.user_id, PullRequest.status)
+            .join(PullRequest, PullRequest.pull_request_id == PullRequestReviewer.pull_request_id)
+            .subquery()
+        )
+        member = aliased(User)
+        actual = (
+            select(
+                member.user_id,
+                func.count(assignments.c.user_id).filter(assignments.c.status == PRStatus.OPEN.value).label('open'),
+                func.count(assignments.c.user_id).filter(assignments.c.status == PRStatus.MERGED.value).label('merged'),
+            )
+            .outerjoin(assignments, assignments.c.user_id == member.user_id)
+            .group_by(member.user_id)
+            .subquery()
+        )
         query = (
-            select(PullRequest)
-            .join(PullRequestReviewer, PullRequest.pull_request_id == PullRequestReviewer.pull_request_id)
-            .where(PullRequestReviewer.user_id == user_id)
-            .options(joinedload(PullRequest.author))
+            update(User)
+            .where(
+                User.user_id == actual.c.user_id,
+                or_(User.open_reviews != actual.c.open, User.merged_reviews != actual.c.merged),
+            )
+            .values(open_reviews=actual.c.open, merged_reviews=actual.c.merged)
         )
         result = await session.execute(query)  # type: ignore
-        return list(result.unique().scalars().all())
+        return result.rowcount
 
 
 user_repo = UserRepo()
@@ -1,11 +1,80 @@
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Request, Response, status
+from fastapi.exception_handlers import http_exception_handler, request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from loguru import logger
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from starlette.exceptions import HTTPException
+
+from app.exceptions import ServiceOverloadedException
+from app.metrics import app_errors_total
+
+QUERY_CANCELED = '57014'
+
+
+def _error_code(exc: HTTPException) -> str:
+    """Код доменной ошибки из ``detail={'error': {'code': ...}}`` или HTTP-статус."""
+    if isinstance(exc.detail, dict) and isinstance(exc.detail.get('error'), dict):
+        return str(exc.detail['error'].get('code', exc.status_code))
+    return str(exc.status_code)
+
+
+def error_response(
+    status_code: int,
+    code: str,
+    message: str,
+    headers: dict[str, str] | None = None,
+) -> JSONResponse:
+    """Ответ в формате доменных ошибок для ошибок вне роутеров; учитывается в ``app_errors_total``."""
+    app_errors_total.inc(code)
+    return JSONResponse(
+        status_code=status_code,
+        content={'detail': {'error': {'code': code, 'message': message}}},
+        headers=headers,
+    )
+
+
+def _overloaded_response(retry_after: int) -> JSONResponse:
+    return error_response(
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        'SERVICE_OVERLOADED',
+        'database is overloaded, retry later',
+        headers={'Retry-After': str(retry_after)},
+    )
 
 
 def register_errors_handlers(app: FastAPI) -> None:
+    @app.exception_handler(HTTPException)
+    async def handle_http_exception(request: Request, exc: HTTPException) -> Response:
+        app_errors_total.inc(_error_code(exc))
+        return await http_exception_handler(request, exc)
+
+    @app.exception_handler(RequestValidationError)
+    async def handle_validation_error(request: Request, exc: RequestValidationError) -> Response:
+        app_errors_total.inc('VALIDATION_ERROR')
+        return await request_validation_exception_handler(request, exc)
+
+    @app.exception_handler(ServiceOverloadedException)
+    async def handle_service_overloaded(_request: Request, exc: ServiceOverloadedException) -> Response:
+        return _overloaded_response(exc.retry_after)
+
+    @app.exception_handler(PoolTimeoutError)
+    async def handle_pool_timeout(request: Request, exc: PoolTimeoutError) -> Response:
+        # Запрос в обход admission control или при DB_ADMISSION_ENABLED=false дождался DB_POOL_TIMEOUT
+        logger.warning(f'Pool checkout timed out at {request.url}: {exc!r}')
+        return _overloaded_response(retry_after=1)
+
+    @app.exception_handler(DBAPIError)
+    async def handle_database_error(request: Request, exc: DBAPIError) -> Response:
+        # 57014 query_canceled: запрос остановлен по statement_timeout из дедлайна запроса
+        if getattr(exc.orig, 'pgcode', None) == QUERY_CANCELED:
+            logger.warning(f'Statement timed out at {request.url}: {exc.orig!r}')
+            return error_response(status.HTTP_504_GATEWAY_TIMEOUT, 'REQUEST_TIMEOUT', 'request deadline exceeded')
+        return await handle_internal_server_error(request, exc)
+
     @app.exception_handler(Exception)
     async def handle_internal_server_error(request: Request, exc: Exception) -> Response:
+        app_errors_total.inc('INTERNAL_ERROR')
         logger.exception(f'Unhandled exception at {request.url}: {exc!r}')
         return JSONResponse(
             status_code=500,
@@ -5,3 +5,26 @@ class NotFoundException(Exception): ...
 
 
 class CannotReassignPrException(Exception): ...
+
+
+class InvalidCursorException(Exception): ...
+
+
+class InvalidImportRecordException(Exception):
+    def __init__(self, line_number: int) -> None:
+        super().__init__(line_number)
+        self.line_number = line_number
+
+
+class QueryBudgetExceededException(AssertionError):
+    def __init__(self, route: str, statements: int, budget: int) -> None:
+        super().__init__(f'{route} issued {statements} SQL statements, budget is {budget}')
+        self.route = route
+        self.statements = statements
+        self.budget = budget
+
+
+class ServiceOverloadedException(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f'Service overloaded, retry after {retry_after}s')
+        self.retry_after = retry_after
@@ -1,12 +1,43 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 
 from app import include_routes
+from app.config import settings
+from app.database.backend import IN_MEMORY
+from app.database.base import async_engine, replica_engine
+from app.database.invalidation import invalidation_listener
 from app.errors_handlers import register_errors_handlers
-
-app = FastAPI()
+from app.middlewares import ConsistencyMiddleware, DeadlineMiddleware, MetricsMiddleware, QueryStatsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # LISTEN-соединение для сброса кэшей по изменениям из других воркеров
+    if settings.CACHE_INVALIDATION_ENABLED and not IN_MEMORY:
+        await invalidation_listener.start()
+    try:
+        yield
+    finally:
+        # uvicorn вызывает shutdown после завершения текущих запросов (SIGTERM/SIGINT)
+        await invalidation_listener.stop()
+        await async_engine.dispose()
+        if replica_engine is not None:
+            await replica_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(DeadlineMiddleware)
+if replica_engine is not None:
+    app.add_middleware(ConsistencyMiddleware)
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 register_errors_handlers(app)
 
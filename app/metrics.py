@@ -0,0 +1,180 @@
+"""
+Метрики процесса в текстовом формате Prometheus.
+
+Инструменты рассчитаны на один event loop на процесс: обновления - обычные операции
+над int/float без блокировок, атомарные относительно других корутин. У каждого воркера
+uvicorn свои значения; ряды различаются меткой ``worker`` (pid процесса).
+"""
+
+import os
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from typing import TypeVar
+
+# Бакеты по умолчанию клиентских библиотек Prometheus, в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+LabelValues = tuple[str, ...]
+M = TypeVar('M', bound='Metric')
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Базовый класс метрики с набором меток."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: LabelValues, extra: dict[str, str] | None = None) -> str:
+        pairs = [*zip(self.labelnames, values, strict=True), *(extra or {}).items()]
+        pairs.append(('worker', str(os.getpid())))
+        return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.type_name}'
+        yield from self.samples()
+
+
+class Counter(Metric):
+    """Монотонный счётчик."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        # Ряд без меток виден с нуля: на него можно ставить алерты до первого события
+        self._values: dict[LabelValues, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f'{self.name}{self._labels(labels)} {_format_number(value)}'
+
+
+class Gauge(Metric):
+    """
+    Значение, которое может расти и уменьшаться.
+
+    С ``collect`` значение без меток вычисляется в момент выгрузки метрик.
+    """
+
+    type_name = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        collect: Callable[[], float] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        # Ряд без меток виден с нуля: на него можно ставить алерты до первого события
+        self._values: dict[LabelValues, float] = {} if self.labelnames else {(): 0}
+        self._collect = collect
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        values = {(): self._collect()} if self._collect is not None else self._values
+        for labels, value in values.items():
+            yield f'{self.name}{self._labels(labels)} {_format_number(value)}'
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными бакетами; хранит некумулятивные счётчики, суммирует при выгрузке."""
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), float('inf'))
+        # labels -> [счётчики по бакетам..., сумма]
+        self._values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * len(self.buckets) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series, strict=False):
+                cumulative += count
+                yield f'{self.name}_bucket{self._labels(labels, {"le": _format_number(bound)})} {cumulative}'
+            yield f'{self.name}_sum{self._labels(labels)} {_format_number(series[-1])}'
+            yield f'{self.name}_count{self._labels(labels)} {cumulative}'
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+registry = Registry()
+
+http_requests_in_flight = registry.register(
+    Gauge('http_requests_in_flight', 'HTTP requests currently being processed'),
+)
+http_requests_total = registry.register(
+    Counter('http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status')),
+)
+http_request_duration_seconds = registry.register(
+    Histogram('http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route')),
+)
+app_errors_total = registry.register(
+    Counter('app_errors_total', 'Error responses by domain error code', ('code',)),
+)
+db_pool_checkout_wait_seconds = registry.register(
+    Histogram(
+        'db_pool_checkout_wait_seconds',
+        'Time to get a connection from the pool, including opening a new one',
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    ),
+)
+db_pool_checkout_timeouts_total = registry.register(
+    Counter('db_pool_checkout_timeouts_total', 'Pool checkouts that failed with a pool timeout'),
+)
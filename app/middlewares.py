@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+from loguru import logger
+from starlette import status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database.base import deadline, track_queries
+from app.database.replica import CONSISTENCY_HEADER, consistency_scope, format_lsn
+from app.errors_handlers import error_response
+from app.exceptions import QueryBudgetExceededException
+from app.metrics import http_request_duration_seconds, http_requests_in_flight, http_requests_total
+
+
+class QueryStatsMiddleware:
+    """
+    Учёт обращений к БД на HTTP-запрос.
+
+    По каждому запросу пишет строку лога с числом SQL-запросов, их суммарным временем
+    и выдачами соединений из пула. В режиме ``DEBUG`` добавляет те же данные в заголовки
+    ``X-SQL-*`` ответа. Если задан бюджет (``QUERY_BUDGET`` / ``QUERY_BUDGETS``), превышение
+    роняет запрос с ``QueryBudgetExceededException`` до отправки ответа.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        with track_queries() as stats:
+
+            async def send_with_stats(message: Message) -> None:
+                nonlocal status_code
+                if message['type'] == 'http.response.start':
+                    budget = _budget(scope)
+                    if budget is not None and stats.statements > budget:
+                        raise QueryBudgetExceededException(_route_path(scope), stats.statements, budget)
+                    status_code = message['status']
+                    if settings.DEBUG:
+                        headers = MutableHeaders(scope=message)
+                        headers['X-SQL-Statements'] = str(stats.statements)
+                        headers['X-SQL-Round-Trips'] = str(stats.round_trips)
+                        headers['X-SQL-Time-Ms'] = f'{stats.sql_time * 1000:.2f}'
+                        headers['X-DB-Checkouts'] = str(stats.checkouts)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                logger.info(
+                    f'{scope["method"]} {_route_path(scope)} status={status_code} '
+                    f'duration_ms={(time.perf_counter() - started) * 1000:.2f} '
+                    f'sql_statements={stats.statements} sql_round_trips={stats.round_trips} '
+                    f'sql_time_ms={stats.sql_time * 1000:.2f} db_checkouts={stats.checkouts}'
+                )
+
+
+class MetricsMiddleware:
+    """Метрики HTTP-запросов: запросы в обработке, счётчик по статусам и гистограмма задержек по маршрутам."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            # Шаблон маршрута вместо пути: число рядов не зависит от ID в запросах
+            route = getattr(scope.get('route'), 'path', '<unmatched>')
+            http_requests_total.inc(scope['method'], route, str(status_code))
+            http_request_duration_seconds.observe(time.perf_counter() - started, scope['method'], route)
+
+
+class DeadlineMiddleware:
+    """
+    Дедлайн обработки запроса: ``REQUEST_TIMEOUTS`` по пути ручки или ``REQUEST_TIMEOUT``.
+
+    По истечении задача запроса отменяется вместе с текущим запросом к БД (asyncpg отправляет
+    серверу cancel, соединение возвращается в пул после ROLLBACK), клиент получает 504
+    ``REQUEST_TIMEOUT``. Остаток дедлайна передаётся в Postgres как ``statement_timeout``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        timeout = settings.REQUEST_TIMEOUTS.get(scope['path'], settings.REQUEST_TIMEOUT)
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_with_state(message: Message) -> None:
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
+        timer = asyncio.timeout(timeout)
+        try:
+            with deadline(timeout):
+                async with timer:
+                    await self.app(scope, receive, send_with_state)
+        except TimeoutError:
+            if not timer.expired():
+                raise
+            logger.warning(f'{scope["method"]} {scope["path"]} exceeded its {timeout}s deadline')
+            if not response_started:
+                response = error_response(
+                    status.HTTP_504_GATEWAY_TIMEOUT, 'REQUEST_TIMEOUT', 'request deadline exceeded'
+                )
+                await response(scope, receive, send)
+
+
+class ConsistencyMiddleware:
+    """
+    Токен read-your-writes для чтения с реплики (см. ``app.database.replica``).
+
+    Принимает ``X-Consistency-Token`` из запроса и возвращает в ответе позицию WAL, которую должны
+    видеть следующие чтения клиента: после коммита с изменениями - его позицию, иначе - токен клиента.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with consistency_scope(Headers(scope=scope).get(CONSISTENCY_HEADER)) as state:
+
+            async def send_with_token(message: Message) -> None:
+                if message['type'] == 'http.response.start' and state.min_lsn is not None:
+                    MutableHeaders(scope=message)[CONSISTENCY_HEADER] = format_lsn(state.min_lsn)
+                await send(message)
+
+            await self.app(scope, receive, send_with_token)
+
+
+def _route_path(scope: Scope) -> str:
+    # Шаблон пути маршрута, если роутинг уже состоялся, иначе фактический путь
+    route = scope.get('route')
+    return getattr(route, 'path', scope['path'])
+
+
+def _budget(scope: Scope) -> int | None:
+    return settings.QUERY_BUDGETS.get(_route_path(scope), settings.QUERY_BUDGET)
@@ -0,0 +1,39 @@
+import functools
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+import pydantic_core
+from fastapi import Response, status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый сериализатором pydantic-core (Rust) без промежуточных dict."""
+
+    def render(self, content: object) -> bytes:
+        return pydantic_core.to_json(content, by_alias=True)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Маршрут для ответов из доверенных данных собственной БД.
+
+    Схемы ответа уже собраны сервисом из строк БД, поэтому результат эндпоинта сразу отдаётся
+    в ``FastJSONResponse``: FastAPI не валидирует его повторно по ``response_model`` и не прогоняет
+    через ``jsonable_encoder`` и стандартный ``json``. Схема ответа в OpenAPI по-прежнему строится
+    из ``response_model`` или аннотации эндпоинта. Подключается на роутер:
+    ``APIRouter(..., route_class=FastJSONRoute)``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Coroutine[Any, Any, Any]], **kwargs: Any) -> None:  # noqa: ANN401
+        status_code = kwargs.get('status_code') or status.HTTP_200_OK
+
+        @functools.wraps(endpoint)
+        async def fast_endpoint(*args, **kwargs) -> Response:  # noqa: ANN002, ANN003
+            content = await endpoint(*args, **kwargs)
+            if isinstance(content, Response):
+                return content
+            return FastJSONResponse(content, status_code=status_code)
+
+        super().__init__(path, fast_endpoint, **kwargs)
@@ -13,6 +13,17 @@ class PullRequestCreateRequest(BaseModel):
     author_id: str = Field(..., description='ID автора')
 
 
+class PullRequestBatchCreateRequest(BaseModel):
+    """Запрос на пакетное создание Pull Request'ов."""
+
+    pull_requests: list[PullRequestCreateRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description='PR для создания (до 1000 за запрос)',
+    )
+
+
 class PullRequestMergeRequest(BaseModel):
     """Запрос на merge Pull Request."""
 
@@ -47,3 +58,24 @@ class PullRequestReassignResponse(BaseModel):
 
     pr: PullRequestResponse = Field(..., description='Обновлённый PR')
     replaced_by: str = Field(..., description='ID нового ревьювера')
+
+
+class BatchItemError(BaseModel):
+    """Ошибка отдельного элемента пакетного запроса."""
+
+    code: str = Field(..., description='Код ошибки, как у одиночного запроса')
+    message: str = Field(..., description='Описание ошибки')
+
+
+class PullRequestBatchItemResult(BaseModel):
+    """Результат создания одного PR из пачки."""
+
+    pull_request_id: str = Field(..., description='Идентификатор PR из запроса')
+    pr: PullRequestResponse | None = Field(None, description='Созданный PR')
+    error: BatchItemError | None = Field(None, description='Ошибка, если PR не создан')
+
+
+class PullRequestBatchCreateResponse(BaseModel):
+    """Ответ на пакетное создание PR: результаты в порядке запроса."""
+
+    results: list[PullRequestBatchItemResult] = Field(..., description='Результаты по каждому PR')
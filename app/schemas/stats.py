@@ -0,0 +1,48 @@
+"""Схемы статистики нагрузки ревьюверов."""
+
+from pydantic import BaseModel, Field
+
+
+class ReviewerDistributionItem(BaseModel):
+    """Количество PR с заданным числом ревьюверов."""
+
+    reviewers: int = Field(..., description='Число назначенных ревьюверов')
+    open: int = Field(..., description='Количество OPEN PR')
+    merged: int = Field(..., description='Количество MERGED PR')
+
+
+class PullRequestStatsResponse(BaseModel):
+    """Сводная статистика по PR."""
+
+    open_pull_requests: int = Field(..., description='Всего OPEN PR')
+    merged_pull_requests: int = Field(..., description='Всего MERGED PR')
+    reviewer_distribution: list[ReviewerDistributionItem] = Field(
+        ..., description='Распределение PR по числу ревьюверов'
+    )
+
+
+class ReviewerStats(BaseModel):
+    """Нагрузка ревьювера."""
+
+    user_id: str = Field(..., description='Идентификатор пользователя')
+    username: str = Field(..., description='Имя пользователя')
+    is_active: bool = Field(..., description='Флаг активности')
+    assigned: int = Field(..., description='Всего назначенных ревью (open + merged)')
+    open: int = Field(..., description='Назначенных OPEN PR')
+    merged: int = Field(..., description='Назначенных MERGED PR')
+
+
+class UserStatsResponse(ReviewerStats):
+    """Нагрузка пользователя с его командой."""
+
+    team_name: str = Field(..., description='Название команды')
+
+
+class TeamStatsResponse(BaseModel):
+    """Нагрузка команды: суммы по текущим участникам и разбивка по ним."""
+
+    team_name: str = Field(..., description='Название команды')
+    assigned: int = Field(..., description='Всего назначенных ревью участникам')
+    open: int = Field(..., description='Назначенных OPEN PR')
+    merged: int = Field(..., description='Назначенных MERGED PR')
+    members: list[ReviewerStats] = Field(..., description='Нагрузка участников команды')
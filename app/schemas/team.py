@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+from app.database.models import ReviewerAssignmentMode
+
 
 class TeamMember(BaseModel):
     """Схема участника команды."""
@@ -14,6 +16,10 @@ class TeamCreate(BaseModel):
 
     team_name: str = Field(..., description='Уникальное имя команды')
     members: list[TeamMember] = Field(..., description='Список участников команды')
+    assignment_mode: ReviewerAssignmentMode = Field(
+        ReviewerAssignmentMode.RANDOM,
+        description='Стратегия назначения ревьюверов (RANDOM/LEAST_LOADED)',
+    )
 
 
 class TeamResponse(BaseModel):
@@ -21,6 +27,36 @@ class TeamResponse(BaseModel):
 
     team_name: str = Field(..., description='Уникальное имя команды')
     members: list[TeamMember] = Field(..., description='Список участников команды')
+    assignment_mode: ReviewerAssignmentMode = Field(
+        ReviewerAssignmentMode.RANDOM,
+        description='Стратегия назначения ревьюверов (RANDOM/LEAST_LOADED)',
+    )
 
     class Config:
         from_attributes = True
+
+
+class TeamImportRecord(BaseModel):
+    """Строка NDJSON-импорта: участник с названием его команды."""
+
+    team_name: str = Field(..., description='Имя команды (создаётся, если её нет)')
+    user_id: str = Field(..., description='Идентификатор пользователя')
+    username: str = Field(..., description='Имя пользователя')
+    is_active: bool = Field(True, description='Флаг активности пользователя')
+
+
+class TeamImportBatch(BaseModel):
+    """Результат применения одной пачки импорта."""
+
+    batch: int = Field(..., description='Номер пачки, начиная с 1')
+    records: int = Field(..., description='Количество строк в пачке')
+    teams_created: int = Field(..., description='Создано новых команд')
+    users_upserted: int = Field(..., description='Создано или обновлено пользователей')
+
+
+class TeamImportResponse(BaseModel):
+    """Итог NDJSON-импорта команд."""
+
+    batches: list[TeamImportBatch] = Field(..., description='Прогресс по пачкам')
+    teams_created: int = Field(..., description='Всего создано команд')
+    users_upserted: int = Field(..., description='Всего создано или обновлено пользователей')
@@ -1,6 +1,8 @@
 """Схемы для работы с пользователями."""
 
-from pydantic import BaseModel, Field
+from typing import Self
+
+from pydantic import BaseModel, Field, model_validator
 
 
 class SetIsActiveRequest(BaseModel):
@@ -10,6 +12,19 @@ class SetIsActiveRequest(BaseModel):
     is_active: bool = Field(..., description='Флаг активности')
 
 
+class DeactivateUsersRequest(BaseModel):
+    """Запрос на массовую деактивацию пользователей."""
+
+    user_ids: list[str] = Field(default_factory=list, description='ID пользователей для деактивации')
+    team_name: str | None = Field(None, description='Деактивировать всех участников команды')
+
+    @model_validator(mode='after')
+    def check_target(self) -> Self:
+        if not self.user_ids and self.team_name is None:
+            raise ValueError('user_ids or team_name is required')
+        return self
+
+
 class UserResponse(BaseModel):
     """Ответ с данными пользователя."""
 
@@ -39,3 +54,28 @@ class UserReviewsResponse(BaseModel):
 
     user_id: str = Field(..., description='Идентификатор пользователя')
     pull_requests: list[PullRequestShort] = Field(..., description='Список PR для ревью')
+    next_cursor: str | None = Field(None, description='Курсор следующей страницы (если есть)')
+    total: int | None = Field(None, description='Количество PR (только в режиме count_only)')
+
+
+class ReviewerReplacement(BaseModel):
+    """Замена ревьювера на открытом PR."""
+
+    pull_request_id: str = Field(..., description='Идентификатор PR')
+    old_user_id: str = Field(..., description='Деактивированный ревьювер')
+    new_user_id: str = Field(..., description='Назначенный вместо него ревьювер')
+
+
+class UnreplacedReview(BaseModel):
+    """Открытое ревью, для которого не нашлось замены."""
+
+    pull_request_id: str = Field(..., description='Идентификатор PR')
+    user_id: str = Field(..., description='Деактивированный ревьювер, оставшийся на PR')
+
+
+class DeactivateUsersResponse(BaseModel):
+    """Итог массовой деактивации."""
+
+    deactivated: list[str] = Field(..., description='ID деактивированных пользователей')
+    reassigned: list[ReviewerReplacement] = Field(..., description='Выполненные замены ревьюверов')
+    no_candidate: list[UnreplacedReview] = Field(..., description='Ревью без доступной замены')
@@ -1,19 +1,33 @@
-import secrets
+from collections import Counter, defaultdict
+from collections.abc import Callable
 
+from app.database.backend import pull_request_repo, stats_repo, uow_factory, user_repo
+from app.database.base import UnitOfWork
 from app.database.models import PRStatus
 from app.database.repositories.pull_request import PullRequestRepo
+from app.database.repositories.stats import StatsRepo
 from app.database.repositories.user import UserRepo
 from app.exceptions import CannotReassignPrException, ModelExistException, NotFoundException
 from app.schemas.pull_request import (
+    PullRequestCreateRequest,
     PullRequestReassignResponse,
     PullRequestResponse,
 )
+from app.services.reviewers import pick_reviewers
 
 
 class PullRequestService:
-    def __init__(self, pr_repo: PullRequestRepo, user_repo: UserRepo) -> None:
+    def __init__(
+        self,
+        pr_repo: PullRequestRepo,
+        user_repo: UserRepo,
+        stats_repo: StatsRepo,
+        uow_factory: Callable[[], UnitOfWork] = UnitOfWork,
+    ) -> None:
         self.pr_repo = pr_repo
         self.user_repo = user_repo
+        self.stats_repo = stats_repo
+        self.uow_factory = uow_factory
 
     async def create_pull_request(
         self,
@@ -27,39 +41,108 @@ class PullRequestService:
         :raises ModelExistException: Pull Request уже существует.
         :raises NotFoundException: Автор не найден.
         """
-        if await self.pr_repo.exists(pull_request_id):
-            raise ModelExistException()
-
-        author = await self.user_repo.get_by_id(author_id)
-        if not author:
+        async with self.uow_factory() as session:
+            row = await self.pr_repo.create_with_reviewers(
+                pull_request_id=pull_request_id,
+                pull_request_name=pull_request_name,
+                author_id=author_id,
+                max_reviewers=2,
+                session=session,
+            )
+
+        if row.pull_request_id is None:
+            if row.pr_existed or row.author_found:
+                raise ModelExistException()
             raise NotFoundException()
 
-        pr = await self.pr_repo.create(
-            pull_request_id=pull_request_id,
-            pull_request_name=pull_request_name,
-            author_id=author_id,
-        )
+        return self._build_response(row, row.assigned_reviewers)
 
-        reviewer_ids = await self._assign_reviewers(
-            pr.pull_request_id,
-            author.team_name,
-            author_id,
-            max_reviewers=2,
-        )
-        return self._build_response(pr, reviewer_ids)
+    async def create_pull_requests_batch(
+        self,
+        requests: list[PullRequestCreateRequest],
+        max_reviewers: int = 2,
+    ) -> list[PullRequestResponse | ModelExistException | NotFoundException]:
+        """
+        Создать пачку PR в одной транзакции с теми же правилами, что и ``create_pull_request``.
+
+        Ростер каждой команды загружается один раз, ревьюверы для всей пачки вставляются
+        одним запросом. Для LEAST_LOADED нагрузка учитывает назначения внутри самой пачки.
+
+        :returns: Для каждого запроса в исходном порядке - созданный PR или исключение
+            (``ModelExistException`` / ``NotFoundException``), которое вернул бы одиночный вызов.
+        """
+        async with self.uow_factory() as session:
+            ids = [r.pull_request_id for r in requests]
+            existing_ids = await self.pr_repo.get_existing_ids(ids, session=session)
+            author_teams = await self.user_repo.get_team_names(
+                list({r.author_id for r in requests}),
+                session=session,
+            )
+
+            to_create: dict[str, PullRequestCreateRequest] = {}
+            for request in requests:
+                if request.pull_request_id in existing_ids or request.pull_request_id in to_create:
+                    continue
+                if request.author_id in author_teams:
+                    to_create[request.pull_request_id] = request
+
+            created_rows = await self.pr_repo.create_many(
+                [(r.pull_request_id, r.pull_request_name, r.author_id) for r in to_create.values()],
+                session=session,
+            )
+            created = {row.pull_request_id: row for row in created_rows}
+
+            rosters = defaultdict(list)
+            for member in await self.pr_repo.get_team_rosters(
+                list({author_teams[to_create[pr_id].author_id] for pr_id in created}),
+                session=session,
+            ):
+                rosters[member.team_name].append(member)
+            load = {member.user_id: member.open_reviews for team in rosters.values() for member in team}
+
+            reviewers: dict[str, list[str]] = {}
+            for pr_id, row in created.items():
+                candidates = [m for m in rosters[author_teams[row.author_id]] if m.user_id != row.author_id]
+                reviewers[pr_id] = pick_reviewers(candidates, load, max_reviewers)
+
+            await self.pr_repo.add_reviewers(
+                [(pr_id, user_id) for pr_id, user_ids in reviewers.items() for user_id in user_ids],
+                session=session,
+            )
+            await self.stats_repo.add_pull_requests(
+                Counter((PRStatus.OPEN.value, len(user_ids)) for user_ids in reviewers.values()),
+                session=session,
+            )
+
+        results: list[PullRequestResponse | ModelExistException | NotFoundException] = []
+        created_ids: set[str] = set()
+        for request in requests:
+            pr_id = request.pull_request_id
+            if pr_id in created and to_create[pr_id] is request:
+                results.append(self._build_response(created[pr_id], reviewers[pr_id]))
+                created_ids.add(pr_id)
+            elif pr_id in existing_ids or pr_id in created_ids or request.author_id in author_teams:
+                results.append(ModelExistException())
+            else:
+                results.append(NotFoundException())
+        return results
 
     async def merge_pull_request(self, pull_request_id: str) -> PullRequestResponse:
         """
         Пометить PR как MERGED.
 
+        Повторные вызовы для уже слитого PR обслуживаются чтением без блокировок и записи.
+
         :raises NotFoundException: Если PR не найден.
         """
-        pr = await self.pr_repo.merge(pull_request_id)
+        async with self.uow_factory() as session:
+            pr = await self.pr_repo.get_with_reviewers(pull_request_id, session=session)
+            if pr is not None and pr.status == PRStatus.OPEN.value:
+                pr = await self.pr_repo.merge(pull_request_id, session=session)
         if not pr:
             raise NotFoundException()
 
-        reviewers = await self.pr_repo.get_reviewers(pull_request_id)
-        return self._build_response(pr, reviewers)
+        return self._build_response(pr, pr.assigned_reviewers)
 
     async def reassign_reviewer(
         self,
@@ -69,83 +152,39 @@ class PullRequestService:
         """
         Переназначить ревьювера на другого из его команды.
 
-        :raises NotFoundException: Не найден PR или ревьювер.
+        Строка PR блокируется на всю транзакцию, поэтому параллельные переназначения
+        одного PR выполняются по очереди и видят актуальный состав ревьюверов.
+
+        :raises NotFoundException: PR не найден.
         :raises CannotReassignPrException: Нарушение правил переназначения PR.
         """
-        # Получаем PR
-        pr = await self.pr_repo.get_by_id(pull_request_id)
-        if not pr:
-            raise NotFoundException()
-
-        if pr.status == PRStatus.MERGED.value:
-            raise CannotReassignPrException()
-
-        current_reviewers = await self.pr_repo.get_reviewers(pull_request_id)
-        if old_user_id not in current_reviewers:
-            raise CannotReassignPrException()
-
-        old_reviewer = await self.user_repo.get_by_id(old_user_id)
-        if old_reviewer is None:
-            raise NotFoundException()
-
-        exclude_ids = [pr.author_id, *current_reviewers]
-        candidates = await self.pr_repo.get_active_team_members(
-            team_name=old_reviewer.team_name,
-            exclude_user_id=None,
-        )
-        available_candidates = [c for c in candidates if c.user_id not in exclude_ids]
-
-        if not available_candidates:
-            raise CannotReassignPrException()
-
-        new_reviewer = available_candidates[secrets.randbelow(len(available_candidates))]
-
-        await self.pr_repo.remove_reviewer(pull_request_id, old_user_id)
-        await self.pr_repo.add_reviewer(pull_request_id, new_reviewer.user_id)
-
-        updated_reviewers = await self.pr_repo.get_reviewers(pull_request_id)
-        updated_pr = await self.pr_repo.get_by_id(pull_request_id)
-
+        async with self.uow_factory() as session:
+            pr = await self.pr_repo.get_for_update(pull_request_id, session=session)
+            if not pr:
+                raise NotFoundException()
+
+            if pr.status == PRStatus.MERGED.value:
+                raise CannotReassignPrException()
+
+            current_reviewers = await self.pr_repo.get_reviewers(pull_request_id, session=session)
+            if old_user_id not in current_reviewers:
+                raise CannotReassignPrException()
+
+            new_reviewer_id = await self.pr_repo.swap_reviewer(
+                pull_request_id,
+                old_user_id,
+                exclude_user_ids=[pr.author_id, *current_reviewers],
+                session=session,
+            )
+            if new_reviewer_id is None:
+                raise CannotReassignPrException()
+
+        updated_reviewers = [new_reviewer_id if user_id == old_user_id else user_id for user_id in current_reviewers]
         return PullRequestReassignResponse(
-            pr=self._build_response(updated_pr, updated_reviewers),
-            replaced_by=new_reviewer.user_id,
-        )
-
-    async def _assign_reviewers(
-        self,
-        pull_request_id: str,
-        team_name: str,
-        author_id: str,
-        max_reviewers: int = 2,
-    ) -> list[str]:
-        """
-        Назначить до N ревьюверов из команды (исключая автора, только активные).
-
-        :returns: Список ID назначенных ревьюверов.
-        """
-        candidates = await self.pr_repo.get_active_team_members(
-            team_name=team_name,
-            exclude_user_id=author_id,
+            pr=self._build_response(pr, updated_reviewers),
+            replaced_by=new_reviewer_id,
         )
 
-        selected_count = min(len(candidates), max_reviewers)
-        if candidates:
-            indices = list(range(len(candidates)))
-            selected_indices = []
-            for _ in range(selected_count):
-                idx = secrets.randbelow(len(indices))
-                selected_indices.append(indices.pop(idx))
-            selected_reviewers = [candidates[i] for i in selected_indices]
-        else:
-            selected_reviewers = []
-
-        reviewer_ids = []
-        for reviewer in selected_reviewers:
-            await self.pr_repo.add_reviewer(pull_request_id, reviewer.user_id)
-            reviewer_ids.append(reviewer.user_id)
-
-        return reviewer_ids
-
     def _build_response(self, pr, reviewers: list[str]) -> PullRequestResponse:
         return PullRequestResponse(
             pull_request_id=pr.pull_request_id,
@@ -159,6 +198,8 @@ class PullRequestService:
 
 
 pull_request_service = PullRequestService(
-    pr_repo=PullRequestRepo(),
-    user_repo=UserRepo(),
+    pr_repo=pull_request_repo,
+    user_repo=user_repo,
+    stats_repo=stats_repo,
+    uow_factory=uow_factory,
 )
@@ -0,0 +1,29 @@
+import secrets
+
+from sqlalchemy import Row
+
+from app.database.models import ReviewerAssignmentMode
+
+_random = secrets.SystemRandom()
+
+
+def pick_reviewers(candidates: list[Row], load: dict[str, int], max_reviewers: int) -> list[str]:
+    """
+    Выбрать до ``max_reviewers`` ревьюверов из ростера команды по её стратегии назначения.
+
+    ``candidates`` - строки ``PullRequestRepo.get_team_rosters``, уже без исключённых пользователей.
+    ``load`` - текущее число открытых ревью; обновляется выбранными назначениями, чтобы
+    следующие выборы в той же пачке учитывали их.
+    """
+    if not candidates:
+        return []
+
+    if candidates[0].assignment_mode == ReviewerAssignmentMode.LEAST_LOADED.value:
+        shuffled = _random.sample(candidates, len(candidates))
+        selected = sorted(shuffled, key=lambda m: load[m.user_id])[:max_reviewers]
+    else:
+        selected = _random.sample(candidates, min(len(candidates), max_reviewers))
+
+    for member in selected:
+        load[member.user_id] += 1
+    return [member.user_id for member in selected]
@@ -0,0 +1,101 @@
+from collections import defaultdict
+from collections.abc import Callable
+
+from app.database.base import UnitOfWork
+from app.database.models import PRStatus
+from app.database.repositories.stats import StatsRepo
+from app.database.repositories.team import TeamRepo
+from app.exceptions import NotFoundException
+from app.schemas.stats import (
+    PullRequestStatsResponse,
+    ReviewerDistributionItem,
+    ReviewerStats,
+    TeamStatsResponse,
+    UserStatsResponse,
+)
+
+
+class StatsService:
+    def __init__(
+        self,
+        stats_repo: StatsRepo,
+        team_repo: TeamRepo,
+        uow_factory: Callable[..., UnitOfWork] = UnitOfWork,
+    ) -> None:
+        self.stats_repo = stats_repo
+        self.team_repo = team_repo
+        self.uow_factory = uow_factory
+
+    async def get_pull_request_stats(self) -> PullRequestStatsResponse:
+        """Возвращает количество PR по статусам и распределение PR по числу ревьюверов."""
+        async with self.uow_factory(read_only=True) as session:
+            rows = await self.stats_repo.get_pull_request_stats(session=session)
+
+        distribution: dict[int, dict[str, int]] = defaultdict(lambda: dict.fromkeys(PRStatus, 0))
+        for row in rows:
+            distribution[row.reviewer_count][PRStatus(row.status)] += row.pull_requests
+
+        return PullRequestStatsResponse(
+            open_pull_requests=sum(counts[PRStatus.OPEN] for counts in distribution.values()),
+            merged_pull_requests=sum(counts[PRStatus.MERGED] for counts in distribution.values()),
+            reviewer_distribution=[
+                ReviewerDistributionItem(
+                    reviewers=reviewers,
+                    open=counts[PRStatus.OPEN],
+                    merged=counts[PRStatus.MERGED],
+                )
+                for reviewers, counts in sorted(distribution.items())
+            ],
+        )
+
+    async def get_team_stats(self, team_name: str) -> TeamStatsResponse:
+        """
+        Возвращает нагрузку участников команды и её суммы.
+
+        :raises NotFoundException: Команда не найдена.
+        """
+        async with self.uow_factory(read_only=True) as session:
+            members = await self.stats_repo.get_team_member_stats(team_name, session=session)
+            if not members and not await self.team_repo.exists(team_name, session=session):
+                raise NotFoundException()
+
+        member_stats = [
+            ReviewerStats(
+                user_id=member.user_id,
+                username=member.username,
+                is_active=member.is_active,
+                assigned=member.open_reviews + member.merged_reviews,
+                open=member.open_reviews,
+                merged=member.merged_reviews,
+            )
+            for member in members
+        ]
+
+        return TeamStatsResponse(
+            team_name=team_name,
+            assigned=sum(member.assigned for member in member_stats),
+            open=sum(member.open for member in member_stats),
+            merged=sum(member.merged for member in member_stats),
+            members=member_stats,
+        )
+
+    async def get_user_stats(self, user_id: str) -> UserStatsResponse:
+        """
+        Возвращает нагрузку пользователя.
+
+        :raises NotFoundException: Пользователь не найден.
+        """
+        async with self.uow_factory(read_only=True) as session:
+            user = await self.stats_repo.get_user_stats(user_id, session=session)
+        if not user:
+            raise NotFoundException()
+
+        return UserStatsResponse(
+            user_id=user.user_id,
+            username=user.username,
+            team_name=user.team_name,
+            is_active=user.is_active,
+            assigned=user.open_reviews + user.merged_reviews,
+            open=user.open_reviews,
+            merged=user.merged_reviews,
+        )
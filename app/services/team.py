@@ -1,13 +1,32 @@
+from collections.abc import AsyncIterable, Callable
+
+from loguru import logger
+
+from app.config import settings
+from app.database.base import UnitOfWork
 from app.database.repositories.team import TeamRepo
 from app.database.repositories.user import UserRepo
 from app.exceptions import ModelExistException, NotFoundException
-from app.schemas.team import TeamCreate, TeamMember, TeamResponse
+from app.schemas.team import (
+    TeamCreate,
+    TeamImportBatch,
+    TeamImportRecord,
+    TeamImportResponse,
+    TeamMember,
+    TeamResponse,
+)
 
 
 class TeamService:
-    def __init__(self, team_repo: TeamRepo, user_repo: UserRepo) -> None:
+    def __init__(
+        self,
+        team_repo: TeamRepo,
+        user_repo: UserRepo,
+        uow_factory: Callable[[], UnitOfWork] = UnitOfWork,
+    ) -> None:
         self.team_repo = team_repo
         self.user_repo = user_repo
+        self.uow_factory = uow_factory
 
     async def add_team(self, team_data: TeamCreate) -> TeamResponse:
         """
@@ -15,31 +34,37 @@ class TeamService:
 
         :raises ModelExistException: Команда уже существует.
         """
-        team_exists = await self.team_repo.exists(team_data.team_name)
-        if team_exists:
-            raise ModelExistException()
+        async with self.uow_factory() as session:
+            team_exists = await self.team_repo.exists(team_data.team_name, session=session)
+            if team_exists:
+                raise ModelExistException()
+
+            team = await self.team_repo.create(
+                team_data.team_name,
+                assignment_mode=team_data.assignment_mode,
+                session=session,
+            )
 
-        team = await self.team_repo.create(team_data.team_name)
+            # Повторный user_id в запросе перезаписывает предыдущий, как и при поштучном сохранении
+            members = list({member.user_id: member for member in team_data.members}.values())
+            await self.user_repo.bulk_upsert(
+                [(m.user_id, m.username, team_data.team_name, m.is_active) for m in members],
+                session=session,
+            )
 
-        created_members = []
-        for member in team_data.members:
-            user = await self.user_repo.create_or_update(
+        created_members = [
+            TeamMember(
                 user_id=member.user_id,
                 username=member.username,
-                team_name=team_data.team_name,
                 is_active=member.is_active,
             )
-            created_members.append(
-                TeamMember(
-                    user_id=user.user_id,
-                    username=user.username,
-                    is_active=user.is_active,
-                )
-            )
+            for member in members
+        ]
 
         return TeamResponse(
             team_name=team.team_name,
             members=created_members,
+            assignment_mode=team.assignment_mode,
         )
 
     async def get_team(self, team_name: str) -> TeamResponse:
@@ -48,7 +73,9 @@ class TeamService:
 
         :raises NotFoundException: Команда не найдена.
         """
-        team = await self.team_repo.get_by_name(team_name)
+        # Не read_only: промах кэша составов читается с основного сервера и наполняет кэш (см. TeamRepo.get_by_name)
+        async with self.uow_factory() as session:
+            team = await self.team_repo.get_by_name(team_name, session=session)
 
         if not team:
             raise NotFoundException()
@@ -65,4 +92,57 @@ class TeamService:
         return TeamResponse(
             team_name=team.team_name,
             members=members,
+            assignment_mode=team.assignment_mode,
+        )
+
+    async def import_members(
+        self,
+        records: AsyncIterable[TeamImportRecord],
+        batch_size: int = settings.TEAM_IMPORT_BATCH_SIZE,
+    ) -> TeamImportResponse:
+        """
+        Потоково импортирует участников команд пачками по ``batch_size`` строк.
+
+        Каждая пачка применяется в своей транзакции: недостающие команды создаются,
+        пользователи создаются или обновляются. Уже применённые пачки не откатываются,
+        если ошибка случилась в следующей.
+        """
+        batches: list[TeamImportBatch] = []
+        pending: list[TeamImportRecord] = []
+
+        async for record in records:
+            pending.append(record)
+            if len(pending) >= batch_size:
+                batches.append(await self._apply_import_batch(len(batches) + 1, pending))
+                pending = []
+
+        if pending:
+            batches.append(await self._apply_import_batch(len(batches) + 1, pending))
+
+        return TeamImportResponse(
+            batches=batches,
+            teams_created=sum(b.teams_created for b in batches),
+            users_upserted=sum(b.users_upserted for b in batches),
+        )
+
+    async def _apply_import_batch(self, number: int, records: list[TeamImportRecord]) -> TeamImportBatch:
+        members = {record.user_id: record for record in records}
+        async with self.uow_factory() as session:
+            teams_created = await self.team_repo.create_missing(
+                sorted({record.team_name for record in records}),
+                session=session,
+            )
+            users_upserted = await self.user_repo.bulk_upsert(
+                [(m.user_id, m.username, m.team_name, m.is_active) for m in members.values()],
+                session=session,
+            )
+
+        logger.info(
+            f'team import batch {number}: {len(records)} records, {teams_created} teams, {users_upserted} users'
+        )
+        return TeamImportBatch(
+            batch=number,
+            records=len(records),
+            teams_created=teams_created,
+            users_upserted=users_upserted,
         )
@@ -1,11 +1,34 @@
+import base64
+from collections import defaultdict
+from collections.abc import Callable
+
+from app.database.backend import pull_request_repo, uow_factory, user_repo
+from app.database.base import UnitOfWork
+from app.database.models import PRStatus
+from app.database.repositories.pull_request import PullRequestRepo
 from app.database.repositories.user import UserRepo
-from app.exceptions import NotFoundException
-from app.schemas.user import PullRequestShort, UserResponse, UserReviewsResponse
+from app.exceptions import InvalidCursorException, NotFoundException
+from app.schemas.user import (
+    DeactivateUsersResponse,
+    PullRequestShort,
+    ReviewerReplacement,
+    UnreplacedReview,
+    UserResponse,
+    UserReviewsResponse,
+)
+from app.services.reviewers import pick_reviewers
 
 
 class UserService:
-    def __init__(self, user_repo: UserRepo) -> None:
+    def __init__(
+        self,
+        user_repo: UserRepo,
+        pr_repo: PullRequestRepo,
+        uow_factory: Callable[..., UnitOfWork] = UnitOfWork,
+    ) -> None:
         self.user_repo = user_repo
+        self.pr_repo = pr_repo
+        self.uow_factory = uow_factory
 
     async def set_is_active(self, user_id: str, is_active: bool) -> UserResponse:
         """
@@ -13,7 +36,8 @@ class UserService:
 
         :raises NotFoundException: Пользователь не найден.
         """
-        user = await self.user_repo.update_is_active(user_id=user_id, is_active=is_active)
+        async with self.uow_factory() as session:
+            user = await self.user_repo.update_is_active(user_id=user_id, is_active=is_active, session=session)
         if not user:
             raise NotFoundException()
 
@@ -24,17 +48,121 @@ class UserService:
             is_active=user.is_active,
         )
 
-    async def get_reviews(self, user_id: str) -> UserReviewsResponse:
+    async def deactivate_users(
+        self,
+        user_ids: list[str],
+        team_name: str | None = None,
+    ) -> DeactivateUsersResponse:
+        """
+        Деактивирует пользователей и заменяет их на всех открытых PR в одной транзакции.
+
+        Замена берётся из активных участников команды снятого ревьювера (кроме автора
+        и текущих ревьюверов PR) по стратегии команды. Если кандидата нет, ревьювер
+        остаётся на PR и попадает в ``no_candidate``.
+
+        :raises NotFoundException: Не найдено ни одного пользователя.
         """
-        Возвращает все PR, где пользователь назначен ревьювером.
+        async with self.uow_factory() as session:
+            # PR блокируются раньше пользователей, как в create/reassign/merge
+            assignments = await self.pr_repo.get_open_assignments(user_ids, team_name, session=session)
+            deactivated = await self.user_repo.deactivate_many(user_ids, team_name, session=session)
+            if not deactivated:
+                raise NotFoundException()
+
+            pr_reviewers = await self.pr_repo.get_reviewers_many(
+                sorted({a.pull_request_id for a in assignments}),
+                session=session,
+            )
+
+            rosters = defaultdict(list)
+            for member in await self.pr_repo.get_team_rosters(
+                sorted({a.team_name for a in assignments}),
+                session=session,
+            ):
+                rosters[member.team_name].append(member)
+            load = {member.user_id: member.open_reviews for team in rosters.values() for member in team}
+
+            reassigned: list[ReviewerReplacement] = []
+            no_candidate: list[UnreplacedReview] = []
+            for assignment in assignments:
+                current = pr_reviewers[assignment.pull_request_id]
+                candidates = [
+                    m
+                    for m in rosters[assignment.team_name]
+                    if m.user_id != assignment.author_id and m.user_id not in current
+                ]
+                picked = pick_reviewers(candidates, load, max_reviewers=1)
+                if not picked:
+                    no_candidate.append(
+                        UnreplacedReview(pull_request_id=assignment.pull_request_id, user_id=assignment.user_id)
+                    )
+                    continue
+
+                current.remove(assignment.user_id)
+                current.append(picked[0])
+                reassigned.append(
+                    ReviewerReplacement(
+                        pull_request_id=assignment.pull_request_id,
+                        old_user_id=assignment.user_id,
+                        new_user_id=picked[0],
+                    )
+                )
+
+            await self.pr_repo.remove_reviewers(
+                [(r.pull_request_id, r.old_user_id) for r in reassigned],
+                session=session,
+            )
+            await self.pr_repo.add_reviewers(
+                [(r.pull_request_id, r.new_user_id) for r in reassigned],
+                session=session,
+            )
+
+        return DeactivateUsersResponse(
+            deactivated=deactivated,
+            reassigned=reassigned,
+            no_candidate=no_candidate,
+        )
+
+    async def get_reviews(
+        self,
+        user_id: str,
+        status: PRStatus | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        count_only: bool = False,
+    ) -> UserReviewsResponse:
+        """
+        Возвращает PR, где пользователь назначен ревьювером.
+
+        Без ``limit`` возвращаются все подходящие PR; с ``limit`` - страница
+        и ``next_cursor`` для продолжения. В режиме ``count_only`` заполняется только ``total``.
 
         :raises NotFoundException: Пользователь не найден.
+        :raises InvalidCursorException: Некорректный курсор.
         """
-        user = await self.user_repo.get_by_id(user_id)
-        if not user:
-            raise NotFoundException()
+        after = _decode_cursor(cursor) if cursor is not None else None
+
+        async with self.uow_factory(read_only=True) as session:
+            user = await self.user_repo.get_by_id(user_id, session=session)
+            if not user:
+                raise NotFoundException()
 
-        pull_requests = await self.user_repo.get_assigned_pull_requests(user_id)
+            if count_only:
+                total = await self.user_repo.count_assigned_pull_requests(user_id, status=status, session=session)
+                return UserReviewsResponse(user_id=user_id, pull_requests=[], total=total)
+
+            pull_requests = await self.user_repo.get_assigned_pull_requests(
+                user_id,
+                status=status,
+                after=after,
+                limit=limit + 1 if limit is not None else None,
+                session=session,
+            )
+
+        next_cursor = None
+        if limit is not None and len(pull_requests) > limit:
+            pull_requests = pull_requests[:limit]
+            next_cursor = _encode_cursor(pull_requests[-1].pull_request_id)
 
         pr_short_list = [
             PullRequestShort(
@@ -49,7 +177,22 @@ class UserService:
         return UserReviewsResponse(
             user_id=user_id,
             pull_requests=pr_short_list,
+            next_cursor=next_cursor,
         )
 
 
-user_service = UserService(user_repo=UserRepo())
+def _encode_cursor(pull_request_id: str) -> str:
+    return base64.urlsafe_b64encode(pull_request_id.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        pull_request_id = base64.b64decode(cursor + '=' * (-len(cursor) % 4), altchars=b'-_', validate=True).decode()
+    except ValueError as e:
+        raise InvalidCursorException() from e
+    if not pull_request_id:
+        raise InvalidCursorException()
+    return pull_request_id
+
+
+user_service = UserService(user_repo=user_repo, pr_repo=pull_request_repo, uow_factory=uow_factory)
@@ -0,0 +1,446 @@
+"""
+Синтетическая нагрузка на все основные ручки сервиса.
+
+Генератор заполняет локальную БД командами реалистичного размера и историей PR, затем
+по очереди гоняет сценарии ``import``, ``create``, ``reassign``, ``merge`` и ``getReview``
+против приложения FastAPI в том же процессе (через ASGI, без HTTP-сервера). Нагрузка задаётся
+фиксированным числом одновременных клиентов (``--concurrency``) или частотой прихода запросов
+(``--rate``, пуассоновский поток). Для каждой ручки считаются пропускная способность,
+задержки p50/p95/p99 и количество SQL-запросов на запрос (``track_queries``).
+
+Результаты сохраняются в JSON и сравниваются между прогонами:
+
+    python -m benchmarks.load run --concurrency 16 --duration 10 --output before.json
+    python -m benchmarks.load run --concurrency 16 --duration 10 --output after.json
+    python -m benchmarks.load compare before.json after.json --threshold 10
+
+``compare`` завершается с кодом 1, если p95 или пропускная способность ухудшились больше
+чем на ``--threshold`` процентов либо выросло число SQL-запросов на запрос.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+from loguru import logger
+
+from app.config import settings
+from app.database.backend import team_repo, uow_factory, user_repo
+from app.database.base import admission, async_engine, track_queries
+from app.main import app
+from app.schemas.pull_request import PullRequestCreateRequest
+from app.services.pull_request import pull_request_service
+
+SCENARIOS = ('import', 'create', 'reassign', 'merge', 'getReview')
+# Доля неактивных пользователей в сгенерированных командах
+INACTIVE_SHARE = 0.1
+# Допуск на рост среднего числа SQL-запросов при сравнении прогонов
+STATEMENTS_TOLERANCE = 0.05
+
+
+@dataclass
+class Response:
+    status: int
+    body: bytes
+
+    def json(self) -> Any:  # noqa: ANN401
+        return json.loads(self.body)
+
+
+@dataclass
+class EndpointStats:
+    """Сырые замеры одной ручки."""
+
+    latencies: list[float] = field(default_factory=list)
+    statements: list[int] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(q: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3)
+
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'latency_ms': {
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': round(latencies[-1] * 1000, 3),
+            },
+            'statements_per_request': round(statistics.fmean(self.statements), 2),
+        }
+
+
+async def request(
+    method: str,
+    path: str,
+    payload: object = None,
+    *,
+    query: dict[str, str] | None = None,
+    body: bytes | None = None,
+) -> tuple[Response, int]:
+    """Выполнить запрос к приложению через ASGI и вернуть ответ и число SQL-запросов."""
+    if body is None:
+        body = json.dumps(payload).encode() if payload is not None else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': urlencode(query or {}).encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'load'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('load', 80),
+    }
+    request_sent = False
+    status = 0
+    chunks: list[bytes] = []
+
+    async def receive() -> dict[str, Any]:
+        nonlocal request_sent
+        if request_sent:
+            return {'type': 'http.disconnect'}
+        request_sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    with track_queries() as stats:
+        await app(scope, receive, send)
+    return Response(status, b''.join(chunks)), stats.statements
+
+
+@dataclass
+class Dataset:
+    """Состояние сгенерированных данных, которое сценарии читают и меняют."""
+
+    rng: random.Random
+    prefix: str
+    users: list[str] = field(default_factory=list)
+    open_pull_requests: dict[str, list[str]] = field(default_factory=dict)
+    sequence: int = 0
+
+    def next_id(self, kind: str) -> str:
+        self.sequence += 1
+        return f'{self.prefix}-{kind}-{self.sequence}'
+
+    def team_size(self) -> int:
+        # Логнормальное распределение: медиана ~8 человек, редкие команды до 200
+        return max(2, min(200, round(self.rng.lognormvariate(2.1, 0.8))))
+
+    def team_members(self, team_name: str) -> list[tuple[str, str, str, bool]]:
+        return [
+            (user_id, f'User {user_id}', team_name, self.rng.random() >= INACTIVE_SHARE)
+            for user_id in (self.next_id('u') for _ in range(self.team_size()))
+        ]
+
+
+async def seed(dataset: Dataset, teams: int, pull_requests_per_user: float, merged_share: float) -> None:
+    """Создать команды и историю PR напрямую через репозитории и сервис."""
+    started = time.perf_counter()
+    members: list[tuple[str, str, str, bool]] = []
+    team_names = [dataset.next_id('team') for _ in range(teams)]
+    for team_name in team_names:
+        members.extend(dataset.team_members(team_name))
+    async with uow_factory() as session:
+        await team_repo.create_missing(team_names, session=session)
+        await user_repo.bulk_upsert(members, session=session)
+    dataset.users = [member[0] for member in members]
+
+    requests = [
+        PullRequestCreateRequest(
+            pull_request_id=dataset.next_id('pr'),
+            pull_request_name='Seeded change',
+            author_id=dataset.rng.choice(dataset.users),
+        )
+        for _ in range(round(len(dataset.users) * pull_requests_per_user))
+    ]
+    for offset in range(0, len(requests), 1000):
+        for result in await pull_request_service.create_pull_requests_batch(requests[offset : offset + 1000]):
+            if not isinstance(result, Exception):
+                dataset.open_pull_requests[result.pull_request_id] = list(result.assigned_reviewers)
+
+    to_merge = dataset.rng.sample(sorted(dataset.open_pull_requests), round(len(requests) * merged_share))
+    # Не больше параллельных сессий, чем слотов admission control: сидинг не должен получать отказы
+    for offset in range(0, len(to_merge), admission.capacity):
+        chunk = to_merge[offset : offset + admission.capacity]
+        await asyncio.gather(*(pull_request_service.merge_pull_request(pr_id) for pr_id in chunk))
+        for pr_id in chunk:
+            del dataset.open_pull_requests[pr_id]
+
+    logger.info(
+        f'seeded {teams} teams, {len(dataset.users)} users, {len(requests)} PRs '
+        f'({len(to_merge)} merged) in {time.perf_counter() - started:.1f}s'
+    )
+
+
+Operation = Callable[[], Awaitable[tuple[Response, int] | None]]
+
+
+def scenario_operation(name: str, dataset: Dataset) -> Operation:
+    """Собрать функцию одного запроса сценария."""
+    rng = dataset.rng
+
+    async def import_team() -> tuple[Response, int]:
+        team_name = dataset.next_id('team')
+        lines = [
+            json.dumps({'team_name': team_name, 'user_id': user_id, 'username': username, 'is_active': is_active})
+            for user_id, username, _, is_active in dataset.team_members(team_name)
+        ]
+        response = await request('POST', '/team/import', body='\n'.join(lines).encode())
+        dataset.users.extend(json.loads(line)['user_id'] for line in lines)
+        return response
+
+    async def create() -> tuple[Response, int]:
+        payload = {
+            'pull_request_id': dataset.next_id('pr'),
+            'pull_request_name': 'Load test change',
+            'author_id': rng.choice(dataset.users),
+        }
+        response, statements = await request('POST', '/pullRequest/create', payload)
+        if response.status == HTTPStatus.CREATED:
+            pr = response.json()['pr']
+            dataset.open_pull_requests[pr['pull_request_id']] = pr['assigned_reviewers']
+        return response, statements
+
+    async def reassign() -> tuple[Response, int] | None:
+        candidates = [pr_id for pr_id, reviewers in dataset.open_pull_requests.items() if reviewers]
+        if not candidates:
+            return None
+        pr_id = rng.choice(candidates)
+        old_user_id = rng.choice(dataset.open_pull_requests[pr_id])
+        payload = {'pull_request_id': pr_id, 'old_user_id': old_user_id}
+        response, statements = await request('POST', '/pullRequest/reassign', payload)
+        if response.status == HTTPStatus.OK:
+            dataset.open_pull_requests[pr_id] = response.json()['pr']['assigned_reviewers']
+        return response, statements
+
+    async def merge() -> tuple[Response, int] | None:
+        if not dataset.open_pull_requests:
+            return None
+        pr_id = rng.choice(list(dataset.open_pull_requests))
+        del dataset.open_pull_requests[pr_id]
+        return await request('POST', '/pullRequest/merge', {'pull_request_id': pr_id})
+
+    async def get_review() -> tuple[Response, int]:
+        return await request('GET', '/users/getReview', query={'user_id': rng.choice(dataset.users)})
+
+    return {
+        'import': import_team,
+        'create': create,
+        'reassign': reassign,
+        'merge': merge,
+        'getReview': get_review,
+    }[name]
+
+
+async def _execute(operation: Operation, stats: EndpointStats, scheduled: float | None = None) -> bool:
+    started = scheduled if scheduled is not None else time.perf_counter()
+    result = await operation()
+    if result is None:
+        return False
+    response, statements = result
+    stats.latencies.append(time.perf_counter() - started)
+    stats.statements.append(statements)
+    if response.status >= HTTPStatus.BAD_REQUEST:
+        stats.errors += 1
+    return True
+
+
+async def drive(operation: Operation, duration: float, concurrency: int | None, rate: float | None) -> EndpointStats:
+    """
+    Гонять сценарий ``duration`` секунд.
+
+    С ``concurrency`` - замкнутый цикл: столько клиентов шлют запросы друг за другом.
+    С ``rate`` - открытый цикл: запросы приходят пуассоновским потоком независимо от ответов,
+    задержка считается от запланированного момента прихода (с учётом очереди).
+    """
+    stats = EndpointStats()
+    deadline = time.perf_counter() + duration
+
+    if rate is None:
+
+        async def client() -> None:
+            while time.perf_counter() < deadline:
+                if not await _execute(operation, stats):
+                    return
+
+        await asyncio.gather(*(client() for _ in range(concurrency or 1)))
+        return stats
+
+    rng = random.Random()  # noqa: S311
+    tasks: list[asyncio.Task] = []
+    scheduled = time.perf_counter()
+    while scheduled < deadline:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        tasks.append(asyncio.create_task(_execute(operation, stats, scheduled)))
+        scheduled += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def _git_revision() -> str | None:
+    try:
+        result = subprocess.run(  # noqa: S603
+            ['git', 'rev-parse', '--short', 'HEAD'],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    dataset = Dataset(rng=random.Random(args.seed), prefix=f'lt{uuid.uuid4().hex[:6]}')  # noqa: S311
+    results: dict[str, Any] = {}
+    try:
+        await seed(dataset, args.teams, args.pull_requests_per_user, args.merged_share)
+        for name in args.scenarios:
+            started = time.perf_counter()
+            stats = await drive(scenario_operation(name, dataset), args.duration, args.concurrency, args.rate)
+            elapsed = time.perf_counter() - started
+            if not stats.latencies:
+                logger.warning(f'{name}: no requests were made (nothing left to operate on)')
+                continue
+            results[name] = stats.summary(elapsed)
+            summary = results[name]
+            logger.info(
+                f'{name:<10} {summary["throughput_rps"]:8.1f} rps | '
+                f'p50 {summary["latency_ms"]["p50"]:7.2f} ms p95 {summary["latency_ms"]["p95"]:7.2f} ms '
+                f'p99 {summary["latency_ms"]["p99"]:7.2f} ms | '
+                f'{summary["statements_per_request"]:.2f} stmts/req | {summary["errors"]} errors'
+            )
+    finally:
+        await async_engine.dispose()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(UTC).isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'backend': settings.REPOSITORY_BACKEND,
+            'concurrency': args.concurrency if args.rate is None else None,
+            'rate': args.rate,
+            'duration': args.duration,
+            'seed': args.seed,
+            'teams': args.teams,
+            'pull_requests_per_user': args.pull_requests_per_user,
+            'merged_share': args.merged_share,
+        },
+        'endpoints': results,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Сравнить два прогона и вернуть описания регрессий."""
+    settings_keys = (
+        'backend',
+        'concurrency',
+        'rate',
+        'duration',
+        'seed',
+        'teams',
+        'pull_requests_per_user',
+        'merged_share',
+    )
+    differing = [key for key in settings_keys if baseline['meta'].get(key) != current['meta'].get(key)]
+    if differing:
+        logger.warning(f'runs used different load settings ({", ".join(differing)}): results are not comparable')
+
+    regressions = []
+    for name, before in baseline['endpoints'].items():
+        after = current['endpoints'].get(name)
+        if after is None:
+            continue
+        throughput = (after['throughput_rps'] / before['throughput_rps'] - 1) * 100
+        p95 = (after['latency_ms']['p95'] / before['latency_ms']['p95'] - 1) * 100
+        statements = after['statements_per_request'] - before['statements_per_request']
+        logger.info(
+            f'{name:<10} throughput {before["throughput_rps"]:8.1f} -> {after["throughput_rps"]:8.1f} rps '
+            f'({throughput:+.0f}%) | p95 {before["latency_ms"]["p95"]:7.2f} -> {after["latency_ms"]["p95"]:7.2f} ms '
+            f'({p95:+.0f}%) | stmts/req {before["statements_per_request"]:.2f} -> {after["statements_per_request"]:.2f}'
+        )
+        if throughput < -threshold:
+            regressions.append(f'{name}: throughput {throughput:+.0f}%')
+        if p95 > threshold:
+            regressions.append(f'{name}: p95 latency {p95:+.0f}%')
+        # Число запросов к БД детерминировано: любой рост - регрессия
+        if statements > STATEMENTS_TOLERANCE:
+            regressions.append(f'{name}: statements per request {statements:+.2f}')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Синтетическая нагрузка на ручки сервиса')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Заполнить БД и прогнать сценарии')
+    load = run_parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=16, help='Число одновременных клиентов')
+    load.add_argument('--rate', type=float, help='Частота прихода запросов, запросов в секунду')
+    run_parser.add_argument('--duration', type=float, default=10.0, help='Длительность каждого сценария, секунд')
+    run_parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument('--teams', type=int, default=100, help='Количество команд при заполнении')
+    run_parser.add_argument('--pull-requests-per-user', type=float, default=3.0)
+    run_parser.add_argument('--merged-share', type=float, default=0.7, help='Доля слитых PR в истории')
+    run_parser.add_argument('--seed', type=int, default=0, help='Seed генератора данных')
+    run_parser.add_argument('--output', type=Path, help='Куда сохранить результаты в JSON')
+
+    compare_parser = commands.add_parser('compare', help='Сравнить два прогона')
+    compare_parser.add_argument('baseline', type=Path)
+    compare_parser.add_argument('current', type=Path)
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help='Допустимое ухудшение, %%')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        # Строки лога приложения на каждый запрос только мешают читать итоги
+        logger.disable('app')
+        results = asyncio.run(run(args))
+        if args.output:
+            args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+            logger.info(f'results saved to {args.output}')
+        return
+
+    regressions = compare(
+        json.loads(args.baseline.read_text()),
+        json.loads(args.current.read_text()),
+        args.threshold,
+    )
+    for regression in regressions:
+        logger.error(f'regression: {regression}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
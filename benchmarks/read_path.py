@@ -0,0 +1,179 @@
+"""
+Микробенчмарк read-путей: ORM-гидрация против Core-выборок колонок.
+
+Для каждого чтения (пользователь, команда, PR) сравнивается прежний ORM-запрос
+с маппингом в схему ответа и текущий Core-путь репозиториев. Меряется CPU-время
+процесса и пик аллокаций (tracemalloc) на один запрос сверх пустого запроса ``SELECT 1``
+в той же транзакции: так вычитаются пул соединений, буферы драйвера и сама UnitOfWork.
+
+Запуск против поднятой БД: ``python -m benchmarks.read_path [--iterations N]``.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.database.base import UnitOfWork, async_engine
+from app.database.cache import roster_cache
+from app.database.models import PullRequest, PullRequestReviewer, Team, User
+from app.database.repositories.pull_request import pull_request_repo
+from app.database.repositories.team import team_repo
+from app.database.repositories.user import user_repo
+from app.schemas.pull_request import PullRequestResponse
+from app.schemas.team import TeamMember, TeamResponse
+from app.schemas.user import UserResponse
+
+Case = Callable[[], Awaitable[object]]
+
+
+async def _measure(case: Case, iterations: int) -> tuple[float, float]:
+    """Вернуть CPU-время (мкс) и пик аллокаций (КиБ) на один вызов."""
+    for _ in range(min(iterations, 50)):
+        await case()
+
+    cpu_started = time.process_time()
+    for _ in range(iterations):
+        await case()
+    cpu_us = (time.process_time() - cpu_started) / iterations * 1e6
+
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(min(iterations, 200)):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await case()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return cpu_us, allocated / min(iterations, 200) / 1024
+
+
+async def _pick_ids() -> tuple[str, str, str]:
+    """Взять команду типичного размера, её участника и PR этого участника с ревьюверами."""
+    async with UnitOfWork() as session:
+        teams = select(User.team_name).group_by(User.team_name).having(func.count().between(5, 50))
+        query = (
+            select(PullRequest.pull_request_id, User.user_id, User.team_name)
+            .join(User, User.user_id == PullRequest.author_id)
+            .where(
+                User.team_name.in_(teams),
+                PullRequest.pull_request_id.in_(select(PullRequestReviewer.pull_request_id)),
+            )
+            .limit(1)
+        )
+        row = (await session.execute(query)).one()
+    return row.user_id, row.team_name, row.pull_request_id
+
+
+def _cases(user_id: str, team_name: str, pull_request_id: str) -> dict[str, tuple[Case, Case]]:
+    async def user_orm() -> UserResponse:
+        async with UnitOfWork() as session:
+            user = (await session.execute(select(User).where(User.user_id == user_id))).scalar_one()
+        return UserResponse.model_validate(user)
+
+    async def user_core() -> UserResponse:
+        async with UnitOfWork() as session:
+            user = await user_repo.get_by_id(user_id, session=session)
+        return UserResponse(
+            user_id=user.user_id,
+            username=user.username,
+            team_name=user.team_name,
+            is_active=user.is_active,
+        )
+
+    async def team_orm() -> TeamResponse:
+        async with UnitOfWork() as session:
+            query = select(Team).where(Team.team_name == team_name).options(selectinload(Team.members))
+            team = (await session.execute(query)).scalar_one()
+        return TeamResponse(
+            team_name=team.team_name,
+            members=[TeamMember(user_id=m.user_id, username=m.username, is_active=m.is_active) for m in team.members],
+            assignment_mode=team.assignment_mode,
+        )
+
+    async def team_core() -> TeamResponse:
+        roster_cache.clear()
+        async with UnitOfWork() as session:
+            team = await team_repo.get_by_name(team_name, session=session)
+        return TeamResponse(
+            team_name=team.team_name,
+            members=[TeamMember(user_id=m.user_id, username=m.username, is_active=m.is_active) for m in team.members],
+            assignment_mode=team.assignment_mode,
+        )
+
+    async def pull_request_orm() -> PullRequestResponse:
+        async with UnitOfWork() as session:
+            query = (
+                select(PullRequest)
+                .where(PullRequest.pull_request_id == pull_request_id)
+                .options(joinedload(PullRequest.author), joinedload(PullRequest.reviewer_assignments))
+            )
+            pr = (await session.execute(query)).unique().scalar_one()
+        return PullRequestResponse(
+            pull_request_id=pr.pull_request_id,
+            pull_request_name=pr.pull_request_name,
+            author_id=pr.author_id,
+            status=pr.status,
+            assigned_reviewers=[a.user_id for a in pr.reviewer_assignments],
+            createdAt=pr.created_at,
+            mergedAt=pr.merged_at,
+        )
+
+    async def pull_request_core() -> PullRequestResponse:
+        async with UnitOfWork() as session:
+            pr = await pull_request_repo.get_with_reviewers(pull_request_id, session=session)
+        return PullRequestResponse(
+            pull_request_id=pr.pull_request_id,
+            pull_request_name=pr.pull_request_name,
+            author_id=pr.author_id,
+            status=pr.status,
+            assigned_reviewers=pr.assigned_reviewers,
+            createdAt=pr.created_at,
+            mergedAt=pr.merged_at,
+        )
+
+    return {
+        'user': (user_orm, user_core),
+        'team': (team_orm, team_core),
+        'pull_request': (pull_request_orm, pull_request_core),
+    }
+
+
+async def _baseline() -> None:
+    async with UnitOfWork() as session:
+        await session.execute(select(1))
+
+
+async def run(iterations: int) -> None:
+    try:
+        ids = await _pick_ids()
+        base_cpu, base_kib = await _measure(_baseline, iterations)
+        logger.info(f'baseline SELECT 1: {base_cpu:.1f} us/req {base_kib:.1f} peak KiB (subtracted below)')
+        for name, (orm_case, core_case) in _cases(*ids).items():
+            orm_cpu, orm_kib = await _measure(orm_case, iterations)
+            core_cpu, core_kib = await _measure(core_case, iterations)
+            orm_cpu, orm_kib = orm_cpu - base_cpu, orm_kib - base_kib
+            core_cpu, core_kib = core_cpu - base_cpu, core_kib - base_kib
+            logger.info(
+                f'{name:<13} orm: {orm_cpu:8.1f} us/req {orm_kib:7.1f} peak KiB | '
+                f'core: {core_cpu:8.1f} us/req {core_kib:7.1f} peak KiB | '
+                f'cpu {(core_cpu / orm_cpu - 1) * 100:+.0f}%, alloc {(core_kib / orm_kib - 1) * 100:+.0f}%'
+            )
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Сравнение ORM и Core read-путей')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == '__main__':
+    main()
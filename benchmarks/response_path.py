@@ -0,0 +1,160 @@
+"""
+Микробенчмарк пути ответа: стандартная обработка FastAPI против ``FastJSONRoute``.
+
+Стандартный путь: сервис собирает схемы, FastAPI повторно валидирует результат по
+``response_model`` (``serialize_response``), превращает его в dict и кодирует стандартным ``json``.
+``FastJSONRoute`` отдаёт собранные сервисом схемы сразу в ``FastJSONResponse``. Отдельно показано
+время самой сборки схем: с валидацией pydantic-core и через ``model_construct``.
+БД не нужна: строки синтетические.
+
+Запуск: ``python -m benchmarks.response_path [--members N] [--pull-requests N] [--iterations N]``.
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from loguru import logger
+from pydantic import BaseModel
+
+from app.database.models import PRStatus, ReviewerAssignmentMode
+from app.main import app
+from app.responses import FastJSONResponse
+from app.schemas.team import TeamMember, TeamResponse
+from app.schemas.user import PullRequestShort, UserReviewsResponse
+
+Build = Callable[[], BaseModel]
+
+
+def _team_builders(size: int) -> tuple[Build, Build]:
+    members = [SimpleNamespace(user_id=f'u{i}', username=f'User {i}', is_active=i % 7 != 0) for i in range(size)]
+
+    def validated() -> TeamResponse:
+        return TeamResponse(
+            team_name='benchmark',
+            members=[TeamMember(user_id=m.user_id, username=m.username, is_active=m.is_active) for m in members],
+            assignment_mode=ReviewerAssignmentMode.RANDOM,
+        )
+
+    def constructed() -> TeamResponse:
+        return TeamResponse.model_construct(
+            team_name='benchmark',
+            members=[
+                TeamMember.model_construct(user_id=m.user_id, username=m.username, is_active=m.is_active)
+                for m in members
+            ],
+            assignment_mode=ReviewerAssignmentMode.RANDOM,
+        )
+
+    return validated, constructed
+
+
+def _reviews_builders(size: int) -> tuple[Build, Build]:
+    rows = [
+        SimpleNamespace(
+            pull_request_id=f'pr-{i:06d}',
+            pull_request_name=f'Feature {i}',
+            author_id=f'u{i % 50}',
+            status=PRStatus.OPEN.value if i % 3 else PRStatus.MERGED.value,
+        )
+        for i in range(size)
+    ]
+
+    def validated() -> UserReviewsResponse:
+        return UserReviewsResponse(
+            user_id='u0',
+            pull_requests=[
+                PullRequestShort(
+                    pull_request_id=pr.pull_request_id,
+                    pull_request_name=pr.pull_request_name,
+                    author_id=pr.author_id,
+                    status=pr.status,
+                )
+                for pr in rows
+            ],
+        )
+
+    def constructed() -> UserReviewsResponse:
+        return UserReviewsResponse.model_construct(
+            user_id='u0',
+            pull_requests=[
+                PullRequestShort.model_construct(
+                    pull_request_id=pr.pull_request_id,
+                    pull_request_name=pr.pull_request_name,
+                    author_id=pr.author_id,
+                    status=pr.status,
+                )
+                for pr in rows
+            ],
+            next_cursor=None,
+            total=None,
+        )
+
+    return validated, constructed
+
+
+async def _measure(case: Callable[[], Awaitable[object]], iterations: int) -> float:
+    """Вернуть CPU-время (мкс) на один вызов."""
+    for _ in range(min(iterations, 20)):
+        await case()
+
+    started = time.process_time()
+    for _ in range(iterations):
+        await case()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+async def _report(path: str, builders: tuple[Build, Build], size: str, iterations: int) -> None:
+    validated, constructed = builders
+    field = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path).response_field
+    payload = validated()
+
+    async def standard_encode() -> bytes:
+        return JSONResponse(await serialize_response(field=field, response_content=payload)).body
+
+    async def fast_encode() -> bytes:
+        return FastJSONResponse(payload).body
+
+    async def build_validated() -> BaseModel:
+        return validated()
+
+    async def build_constructed() -> BaseModel:
+        return constructed()
+
+    body = await fast_encode()
+    if body != await standard_encode():
+        raise RuntimeError(f'{path}: responses differ')
+
+    build_us = await _measure(build_validated, iterations)
+    construct_us = await _measure(build_constructed, iterations)
+    standard_us = await _measure(standard_encode, iterations)
+    fast_us = await _measure(fast_encode, iterations)
+    logger.info(
+        f'{path} ({size}, {len(body) / 1024:.0f} KiB): '
+        f'build validated {build_us:.0f} us, model_construct {construct_us:.0f} us | '
+        f'encode standard {standard_us:.0f} us, fast {fast_us:.0f} us | '
+        f'total {build_us + standard_us:.0f} -> {build_us + fast_us:.0f} us '
+        f'({(fast_us - standard_us) / (build_us + standard_us) * 100:+.0f}% cpu)'
+    )
+
+
+async def run(members: int, pull_requests: int, iterations: int) -> None:
+    await _report('/team/get', _team_builders(members), f'{members} members', iterations)
+    await _report('/users/getReview', _reviews_builders(pull_requests), f'{pull_requests} PRs', iterations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Сравнение стандартного пути ответа FastAPI и FastJSONRoute')
+    parser.add_argument('--members', type=int, default=5000)
+    parser.add_argument('--pull-requests', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.members, args.pull_requests, args.iterations))
+
+
+if __name__ == '__main__':
+    main()
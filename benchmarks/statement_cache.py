@@ -0,0 +1,168 @@
+"""
+Микробенчмарк готовых выражений и кэша prepared statements на горячих чтениях.
+
+Для ``get_with_reviewers``, ``get_reviewers`` и ``get_assigned_pull_requests`` (``/users/getReview``)
+сравниваются три варианта:
+выражение, собираемое на каждый вызов (как было до готовых выражений), готовое выражение
+репозитория и оно же на движке без кэша prepared statements (режим ``DB_PGBOUNCER``), где каждый
+запрос заново проходит PARSE на сервере. Меряется CPU-время процесса на один запрос сверх пустого
+``SELECT 1`` в той же транзакции и время ответа (wall) - в последнем видна цена лишнего round-trip.
+
+Запуск против поднятой БД: ``python -m benchmarks.statement_cache [--iterations N]``.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy import String, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database.base import async_engine
+from app.database.models import PullRequest, PullRequestReviewer
+from app.database.repositories.pull_request import pull_request_repo
+from app.database.repositories.user import user_repo
+
+Case = Callable[[AsyncSession], Awaitable[object]]
+
+
+async def _measure(sessions: async_sessionmaker[AsyncSession], case: Case, iterations: int) -> tuple[float, float]:
+    """Вернуть CPU-время и время ответа (мкс) на один вызов в отдельной транзакции."""
+
+    async def call() -> None:
+        async with sessions() as session, session.begin():
+            await case(session)
+
+    for _ in range(min(iterations, 50)):
+        await call()
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    return (
+        (time.process_time() - cpu_started) / iterations * 1e6,
+        (time.perf_counter() - wall_started) / iterations * 1e6,
+    )
+
+
+async def _pick_ids(sessions: async_sessionmaker[AsyncSession]) -> tuple[str, str]:
+    """Взять PR с ревьюверами и одного из его ревьюверов."""
+    async with sessions() as session:
+        query = select(PullRequestReviewer.pull_request_id, PullRequestReviewer.user_id).limit(1)
+        row = (await session.execute(query)).one()
+    return row.pull_request_id, row.user_id
+
+
+def _cases(pull_request_id: str, user_id: str) -> dict[str, tuple[Case, Case]]:
+    async def pull_request_inline(session: AsyncSession) -> object:
+        reviewers = (
+            select(func.coalesce(func.array_agg(PullRequestReviewer.user_id), literal([], ARRAY(String))))
+            .where(PullRequestReviewer.pull_request_id == PullRequest.pull_request_id)
+            .scalar_subquery()
+            .label('assigned_reviewers')
+        )
+        query = select(
+            PullRequest.pull_request_id,
+            PullRequest.pull_request_name,
+            PullRequest.author_id,
+            PullRequest.status,
+            PullRequest.created_at,
+            PullRequest.merged_at,
+            reviewers,
+        ).where(PullRequest.pull_request_id == pull_request_id)
+        return (await session.execute(query)).one_or_none()
+
+    async def pull_request_prebuilt(session: AsyncSession) -> object:
+        return await pull_request_repo.get_with_reviewers(pull_request_id, session=session)
+
+    async def reviewers_inline(session: AsyncSession) -> object:
+        query = select(PullRequestReviewer.user_id).where(PullRequestReviewer.pull_request_id == pull_request_id)
+        return list((await session.execute(query)).scalars().all())
+
+    async def reviewers_prebuilt(session: AsyncSession) -> object:
+        return await pull_request_repo.get_reviewers(pull_request_id, session=session)
+
+    async def reviews_inline(session: AsyncSession) -> object:
+        query = (
+            select(
+                PullRequest.pull_request_id,
+                PullRequest.pull_request_name,
+                PullRequest.author_id,
+                PullRequest.status,
+            )
+            .join(PullRequestReviewer, PullRequest.pull_request_id == PullRequestReviewer.pull_request_id)
+            .where(PullRequestReviewer.user_id == user_id)
+            .order_by(PullRequestReviewer.pull_request_id)
+        )
+        return list((await session.execute(query)).all())
+
+    async def reviews_prebuilt(session: AsyncSession) -> object:
+        return await user_repo.get_assigned_pull_requests(user_id, session=session)
+
+    return {
+        'get_with_reviewers': (pull_request_inline, pull_request_prebuilt),
+        'get_reviewers': (reviewers_inline, reviewers_prebuilt),
+        'get_assigned_pull_requests': (reviews_inline, reviews_prebuilt),
+    }
+
+
+async def _baseline(session: AsyncSession) -> None:
+    await session.execute(select(1))
+
+
+def _uncached_engine() -> AsyncEngine:
+    """Движок без кэша prepared statements, как в режиме ``DB_PGBOUNCER``."""
+    return create_async_engine(
+        settings.PG_URL,
+        pool_size=1,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            'prepared_statement_cache_size': 0,
+            'statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+        },
+    )
+
+
+async def run(iterations: int) -> None:
+    uncached_engine = _uncached_engine()
+    try:
+        cached = async_sessionmaker(async_engine, expire_on_commit=False)
+        uncached = async_sessionmaker(uncached_engine, expire_on_commit=False)
+        base_cpu, base_wall = await _measure(cached, _baseline, iterations)
+        uncached_base_cpu, _ = await _measure(uncached, _baseline, iterations)
+        logger.info(f'baseline SELECT 1: {base_cpu:.1f} us/req cpu {base_wall:.1f} us/req wall (cpu subtracted below)')
+        for name, (inline_case, prebuilt_case) in _cases(*await _pick_ids(cached)).items():
+            inline_cpu, inline_wall = await _measure(cached, inline_case, iterations)
+            prebuilt_cpu, prebuilt_wall = await _measure(cached, prebuilt_case, iterations)
+            uncached_cpu, uncached_wall = await _measure(uncached, prebuilt_case, iterations)
+            inline_cpu, prebuilt_cpu, uncached_cpu = (
+                inline_cpu - base_cpu,
+                prebuilt_cpu - base_cpu,
+                uncached_cpu - uncached_base_cpu,
+            )
+            logger.info(
+                f'{name:<26} inline: {inline_cpu:7.1f} us cpu {inline_wall:7.1f} us wall | '
+                f'prebuilt: {prebuilt_cpu:7.1f} us cpu {prebuilt_wall:7.1f} us wall '
+                f'({(prebuilt_cpu / inline_cpu - 1) * 100:+.0f}% cpu) | '
+                f'no prepared cache: {uncached_cpu:7.1f} us cpu {uncached_wall:7.1f} us wall'
+            )
+    finally:
+        await uncached_engine.dispose()
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Готовые выражения и кэш prepared statements')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+#!/bin/sh
+# Разрешить потоковую репликацию сервису db-replica (профиль replica в docker-compose.yml)
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
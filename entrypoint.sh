@@ -12,4 +12,4 @@ echo "Running migrations..."
 alembic upgrade head
 
 echo "Starting application..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8080
+exec python run.py
@@ -5,17 +5,40 @@ import time
 import uvicorn
 from loguru import logger
 
+from app.config import settings
+
 if platform.system() != 'Windows':
     os.environ['TZ'] = 'Europe/Moscow'
     time.tzset()  # type: ignore[attr-defined]
 
 
+def resolve_workers() -> int:
+    """Количество воркеров: ``WEB_WORKERS`` или число ядер, если задан 0."""
+    return settings.WEB_WORKERS or os.cpu_count() or 1
+
+
 def run_server() -> None:
-    logger.info('swagger url http://localhost:8080/docs')
+    workers = resolve_workers()
+    # Воркеры uvicorn стартуют отдельными процессами и читают настройки из окружения:
+    # фиксируем итоговое число воркеров, чтобы пул каждого считался от него
+    os.environ['WEB_WORKERS'] = str(workers)
+
+    from app.database.base import pool_limits  # noqa: PLC0415
+
+    pool_size, max_overflow = pool_limits(workers)
+    logger.info(
+        f'starting {workers} worker(s): pool_size={pool_size} max_overflow={max_overflow} per worker, '
+        f'up to {(pool_size + max_overflow + settings.CACHE_INVALIDATION_ENABLED) * workers} connections total'
+    )
+    logger.info(f'swagger url http://localhost:{settings.WEB_PORT}/docs')
     uvicorn.run(
         app='app.main:app',
-        host='0.0.0.0',  # noqa: S104
-        port=8080,
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=workers,
+        loop=settings.WEB_LOOP,
+        http=settings.WEB_HTTP,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
     )
 
 
@@ -0,0 +1,32 @@
+"""
+Общие фикстуры тестов.
+
+Тесты работают с локальной БД из настроек приложения (``POSTGRES_*``), схема должна быть
+поднята миграциями (``alembic upgrade head``). Если БД недоступна, тесты пропускаются.
+Все тесты сессии выполняются в одном event loop: пул соединений приложения привязан к нему.
+"""
+
+from collections.abc import AsyncIterator
+
+import pytest
+from sqlalchemy import text
+
+from app.database.base import async_engine
+
+
+@pytest.fixture(scope='session')
+def anyio_backend() -> str:
+    return 'asyncio'
+
+
+@pytest.fixture(scope='session')
+async def database() -> AsyncIterator[None]:
+    """Доступная БД с применёнными миграциями; соединения пула закрываются в конце сессии."""
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text('SELECT 1 FROM pull_request_stats LIMIT 1'))
+    except Exception as e:
+        await async_engine.dispose()
+        pytest.skip(f'local Postgres is not available: {e!r}')
+    yield
+    await async_engine.dispose()
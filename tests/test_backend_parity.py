@@ -0,0 +1,409 @@
+"""
+Паритет хранилища в памяти (``REPOSITORY_BACKEND=memory``) с репозиториями Postgres.
+
+Одни и те же сценарии уровня сервисов прогоняются на обоих хранилищах, ответы сравниваются после
+нормализации (время - только признак наличия, порядок ревьюверов не важен). Данные сценариев подобраны так,
+чтобы выбор ревьюверов был однозначным: кандидат один или у LEAST_LOADED единственный минимум нагрузки.
+После каждого сценария на каждом хранилище проверяются инварианты:
+
+- ``open_reviews`` / ``merged_reviews`` совпадают с числом назначений на OPEN / MERGED PR;
+- у PR не больше двух ревьюверов, без повторов и без автора;
+- изменение ``pull_request_stats`` совпадает с распределением PR сценария по статусу и числу ревьюверов.
+
+Отдельно проверяется, что нарушения первичных и внешних ключей дают ``IntegrityError`` на обоих хранилищах.
+Данные Postgres удаляются каскадом вместе с командами, агрегат PR пересчитывается.
+"""
+
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.database.base import UnitOfWork
+from app.database.memory import MemoryUnitOfWork, memory_store
+from app.database.models import PRStatus, ReviewerAssignmentMode
+from app.database.repositories.memory import (
+    memory_pull_request_repo,
+    memory_stats_repo,
+    memory_team_repo,
+    memory_user_repo,
+)
+from app.database.repositories.pull_request import PullRequestRepo, pull_request_repo
+from app.database.repositories.stats import StatsRepo, stats_repo
+from app.database.repositories.team import TeamRepo, team_repo
+from app.database.repositories.user import UserRepo, user_repo
+from app.exceptions import (
+    CannotReassignPrException,
+    InvalidCursorException,
+    ModelExistException,
+    NotFoundException,
+)
+from app.schemas.pull_request import PullRequestCreateRequest
+from app.schemas.team import TeamCreate, TeamImportRecord, TeamMember
+from app.services.pull_request import PullRequestService
+from app.services.stats import StatsService
+from app.services.team import TeamService
+from app.services.user import UserService
+
+pytestmark = pytest.mark.anyio
+
+DOMAIN_ERRORS = (CannotReassignPrException, InvalidCursorException, ModelExistException, NotFoundException)
+RANDOM, LEAST_LOADED = ReviewerAssignmentMode.RANDOM, ReviewerAssignmentMode.LEAST_LOADED
+
+
+class Backend:
+    """Сервисы поверх репозиториев одного хранилища."""
+
+    def __init__(
+        self,
+        name: str,
+        pull_request_repo: PullRequestRepo,
+        user_repo: UserRepo,
+        team_repo: TeamRepo,
+        stats_repo: StatsRepo,
+        uow_factory: Callable[..., UnitOfWork],
+    ) -> None:
+        self.name = name
+        self.pull_request_repo = pull_request_repo
+        self.user_repo = user_repo
+        self.team_repo = team_repo
+        self.stats_repo = stats_repo
+        self.uow_factory = uow_factory
+        self.teams = TeamService(team_repo=team_repo, user_repo=user_repo, uow_factory=uow_factory)
+        self.pull_requests = PullRequestService(
+            pr_repo=pull_request_repo,
+            user_repo=user_repo,
+            stats_repo=stats_repo,
+            uow_factory=uow_factory,
+        )
+        self.users = UserService(user_repo=user_repo, pr_repo=pull_request_repo, uow_factory=uow_factory)
+        self.stats = StatsService(stats_repo=stats_repo, team_repo=team_repo, uow_factory=uow_factory)
+
+
+POSTGRES = Backend('postgres', pull_request_repo, user_repo, team_repo, stats_repo, UnitOfWork)
+MEMORY = Backend(
+    'memory',
+    memory_pull_request_repo,
+    memory_user_repo,
+    memory_team_repo,
+    memory_stats_repo,
+    MemoryUnitOfWork,
+)
+
+
+def normalize(value: Any) -> Any:  # noqa: ANN401
+    """Привести ответ к виду, который не зависит от хранилища."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode='json')
+    if isinstance(value, Exception):
+        return type(value).__name__
+    if isinstance(value, dict):
+        return {
+            key: (
+                item is not None
+                if key in ('created_at', 'merged_at')
+                else sorted(item)
+                if key == 'assigned_reviewers'
+                else normalize(item)
+            )
+            for key, item in value.items()
+        }
+    if isinstance(value, list | tuple):
+        return [normalize(item) for item in value]
+    return value
+
+
+@dataclass
+class Run:
+    """Прогон сценария на одном хранилище: протокол ответов и созданные сущности."""
+
+    backend: Backend
+    prefix: str
+    transcript: list[tuple[str, Any]] = field(default_factory=list)
+    users: set[str] = field(default_factory=set)
+    pull_requests: set[str] = field(default_factory=set)
+
+    def id(self, name: str) -> str:
+        return f'{self.prefix}-{name}'
+
+    async def step(self, label: str, call: Awaitable[Any]) -> Any:  # noqa: ANN401
+        try:
+            result = await call
+        except DOMAIN_ERRORS as e:
+            result = e
+        self.transcript.append((label, normalize(result)))
+        return result
+
+    async def add_team(self, name: str, members: dict[str, bool], mode: ReviewerAssignmentMode = RANDOM) -> None:
+        team_name = self.id(name)
+        self.users.update(self.id(user) for user in members)
+        team = TeamCreate(
+            team_name=team_name,
+            members=[TeamMember(user_id=self.id(u), username=u, is_active=active) for u, active in members.items()],
+            assignment_mode=mode,
+        )
+        await self.step(f'add_team {name}', self.backend.teams.add_team(team))
+
+    async def create(self, pull_request: str, author: str) -> None:
+        self.pull_requests.add(self.id(pull_request))
+        call = self.backend.pull_requests.create_pull_request(self.id(pull_request), pull_request, self.id(author))
+        await self.step(f'create {pull_request} by {author}', call)
+
+    async def merge(self, pull_request: str) -> None:
+        await self.step(f'merge {pull_request}', self.backend.pull_requests.merge_pull_request(self.id(pull_request)))
+
+    async def reassign(self, pull_request: str, user: str) -> None:
+        call = self.backend.pull_requests.reassign_reviewer(self.id(pull_request), self.id(user))
+        await self.step(f'reassign {pull_request} {user}', call)
+
+    async def set_is_active(self, user: str, is_active: bool) -> None:
+        await self.step(f'set_is_active {user} {is_active}', self.backend.users.set_is_active(self.id(user), is_active))
+
+    async def get_team(self, name: str) -> None:
+        await self.step(f'get_team {name}', self.backend.teams.get_team(self.id(name)))
+
+    async def get_reviews(self, user: str, **kwargs: Any) -> Any:  # noqa: ANN401
+        return await self.step(f'get_reviews {user} {kwargs}', self.backend.users.get_reviews(self.id(user), **kwargs))
+
+
+async def create_and_merge(run: Run) -> None:
+    await run.add_team('team', {'a': True, 'b': True, 'c': True})
+    await run.add_team('team', {'a': True})
+    await run.create('pr1', 'a')
+    await run.create('pr1', 'b')
+    await run.create('pr2', 'ghost')
+    await run.get_team('team')
+    await run.merge('pr1')
+    await run.merge('pr1')
+    await run.merge('missing')
+    await run.reassign('pr1', 'b')
+    await run.reassign('missing', 'b')
+    await run.create('pr3', 'b')
+    await run.get_reviews('c')
+    await run.get_reviews('c', status=PRStatus.OPEN)
+    await run.get_reviews('c', count_only=True)
+    await run.get_reviews('ghost')
+    await run.step('team stats', run.backend.stats.get_team_stats(run.id('team')))
+    await run.step('team stats missing', run.backend.stats.get_team_stats(run.id('missing')))
+    await run.step('user stats', run.backend.stats.get_user_stats(run.id('a')))
+    await run.step('user stats missing', run.backend.stats.get_user_stats(run.id('ghost')))
+
+
+async def reassign(run: Run) -> None:
+    await run.add_team('team', {'a': True, 'b': True, 'c': True, 'd': False}, LEAST_LOADED)
+    await run.create('pr1', 'a')
+    await run.set_is_active('d', True)
+    await run.reassign('pr1', 'b')
+    await run.reassign('pr1', 'b')
+    await run.reassign('pr1', 'c')
+    await run.set_is_active('c', False)
+    await run.reassign('pr1', 'd')
+    await run.set_is_active('ghost', True)
+    await run.merge('pr1')
+    await run.get_team('team')
+
+
+async def least_loaded(run: Run) -> None:
+    await run.add_team('team', {'a': True, 'b': True, 'c': True, 'd': False, 'e': False}, LEAST_LOADED)
+    await run.create('pr1', 'a')
+    await run.set_is_active('d', True)
+    await run.set_is_active('e', True)
+    # У d и e нет открытых ревью, у b и c - по одному
+    await run.create('pr2', 'a')
+    await run.merge('pr1')
+    # После merge у b и c снова ноль, у d и e - по одному
+    await run.create('pr3', 'a')
+    await run.step('team stats', run.backend.stats.get_team_stats(run.id('team')))
+
+
+async def deactivate(run: Run) -> None:
+    await run.add_team('team', {'a': True, 'b': True, 'c': True, 'd': False})
+    await run.create('pr1', 'a')
+    await run.create('pr2', 'b')
+    await run.set_is_active('d', True)
+    await run.step('deactivate b', run.backend.users.deactivate_users([run.id('b')]))
+    await run.step('deactivate c', run.backend.users.deactivate_users([run.id('c')]))
+    await run.step('deactivate ghost', run.backend.users.deactivate_users([run.id('ghost')]))
+    await run.merge('pr2')
+    await run.step('deactivate team', run.backend.users.deactivate_users([], team_name=run.id('team')))
+    await run.get_team('team')
+    await run.reassign('pr1', 'd')
+
+
+async def batch_create(run: Run) -> None:
+    await run.add_team('team', {'a': True, 'b': True, 'c': True})
+    await run.create('pr0', 'a')
+    requests = [
+        ('pr0', 'a'),
+        ('pr1', 'a'),
+        ('pr1', 'b'),
+        ('pr2', 'ghost'),
+        ('pr3', 'b'),
+    ]
+    run.pull_requests.update(run.id(pr) for pr, _ in requests)
+    call = run.backend.pull_requests.create_pull_requests_batch(
+        [
+            PullRequestCreateRequest(pull_request_id=run.id(pr), pull_request_name=pr, author_id=run.id(author))
+            for pr, author in requests
+        ]
+    )
+    await run.step('batch', call)
+    await run.get_reviews('c')
+
+
+async def review_pages(run: Run) -> None:
+    await run.add_team('team', {'a': True, 'b': True})
+    for pull_request in ('3', '1', '2', '10', '11', '0'):
+        await run.create(pull_request, 'a')
+    await run.merge('1')
+    await run.merge('10')
+    await run.get_reviews('b')
+    for status in (None, PRStatus.OPEN, PRStatus.MERGED):
+        cursor = None
+        while True:
+            page = await run.get_reviews('b', status=status, limit=2, cursor=cursor)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+    await run.get_reviews('b', status=PRStatus.MERGED, count_only=True)
+    await run.get_reviews('b', limit=2, cursor='not-a-cursor')
+
+
+async def import_members(run: Run) -> None:
+    await run.add_team('old', {'a': True, 'b': True})
+    run.users.update(run.id(user) for user in ('x', 'y'))
+
+    async def records() -> AsyncIterator[TeamImportRecord]:
+        for team, user, active in (
+            ('new', 'x', True),
+            ('new', 'y', False),
+            ('old', 'b', False),
+            ('new', 'a', True),
+            ('new', 'x', False),
+        ):
+            yield TeamImportRecord(team_name=run.id(team), user_id=run.id(user), username=user, is_active=active)
+
+    await run.step('import', run.backend.teams.import_members(records(), batch_size=2))
+    await run.get_team('old')
+    await run.get_team('new')
+    await run.create('pr1', 'a')
+    await run.create('pr2', 'b')
+
+
+SCENARIOS = [create_and_merge, reassign, least_loaded, deactivate, batch_create, review_pages, import_members]
+
+
+def distribution(rows: Any) -> Counter[tuple[str, int]]:  # noqa: ANN401
+    counts: Counter[tuple[str, int]] = Counter()
+    for item in rows.reviewer_distribution:
+        counts[(PRStatus.OPEN.value, item.reviewers)] += item.open
+        counts[(PRStatus.MERGED.value, item.reviewers)] += item.merged
+    return counts
+
+
+async def check_invariants(run: Run, stats_before: Counter[tuple[str, int]]) -> None:
+    backend = run.backend
+    for user_id in sorted(run.users):
+        try:
+            stats = await backend.stats.get_user_stats(user_id)
+        except NotFoundException:
+            continue
+        for status, counter in ((PRStatus.OPEN, stats.open), (PRStatus.MERGED, stats.merged)):
+            reviews = await backend.users.get_reviews(user_id, status=status, count_only=True)
+            assert counter == reviews.total, (backend.name, user_id, status)
+
+    expected: Counter[tuple[str, int]] = Counter()
+    async with backend.uow_factory(read_only=True) as session:
+        for pull_request_id in sorted(run.pull_requests):
+            pr = await backend.pull_request_repo.get_with_reviewers(pull_request_id, session=session)
+            if pr is None:
+                continue
+            reviewers = pr.assigned_reviewers
+            assert len(reviewers) <= 2, (backend.name, pr)
+            assert len(set(reviewers)) == len(reviewers), (backend.name, pr)
+            assert pr.author_id not in reviewers, (backend.name, pr)
+            expected[(pr.status, len(reviewers))] += 1
+
+    stats_after = distribution(await backend.stats.get_pull_request_stats())
+    changed = Counter({key: stats_after[key] - stats_before[key] for key in stats_after.keys() | stats_before.keys()})
+    assert +changed == expected, backend.name
+
+
+async def cleanup(backend: Backend, prefix: str) -> None:
+    if backend is MEMORY:
+        memory_store.clear()
+        return
+    async with UnitOfWork() as session:
+        await session.execute(text('DELETE FROM teams WHERE team_name LIKE :prefix'), {'prefix': f'{prefix}-%'})
+    await stats_repo.rebuild_pull_request_stats()
+
+
+async def play(backend: Backend, scenario: Callable[[Run], Awaitable[None]], prefix: str) -> list[tuple[str, Any]]:
+    run = Run(backend, prefix)
+    try:
+        stats_before = distribution(await backend.stats.get_pull_request_stats())
+        await scenario(run)
+        await check_invariants(run, stats_before)
+    finally:
+        await cleanup(backend, prefix)
+    return run.transcript
+
+
+@pytest.fixture
+def prefix(database: None) -> str:  # noqa: ARG001
+    memory_store.clear()
+    return f'bp{uuid.uuid4().hex[:8]}'
+
+
+@pytest.mark.parametrize('scenario', SCENARIOS, ids=[scenario.__name__ for scenario in SCENARIOS])
+async def test_backends_agree(scenario: Callable[[Run], Awaitable[None]], prefix: str) -> None:
+    memory = await play(MEMORY, scenario, prefix)
+    postgres = await play(POSTGRES, scenario, prefix)
+    assert len(memory) == len(postgres)
+    for memory_step, postgres_step in zip(memory, postgres, strict=True):
+        assert memory_step == postgres_step
+
+
+Violation = Callable[[Backend, Callable[[str], str], Any], Awaitable[Any]]
+
+VIOLATIONS: dict[str, Violation] = {
+    'duplicate team': lambda b, id_, s: b.team_repo.create(id_('team'), session=s),
+    'user in missing team': lambda b, id_, s: b.user_repo.bulk_upsert(
+        [(id_('u'), 'u', id_('missing'), True)], session=s
+    ),
+    'pull request by missing author': lambda b, id_, s: b.pull_request_repo.create_many(
+        [(id_('pr'), 'pr', id_('ghost'))], session=s
+    ),
+    'duplicate reviewer': lambda b, id_, s: b.pull_request_repo.add_reviewers([(id_('pr1'), id_('b'))], session=s),
+    'reviewer on missing pull request': lambda b, id_, s: b.pull_request_repo.add_reviewers(
+        [(id_('missing'), id_('a'))], session=s
+    ),
+    'missing reviewer': lambda b, id_, s: b.pull_request_repo.add_reviewers([(id_('pr1'), id_('ghost'))], session=s),
+}
+
+
+@pytest.mark.parametrize('backend', [POSTGRES, MEMORY], ids=lambda backend: backend.name)
+@pytest.mark.parametrize('violation', sorted(VIOLATIONS))
+async def test_integrity_errors(backend: Backend, violation: str, prefix: str) -> None:
+    run = Run(backend, prefix)
+    try:
+        await run.add_team('team', {'a': True, 'b': True})
+        await run.create('pr1', 'a')
+        stats_before = distribution(await backend.stats.get_pull_request_stats())
+        with pytest.raises(IntegrityError):
+            async with backend.uow_factory() as session:
+                # Счётчики меняются в той же транзакции и должны откатиться вместе с ней
+                await backend.user_repo.update_is_active(run.id('a'), False, session=session)
+                await VIOLATIONS[violation](backend, run.id, session)
+
+        await run.get_team('team')
+        assert run.transcript[-1][1]['members'] == run.transcript[0][1]['members']
+        await check_invariants(run, stats_before - Counter({(PRStatus.OPEN.value, 1): 1}))
+    finally:
+        await cleanup(backend, prefix)
@@ -0,0 +1,161 @@
+"""
+Конкурентный стресс-тест назначения ревьюверов.
+
+Две команды (по одной на стратегию назначения) параллельно создают PR, переназначают ревьюверов
+(в основном на нескольких "горячих" PR), сливают PR, деактивируют и возвращают пользователей.
+Допустимы только доменные отказы (PR уже слит, кандидата нет, гонка за тем же ID и т.п.).
+После нагрузки инварианты проверяются по данным в БД:
+
+- у PR не больше двух ревьюверов и нет повторов;
+- автор никогда не ревьювер своего PR;
+- ``open_reviews`` и ``merged_reviews`` совпадают с пересчётом по назначениям.
+
+Данные теста удаляются каскадом вместе с командами, агрегат PR пересчитывается.
+"""
+
+import asyncio
+import random
+import uuid
+from collections import Counter
+
+import pytest
+from sqlalchemy import text
+
+from app.database.base import UnitOfWork, admission
+from app.database.models import ReviewerAssignmentMode
+from app.database.repositories.stats import stats_repo
+from app.database.repositories.team import team_repo
+from app.database.repositories.user import user_repo
+from app.exceptions import CannotReassignPrException, ModelExistException, NotFoundException
+from app.schemas.team import TeamCreate, TeamMember
+from app.services.pull_request import pull_request_service
+from app.services.team import TeamService
+from app.services.user import user_service
+
+pytestmark = pytest.mark.anyio
+
+TEAM_SIZE = 8
+INITIAL_PULL_REQUESTS = 20
+OPERATIONS = 600
+HOT_PULL_REQUESTS = 3
+
+DOMAIN_ERRORS = (CannotReassignPrException, ModelExistException, NotFoundException)
+
+REVIEWERS = """
+    SELECT pr.pull_request_id, pr.author_id, array_agg(r.user_id) AS reviewers
+    FROM pull_requests pr
+    JOIN pull_request_reviewers r ON r.pull_request_id = pr.pull_request_id
+    WHERE pr.pull_request_id LIKE :prefix
+    GROUP BY pr.pull_request_id, pr.author_id
+"""
+COUNTERS = """
+    SELECT u.user_id, u.open_reviews, u.merged_reviews,
+           count(pr.pull_request_id) FILTER (WHERE pr.status = 'OPEN') AS actual_open,
+           count(pr.pull_request_id) FILTER (WHERE pr.status = 'MERGED') AS actual_merged
+    FROM users u
+    LEFT JOIN pull_request_reviewers r ON r.user_id = u.user_id
+    LEFT JOIN pull_requests pr ON pr.pull_request_id = r.pull_request_id
+    WHERE u.team_name = ANY(:teams)
+    GROUP BY u.user_id
+"""
+
+
+class Workload:
+    """Случайная смесь операций над командами теста."""
+
+    def __init__(self, prefix: str, seed: int) -> None:
+        self.prefix = prefix
+        self.random = random.Random(seed)
+        self.teams = {
+            f'{prefix}-{mode.value.lower()}': [f'{prefix}-{mode.value.lower()}-{i}' for i in range(TEAM_SIZE)]
+            for mode in ReviewerAssignmentMode
+        }
+        self.members = [user_id for members in self.teams.values() for user_id in members]
+        self.pull_requests: list[str] = []
+        self.outcomes: Counter[str] = Counter()
+
+    async def add_teams(self) -> None:
+        service = TeamService(team_repo=team_repo, user_repo=user_repo, uow_factory=UnitOfWork)
+        for mode, (team_name, members) in zip(ReviewerAssignmentMode, self.teams.items(), strict=True):
+            await service.add_team(
+                TeamCreate(
+                    team_name=team_name,
+                    members=[TeamMember(user_id=m, username=m, is_active=True) for m in members],
+                    assignment_mode=mode,
+                )
+            )
+
+    async def create(self) -> None:
+        pull_request_id = f'{self.prefix}-pr-{len(self.pull_requests)}'
+        self.pull_requests.append(pull_request_id)
+        await pull_request_service.create_pull_request(pull_request_id, 'Stress', self.random.choice(self.members))
+
+    def pick_pull_request(self) -> str:
+        if self.random.random() < 0.7:
+            return self.random.choice(self.pull_requests[:HOT_PULL_REQUESTS])
+        return self.random.choice(self.pull_requests)
+
+    async def reassign(self) -> None:
+        await pull_request_service.reassign_reviewer(self.pick_pull_request(), self.random.choice(self.members))
+
+    async def merge(self) -> None:
+        await pull_request_service.merge_pull_request(self.random.choice(self.pull_requests[HOT_PULL_REQUESTS:]))
+
+    async def deactivate(self) -> None:
+        await user_service.deactivate_users(self.random.sample(self.members, 2))
+
+    async def activate(self) -> None:
+        await user_service.set_is_active(self.random.choice(self.members), True)
+
+    async def run(self, operations: int, concurrency: int) -> None:
+        kinds = [self.create, self.reassign, self.reassign, self.reassign, self.merge, self.deactivate, self.activate]
+        plan = [self.random.choice(kinds) for _ in range(operations)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(operation) -> None:  # noqa: ANN001
+            async with semaphore:
+                try:
+                    await operation()
+                except DOMAIN_ERRORS as e:
+                    self.outcomes[type(e).__name__] += 1
+                else:
+                    self.outcomes[operation.__name__] += 1
+
+        await asyncio.gather(*(call(operation) for operation in plan))
+
+    async def cleanup(self) -> None:
+        async with UnitOfWork() as session:
+            await session.execute(text('DELETE FROM teams WHERE team_name = ANY(:teams)'), {'teams': list(self.teams)})
+        await stats_repo.rebuild_pull_request_stats()
+
+
+@pytest.fixture
+async def workload(database: None) -> Workload:  # noqa: ARG001
+    workload = Workload(f'st{uuid.uuid4().hex[:8]}', seed=20251117)
+    await workload.add_teams()
+    try:
+        for _ in range(INITIAL_PULL_REQUESTS):
+            await workload.create()
+        yield workload
+    finally:
+        await workload.cleanup()
+
+
+async def test_concurrent_assignment_invariants(workload: Workload) -> None:
+    await workload.run(OPERATIONS, concurrency=min(admission.capacity, 16))
+    # Нагрузка действительно дошла до записи, а не упёрлась в отказы
+    assert workload.outcomes['reassign'] and workload.outcomes['merge'] and workload.outcomes['deactivate']
+
+    async with UnitOfWork(read_only=True) as session:
+        reviewers = (await session.execute(text(REVIEWERS), {'prefix': f'{workload.prefix}-%'})).all()
+        counters = (await session.execute(text(COUNTERS), {'teams': list(workload.teams)})).all()
+
+    assert reviewers
+    for row in reviewers:
+        assert len(row.reviewers) <= 2, row
+        assert len(set(row.reviewers)) == len(row.reviewers), row
+        assert row.author_id not in row.reviewers, row
+
+    assert len(counters) == len(workload.members)
+    for row in counters:
+        assert (row.open_reviews, row.merged_reviews) == (row.actual_open, row.actual_merged), row
@@ -0,0 +1,204 @@
+"""
+Read-after-write между двумя процессами приложения.
+
+Запускаются два процесса uvicorn над одной локальной БД. Процесс B читает команду и кэширует её состав,
+процесс A меняет участника. До следующего чтения B должен получить NOTIFY и сбросить запись кэша:
+чтение после этого - промах кэша со свежим составом, а не старый снимок до истечения TTL.
+
+Пока LISTEN-соединение B разорвано (``pg_terminate_backend``) и не восстановлено, NOTIFY до B не доходят:
+B не должен ни отвечать из кэша, ни наполнять его, иначе изменения A остались бы невидимы до переподключения.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterator
+from pathlib import Path
+from typing import Any
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+import pytest
+from sqlalchemy import text
+
+from app.database.base import UnitOfWork
+
+pytestmark = pytest.mark.anyio
+
+ROOT = Path(__file__).resolve().parent.parent
+STARTUP_TIMEOUT = 30.0
+# NOTIFY доставляется асинхронно, но должен прийти задолго до истечения TTL кэша
+DELIVERY_TIMEOUT = 5.0
+
+
+class Worker:
+    """Процесс приложения на отдельном порту."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        env = {**os.environ, 'REPOSITORY_BACKEND': 'postgres', 'ROSTER_CACHE_ENABLED': 'true'}
+        self.process = subprocess.Popen(  # noqa: S603
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(self.port), '--log-level', 'warning'],
+            cwd=ROOT,
+            env=env,
+        )
+
+    def call(self, method: str, path: str, payload: object = None, **query: str) -> tuple[int, Any]:
+        url = f'http://127.0.0.1:{self.port}{path}'
+        if query:
+            url += f'?{urlencode(query)}'
+        body = json.dumps(payload).encode() if payload is not None else None
+        request = Request(url, data=body, method=method, headers={'Content-Type': 'application/json'})  # noqa: S310
+        try:
+            with urlopen(request, timeout=10) as response:  # noqa: S310
+                return response.status, json.loads(response.read())
+        except URLError as e:
+            if hasattr(e, 'code'):
+                return e.code, json.loads(e.read())
+            raise
+
+    def cache_stats(self) -> dict[str, int | float]:
+        return self.call('GET', '/internal/cacheStats')[1]['roster_cache']
+
+    def wait_ready(self) -> None:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'worker {self.name} exited with {self.process.returncode}')
+            try:
+                self.cache_stats()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise TimeoutError(f'worker {self.name} did not start in {STARTUP_TIMEOUT}s')
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+@pytest.fixture
+def workers(database: None) -> Iterator[tuple[Worker, Worker]]:  # noqa: ARG001
+    pair = Worker('A'), Worker('B')
+    try:
+        for worker in pair:
+            worker.wait_ready()
+        yield pair
+    finally:
+        for worker in pair:
+            worker.stop()
+
+
+@pytest.fixture
+async def team_name(database: None) -> AsyncIterator[str]:  # noqa: ARG001
+    name = f'inv{uuid.uuid4().hex[:8]}'
+    yield name
+    async with UnitOfWork() as session:
+        await session.execute(text('DELETE FROM teams WHERE team_name = :team_name'), {'team_name': name})
+
+
+def members(team: dict[str, Any]) -> dict[str, bool]:
+    return {member['user_id']: member['is_active'] for member in team['members']}
+
+
+def add_team(worker: Worker, team_name: str) -> str:
+    """Создать команду из двух активных участников и вернуть ID первого."""
+    user_id = f'{team_name}-1'
+    status, _ = worker.call(
+        'POST',
+        '/team/add',
+        {
+            'team_name': team_name,
+            'members': [
+                {'user_id': user_id, 'username': 'First', 'is_active': True},
+                {'user_id': f'{team_name}-2', 'username': 'Second', 'is_active': True},
+            ],
+        },
+    )
+    assert status == 201
+    return user_id
+
+
+def read_member(worker: Worker, team_name: str, user_id: str) -> bool:
+    status, team = worker.call('GET', '/team/get', team_name=team_name)
+    assert status == 200
+    return members(team)[user_id]
+
+
+def set_is_active(worker: Worker, user_id: str, is_active: bool) -> None:
+    status, _ = worker.call('POST', '/users/setIsActive', {'user_id': user_id, 'is_active': is_active})
+    assert status == 200
+
+
+def wait_for(condition: Callable[[], bool], message: str) -> None:
+    deadline = time.monotonic() + DELIVERY_TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, f'{message} in {DELIVERY_TIMEOUT}s'
+        time.sleep(0.05)
+
+
+def warm_up(worker: Worker, team_name: str, user_id: str) -> dict[str, int | float]:
+    """Прочитать команду дважды: второе чтение обслуживается из кэша."""
+    for _ in range(2):
+        assert read_member(worker, team_name, user_id) is True
+    stats = worker.cache_stats()
+    assert stats['hits'] >= 1
+    return stats
+
+
+async def test_read_after_write_across_workers(workers: tuple[Worker, Worker], team_name: str) -> None:
+    writer, reader = workers
+    user_id = add_team(writer, team_name)
+    warmed = warm_up(reader, team_name, user_id)
+
+    set_is_active(writer, user_id, False)
+    wait_for(
+        lambda: reader.cache_stats()['invalidations'] > warmed['invalidations'],
+        'worker B did not invalidate its roster cache',
+    )
+
+    assert read_member(reader, team_name, user_id) is False
+    assert reader.cache_stats()['misses'] == warmed['misses'] + 1
+
+
+async def test_read_after_write_while_listener_is_down(workers: tuple[Worker, Worker], team_name: str) -> None:
+    writer, reader = workers
+    user_id = add_team(writer, team_name)
+    warmed = warm_up(reader, team_name, user_id)
+
+    async with UnitOfWork() as session:
+        terminated = await session.scalar(
+            text('SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity WHERE application_name = :name'),
+            {'name': f'cache-invalidation-listener:{reader.process.pid}'},
+        )
+    assert terminated == 1
+
+    # B заметил разрыв и сбросил кэш; переподключение - не раньше чем через 0.5 с
+    wait_for(
+        lambda: reader.cache_stats()['invalidations'] > warmed['invalidations'],
+        'worker B did not notice the lost LISTEN connection',
+    )
+    assert read_member(reader, team_name, user_id) is True
+    # NOTIFY этой записи до B не дойдёт
+    set_is_active(writer, user_id, False)
+    assert read_member(reader, team_name, user_id) is False
+    assert reader.cache_stats()['bypasses'] == warmed['bypasses'] + 2
+
+    # После переподключения кэш снова наполняется и отвечает
+    def cached() -> bool:
+        hits = reader.cache_stats()['hits']
+        read_member(reader, team_name, user_id)
+        return reader.cache_stats()['hits'] > hits
+
+    wait_for(cached, 'worker B did not resume caching after reconnect')
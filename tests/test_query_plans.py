@@ -0,0 +1,228 @@
+"""
+Регрессия планов горячих запросов репозиториев.
+
+В одной транзакции БД заполняется большим набором данных (``QUERY_PLANS_USERS`` пользователей, по три PR
+на пользователя, по два ревьювера на PR) и статистика пересчитывается через ANALYZE. Затем вызывается
+каждый метод репозиториев, его SQL перехватывается и для каждого запроса выполняется EXPLAIN. Тест падает,
+если план читает ``pull_requests``, ``pull_request_reviewers`` или ``users`` последовательным сканированием.
+В конце транзакция откатывается, данные в БД не остаются.
+"""
+
+import inspect
+import json
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.base import session_factory
+from app.database.cache import roster_cache
+from app.database.models import PRStatus, ReviewerAssignmentMode
+from app.database.repositories.pull_request import PullRequestRepo, pull_request_repo
+from app.database.repositories.stats import StatsRepo, stats_repo
+from app.database.repositories.team import TeamRepo, team_repo
+from app.database.repositories.user import UserRepo, user_repo
+
+pytestmark = pytest.mark.anyio
+
+HOT_TABLES = {'pull_requests', 'pull_request_reviewers', 'users'}
+# Служебные команды (SAVEPOINT, LOCK и т.п.) EXPLAIN не поддерживает
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+USERS = int(os.environ.get('QUERY_PLANS_USERS', '50000'))
+TEAM_SIZE = 10
+TEAMS = USERS // TEAM_SIZE
+
+# Полные пересчёты агрегатов по определению читают таблицы целиком
+FULL_SCANS = {
+    'UserRepo.rebuild_review_counters',
+    'StatsRepo.rebuild_pull_request_stats',
+}
+
+
+def user(i: int) -> str:
+    return f'qp-u-{i % USERS}'
+
+
+def team(i: int) -> str:
+    return f'qp-team-{i % TEAMS}'
+
+
+# PR с номером i открыт при i % 10 >= 7; автор - user(i), ревьюверы - user(i + TEAMS) и user(i + 2 * TEAMS)
+OPEN_PR, MERGED_PR = 'qp-pr-7', 'qp-pr-1'
+AUTHOR, REVIEWER, TEAM = user(7), user(7 + TEAMS), team(7)
+
+SEED = [
+    """
+    INSERT INTO teams (team_name, assignment_mode)
+    SELECT 'qp-team-' || i, CASE WHEN i % 2 = 0 THEN :least_loaded ELSE :random END
+    FROM generate_series(0, :teams - 1) AS i
+    """,
+    """
+    INSERT INTO users (user_id, username, team_name, is_active, open_reviews, merged_reviews)
+    SELECT 'qp-u-' || i, 'User ' || i, 'qp-team-' || (i % :teams), i % 10 <> 0, i % 7, i % 13
+    FROM generate_series(0, :users - 1) AS i
+    """,
+    """
+    INSERT INTO pull_requests (pull_request_id, pull_request_name, author_id, status, merged_at)
+    SELECT 'qp-pr-' || i, 'Change ' || i, 'qp-u-' || (i % :users),
+           CASE WHEN i % 10 < 7 THEN :merged ELSE :open END,
+           CASE WHEN i % 10 < 7 THEN now() END
+    FROM generate_series(0, :users * 3 - 1) AS i
+    """,
+    """
+    INSERT INTO pull_request_reviewers (pull_request_id, user_id)
+    SELECT 'qp-pr-' || i, 'qp-u-' || ((i + k * :teams) % :users)
+    FROM generate_series(0, :users * 3 - 1) AS i, generate_series(1, 2) AS k
+    """,
+    'ANALYZE teams',
+    'ANALYZE users',
+    'ANALYZE pull_requests',
+    'ANALYZE pull_request_reviewers',
+]
+
+Case = Callable[[AsyncSession], Awaitable[Any]]
+
+CASES: dict[str, list[Case]] = {
+    'PullRequestRepo.get_with_reviewers': [lambda s: pull_request_repo.get_with_reviewers(OPEN_PR, session=s)],
+    'PullRequestRepo.create_with_reviewers': [
+        lambda s: pull_request_repo.create_with_reviewers('qp-new', 'New', AUTHOR, session=s),
+        lambda s: pull_request_repo.create_with_reviewers(OPEN_PR, 'Existing', AUTHOR, session=s),
+    ],
+    'PullRequestRepo.get_existing_ids': [
+        lambda s: pull_request_repo.get_existing_ids([OPEN_PR, MERGED_PR, 'qp-missing'], session=s)
+    ],
+    'PullRequestRepo.create_many': [
+        lambda s: pull_request_repo.create_many([('qp-new-1', 'New', AUTHOR), ('qp-new-2', 'New', REVIEWER)], session=s)
+    ],
+    'PullRequestRepo.add_reviewers': [lambda s: pull_request_repo.add_reviewers([(OPEN_PR, user(8))], session=s)],
+    'PullRequestRepo.remove_reviewers': [
+        lambda s: pull_request_repo.remove_reviewers([(OPEN_PR, REVIEWER)], session=s)
+    ],
+    'PullRequestRepo.get_open_assignments': [
+        lambda s: pull_request_repo.get_open_assignments([REVIEWER, user(8)], session=s),
+        lambda s: pull_request_repo.get_open_assignments([REVIEWER], team_name=team(8), session=s),
+    ],
+    'PullRequestRepo.get_reviewers_many': [
+        lambda s: pull_request_repo.get_reviewers_many([OPEN_PR, MERGED_PR], session=s)
+    ],
+    'PullRequestRepo.get_team_rosters': [lambda s: pull_request_repo.get_team_rosters([TEAM, team(8)], session=s)],
+    'PullRequestRepo.get_for_update': [lambda s: pull_request_repo.get_for_update(OPEN_PR, session=s)],
+    'PullRequestRepo.swap_reviewer': [
+        lambda s: pull_request_repo.swap_reviewer(OPEN_PR, REVIEWER, [AUTHOR, REVIEWER], session=s)
+    ],
+    'PullRequestRepo.get_reviewers': [lambda s: pull_request_repo.get_reviewers(OPEN_PR, session=s)],
+    'PullRequestRepo.merge': [lambda s: pull_request_repo.merge(OPEN_PR, session=s)],
+    'UserRepo.get_by_id': [lambda s: user_repo.get_by_id(AUTHOR, session=s)],
+    'UserRepo.get_team_names': [lambda s: user_repo.get_team_names([AUTHOR, REVIEWER], session=s)],
+    'UserRepo.bulk_upsert': [
+        lambda s: user_repo.bulk_upsert([(AUTHOR, 'Renamed', TEAM, True), ('qp-new-u', 'New', TEAM, True)], session=s)
+    ],
+    'UserRepo.update_is_active': [lambda s: user_repo.update_is_active(REVIEWER, False, session=s)],
+    'UserRepo.deactivate_many': [
+        lambda s: user_repo.deactivate_many([REVIEWER], session=s),
+        lambda s: user_repo.deactivate_many([REVIEWER], team_name=team(8), session=s),
+    ],
+    'UserRepo.get_assigned_pull_requests': [
+        lambda s: user_repo.get_assigned_pull_requests(REVIEWER, session=s),
+        lambda s: user_repo.get_assigned_pull_requests(REVIEWER, status=PRStatus.OPEN, limit=20, session=s),
+        lambda s: user_repo.get_assigned_pull_requests(REVIEWER, after=MERGED_PR, limit=20, session=s),
+    ],
+    'UserRepo.count_assigned_pull_requests': [
+        lambda s: user_repo.count_assigned_pull_requests(REVIEWER, session=s),
+        lambda s: user_repo.count_assigned_pull_requests(REVIEWER, status=PRStatus.MERGED, session=s),
+    ],
+    'TeamRepo.get_by_name': [lambda s: team_repo.get_by_name(TEAM, session=s)],
+    'TeamRepo.exists': [lambda s: team_repo.exists(TEAM, session=s)],
+    'TeamRepo.create': [lambda s: team_repo.create('qp-new-team', session=s)],
+    'TeamRepo.create_missing': [lambda s: team_repo.create_missing([TEAM, 'qp-new-team'], session=s)],
+    'StatsRepo.add_pull_requests': [lambda s: stats_repo.add_pull_requests({(PRStatus.OPEN.value, 2): 1}, session=s)],
+    'StatsRepo.get_pull_request_stats': [lambda s: stats_repo.get_pull_request_stats(session=s)],
+    'StatsRepo.get_user_stats': [lambda s: stats_repo.get_user_stats(REVIEWER, session=s)],
+    'StatsRepo.get_team_member_stats': [lambda s: stats_repo.get_team_member_stats(TEAM, session=s)],
+}
+
+
+@dataclass
+class Captured:
+    enabled: bool = False
+    statements: list[tuple[str, Any]] = field(default_factory=list)
+
+
+@pytest.fixture(scope='module')
+async def seeded(database: None) -> AsyncIterator[tuple[AsyncSession, Captured]]:  # noqa: ARG001
+    """Сессия с открытой транзакцией над заполненной БД и перехватом SQL её соединения."""
+    session = session_factory()
+    captured = Captured()
+    try:
+        params = {
+            'teams': TEAMS,
+            'users': USERS,
+            'open': PRStatus.OPEN.value,
+            'merged': PRStatus.MERGED.value,
+            'random': ReviewerAssignmentMode.RANDOM.value,
+            'least_loaded': ReviewerAssignmentMode.LEAST_LOADED.value,
+        }
+        for statement in SEED:
+            await session.execute(text(statement), {k: v for k, v in params.items() if f':{k}' in statement})
+
+        def capture(_conn, _cursor, statement, parameters, *_args) -> None:  # noqa: ANN001, ANN002
+            if captured.enabled and statement.lstrip().upper().startswith(EXPLAINABLE):
+                captured.statements.append((statement, parameters))
+
+        conn = await session.connection()
+        event.listen(conn.sync_connection, 'before_cursor_execute', capture)
+        yield session, captured
+    finally:
+        await session.rollback()
+        await session.close()
+        roster_cache.clear()
+
+
+def seq_scans(plan: dict[str, Any]) -> list[str]:
+    """Таблицы из ``HOT_TABLES``, которые план читает последовательным сканированием."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in HOT_TABLES:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', ()):
+        found.extend(seq_scans(child))
+    return found
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+async def test_hot_query_uses_indexes(seeded: tuple[AsyncSession, Captured], name: str) -> None:
+    session, captured = seeded
+    # Составы команд должны читаться из БД, а не из кэша
+    roster_cache.clear()
+
+    captured.statements.clear()
+    for case in CASES[name]:
+        savepoint = await session.begin_nested()
+        captured.enabled = True
+        try:
+            await case(session)
+        finally:
+            captured.enabled = False
+            await savepoint.rollback()
+    assert captured.statements, f'{name} ran no SQL'
+
+    conn = await session.connection()
+    for statement, parameters in captured.statements:
+        result = await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+        explained = result.scalar_one()
+        plan = (json.loads(explained) if isinstance(explained, str) else explained)[0]['Plan']
+        assert not seq_scans(plan), f'{name} plans a Seq Scan on {seq_scans(plan)}:\n{statement}'
+
+
+def test_every_repository_method_is_checked() -> None:
+    methods = {
+        f'{repo.__name__}.{method}'
+        for repo in (PullRequestRepo, UserRepo, TeamRepo, StatsRepo)
+        for method, _ in inspect.getmembers(repo, inspect.iscoroutinefunction)
+        if not method.startswith('_')
+    }
+    assert methods - FULL_SCANS == set(CASES)